@@ -34,6 +34,8 @@ if 'avg_response_time' not in st.session_state:
     st.session_state.avg_response_time = 0
 if 'response_times' not in st.session_state:
     st.session_state.response_times = []
+if 'stage_timings' not in st.session_state:
+    st.session_state.stage_timings = []
 if 'system_stats' not in st.session_state:
     st.session_state.system_stats = None
 if 'scroll_to' not in st.session_state:
@@ -795,6 +797,60 @@ def create_response_time_chart(times):
     
     return fig
 
+STAGE_COLORS = {
+    'cache_lookup': '#94a3b8',
+    'encode': '#667eea',
+    'search': '#764ba2',
+    'keyword_fusion': '#a855f7',
+    'rerank': '#f093fb',
+    'diversify': '#f5576c',
+    'hydrate': '#fbbf24',
+    'expand': '#fb923c',
+    'prompt': '#34d399',
+    'generation': '#22d3ee',
+    'other': '#475569'
+}
+
+def create_stage_timing_chart(timings_list):
+    """Create stacked per-stage response time chart"""
+    if not timings_list:
+        return None
+    
+    stages = []
+    for timings in timings_list:
+        for stage in timings:
+            if stage != 'total' and stage not in stages:
+                stages.append(stage)
+    
+    # Time not covered by any stage (logging, result formatting)
+    other = [max(t.get('total', 0) - sum(v for k, v in t.items() if k != 'total'), 0) for t in timings_list]
+    
+    fig = go.Figure()
+    queries = list(range(1, len(timings_list) + 1))
+    for stage in stages + ['other']:
+        values = other if stage == 'other' else [t.get(stage, 0) for t in timings_list]
+        fig.add_trace(go.Bar(
+            x=queries,
+            y=[v / 1000 for v in values],
+            name=stage,
+            marker_color=STAGE_COLORS.get(stage)
+        ))
+    
+    fig.update_layout(
+        title="Response Time by Stage",
+        barmode='stack',
+        xaxis_title="Query",
+        yaxis_title="Time (s)",
+        template="plotly_dark",
+        height=300,
+        margin=dict(l=20, r=20, t=40, b=20),
+        legend=dict(orientation='h', font=dict(size=9)),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    
+    return fig
+
 def show_landing_page():
     """Display complete landing page"""
     
@@ -1104,8 +1160,17 @@ def show_app():
             </div>
             """, unsafe_allow_html=True)
         
-        # Response time chart
-        if st.session_state.response_times:
+        # Response time chart, broken down by stage when timings are available
+        if st.session_state.stage_timings:
+            chart = create_stage_timing_chart(st.session_state.stage_timings[-10:])
+            if chart:
+                st.plotly_chart(chart, use_container_width=True)
+            pipeline = st.session_state.rag_pipeline
+            total = pipeline.latency_summary().get('total') if pipeline is not None else None
+            if total:
+                st.caption(f"p50 {total['p50'] / 1000:.2f}s · p95 {total['p95'] / 1000:.2f}s "
+                           f"over {total['count']} queries")
+        elif st.session_state.response_times:
             chart = create_response_time_chart(st.session_state.response_times[-10:])
             if chart:
                 st.plotly_chart(chart, use_container_width=True)
@@ -1126,7 +1191,10 @@ def show_app():
             st.session_state.chat_history = []
             st.session_state.total_queries = 0
             st.session_state.response_times = []
+            st.session_state.stage_timings = []
             st.session_state.avg_response_time = 0
+            if st.session_state.rag_pipeline is not None:
+                st.session_state.rag_pipeline.latency_stats.clear()
             st.rerun()
     
     # --- CENTERED LAYOUT LOGIC STARTS HERE ---
@@ -1173,6 +1241,8 @@ def show_app():
                 
                 # Update stats
                 st.session_state.response_times.append(response_time)
+                if result.get('timings'):
+                    st.session_state.stage_timings.append(result['timings'])
                 st.session_state.avg_response_time = sum(st.session_state.response_times) / len(st.session_state.response_times)
                 
                 # Save to history
@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = ".artifact_manifest.json"
+
+
+def _md5_base64(path: Path, chunk_size: int = 1 << 20) -> str:
+    """md5 of a file, base64-encoded like GCS blob.md5_hash"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode('ascii')
+
+
+class GCSArtifactFetcher:
+    """
+    Download a set of files under a GCS prefix into a local directory,
+    in parallel and only when they changed.
+
+    A manifest in the local directory records the generation and md5 of
+    every downloaded blob. On the next fetch a single listing of the prefix
+    is compared against it, and files whose generation and md5 are unchanged
+    (and still present locally with the right size) are not transferred.
+    Downloads go to a temporary file, are verified against the blob's md5,
+    and are then renamed into place.
+    """
+
+    def __init__(self, bucket, max_workers: int = 8, retries: int = 3, backoff: float = 1.0):
+        """
+        Args:
+            bucket: GCS bucket
+            max_workers: Concurrent downloads
+            retries: Attempts per file before giving up
+            backoff: Seconds to wait between attempts (multiplied by attempt number)
+        """
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch(self,
+              prefix: str,
+              local_dir: str,
+              filenames: Sequence[str],
+              required: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Bring local_dir up to date with gs://bucket/{prefix}{filename} for each filename
+
+        Files absent from the bucket are skipped (and a stale local copy from
+        an earlier fetch is removed, so old artifacts are never mistaken for
+        current ones).
+
+        Args:
+            prefix: GCS prefix, ending in "/"
+            local_dir: Local directory to populate
+            filenames: File names relative to prefix
+            required: File names that must exist in the bucket
+
+        Returns:
+            Summary with downloaded, unchanged and missing file names, bytes
+            transferred and elapsed seconds
+        """
+        t0 = time.perf_counter()
+        local_dir = Path(local_dir)
+        local_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = local_dir / MANIFEST_FILE
+        manifest = self._read_manifest(manifest_path)
+
+        remote = {blob.name[len(prefix):]: blob for blob in self.bucket.list_blobs(prefix=prefix)}
+
+        missing = [name for name in filenames if name not in remote]
+        missing_required = [name for name in (required or []) if name not in remote]
+        if missing_required:
+            raise FileNotFoundError(
+                f"Required artifacts missing under gs://{self.bucket.name}/{prefix}: {missing_required}"
+            )
+        manifest_changed = False
+        for name in missing:
+            if name in manifest:
+                (local_dir / name).unlink(missing_ok=True)
+                del manifest[name]
+                manifest_changed = True
+                logger.info(f"  ✗ Removed stale local copy of {name} (no longer in bucket)")
+
+        to_download: List[str] = []
+        unchanged: List[str] = []
+        for name in filenames:
+            if name in missing:
+                continue
+            if self._is_current(local_dir / name, remote[name], manifest.get(name)):
+                unchanged.append(name)
+            else:
+                to_download.append(name)
+
+        if to_download:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_download))) as pool:
+                entries = list(pool.map(lambda name: self._download(remote[name], local_dir / name), to_download))
+            manifest.update(dict(zip(to_download, entries)))
+            manifest_changed = True
+        if manifest_changed:
+            self._write_manifest(manifest_path, manifest)
+
+        summary = {
+            'downloaded': to_download,
+            'unchanged': unchanged,
+            'missing': missing,
+            'bytes_downloaded': int(sum(manifest[name]['size'] for name in to_download)),
+            'seconds': time.perf_counter() - t0
+        }
+        logger.info(
+            f"✓ Fetched gs://{self.bucket.name}/{prefix}: {len(to_download)} downloaded "
+            f"({summary['bytes_downloaded'] / 1024 / 1024:.1f} MB), {len(unchanged)} unchanged, "
+            f"{len(missing)} not in bucket ({summary['seconds']:.2f}s)"
+        )
+        return summary
+
+    @staticmethod
+    def _is_current(local_path: Path, blob, entry: Optional[Dict]) -> bool:
+        """True if the local file is the same blob generation we downloaded before"""
+        return (
+            entry is not None
+            and local_path.exists()
+            and entry.get('generation') == blob.generation
+            and entry.get('md5') == blob.md5_hash
+            and local_path.stat().st_size == entry.get('size')
+        )
+
+    def _download(self, blob, local_path: Path) -> Dict:
+        """Download one blob to a temporary file, verify its md5 and move it into place"""
+        tmp_path = local_path.with_name(local_path.name + ".part")
+        for attempt in range(1, self.retries + 1):
+            try:
+                blob.download_to_filename(str(tmp_path))
+                # Composite objects carry no md5; their size is still checked by the manifest
+                if blob.md5_hash and _md5_base64(tmp_path) != blob.md5_hash:
+                    raise IOError(f"md5 mismatch for {blob.name}")
+                os.replace(tmp_path, local_path)
+                logger.info(f"  ✓ Downloaded: {blob.name}")
+                return {
+                    'generation': blob.generation,
+                    'md5': blob.md5_hash,
+                    'size': local_path.stat().st_size
+                }
+            except Exception as e:
+                tmp_path.unlink(missing_ok=True)
+                logger.warning(f"Attempt {attempt} failed to download {blob.name}: {e}")
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * attempt)
+        raise RuntimeError("unreachable")
+
+    @staticmethod
+    def _read_manifest(manifest_path: Path) -> Dict:
+        if not manifest_path.exists():
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠ Ignoring unreadable manifest {manifest_path}: {e}")
+            return {}
+
+    @staticmethod
+    def _write_manifest(manifest_path: Path, manifest: Dict):
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
@@ -1,6 +1,7 @@
 # Model_Pipeline/src/data/load_from_gcs.py
 from google.cloud import storage
 from google.oauth2 import service_account
+import hashlib
 import json
 import logging
 from typing import List, Dict, Optional, Tuple, Union
@@ -251,6 +252,11 @@ class GCSDataLoader:
             # Chunk the text
             text_chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
             
+            # Shared by all chunks of this record so retrieval can find a chunk's neighbors
+            parent_id = record.get('id') or (
+                f"{source_type}_{record_counter}_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}"
+            )
+            
             # Create new records for each chunk
             for i, chunk in enumerate(text_chunks):
                 chunked_record = record.copy()
@@ -261,6 +267,7 @@ class GCSDataLoader:
                 chunked_record['id'] = f"{source_type}_{record_counter}_{i}_{hash(chunk[:50]) % 10000}"
                 chunked_record['chunk_index'] = i
                 chunked_record['total_chunks'] = len(text_chunks)
+                chunked_record['parent_id'] = parent_id
                 chunked_record['is_chunked'] = True
                 chunked_record['source_type'] = source_type
                 
@@ -0,0 +1,178 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Union
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BatchingEncoder:
+    """
+    Drop-in wrapper around a SentenceTransformer that coalesces concurrent
+    encode() calls into batched forward passes.
+
+    Small requests are queued. A background thread takes the first waiting
+    request, keeps collecting for up to max_wait_ms or until max_batch_size
+    texts are queued, encodes them all in one call and resolves each
+    caller's future with its own rows. Requests that are already a full
+    batch, or that pass extra encode() options (progress bars, batch size),
+    bypass the queue and are encoded directly in the caller's thread.
+    Other attributes are forwarded to the wrapped model.
+    """
+
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Args:
+            model: SentenceTransformer (anything with a compatible encode())
+            max_batch_size: Texts per coalesced forward pass
+            max_wait_ms: Longest time the first queued request waits for company
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._items = 0
+        self._batches = 0
+        self._encode_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._closed = False
+        # Held while checking _closed and enqueueing, so nothing is queued behind the stop signal
+        self._close_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name):
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def encode(self,
+               sentences: Union[str, List[str]],
+               normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        """
+        Encode one text or a list of texts, sharing a forward pass with
+        concurrent callers where possible
+
+        Returns:
+            1-D array for a single string, otherwise (len(sentences), dim)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        future = None
+        if not kwargs and convert_to_numpy and 0 < len(texts) < self.max_batch_size:
+            with self._close_lock:
+                if not self._closed:
+                    future = Future()
+                    self._queue.put((texts, bool(normalize_embeddings), future, time.perf_counter()))
+        if future is None:
+            return self.model.encode(sentences, normalize_embeddings=normalize_embeddings,
+                                     convert_to_numpy=convert_to_numpy, **kwargs)
+
+        embeddings = future.result()
+        return embeddings[0] if single else embeddings
+
+    def _run(self):
+        """Worker loop; requests still queued when it exits are failed, never left waiting"""
+        try:
+            self._serve()
+        finally:
+            with self._close_lock:
+                self._closed = True
+            while True:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not None and not request[2].done():
+                    request[2].set_exception(RuntimeError("BatchingEncoder worker stopped"))
+
+    def _serve(self):
+        """Gather a batch, encode it, hand results back, until the stop signal"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first[0])
+            deadline = first[3] + self.max_wait_ms / 1000
+            stop = False
+            while size < self.max_batch_size:
+                # Past the deadline, still take whatever queued up during the last forward pass
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: List):
+        # Normalization is a per-call option; encode each setting separately
+        for normalize in (True, False):
+            group = [r for r in batch if r[1] == normalize]
+            if group:
+                self._encode_group(group, normalize)
+
+    def _encode_group(self, group: List, normalize: bool):
+        texts = [text for request in group for text in request[0]]
+        started = time.perf_counter()
+        try:
+            embeddings = self.model.encode(texts, batch_size=self.max_batch_size,
+                                           normalize_embeddings=normalize, convert_to_numpy=True)
+        except Exception as e:
+            for request in group:
+                request[2].set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        offset = 0
+        for request_texts, _, future, _ in group:
+            future.set_result(embeddings[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+        with self._stats_lock:
+            self._requests += len(group)
+            self._items += len(texts)
+            self._batches += 1
+            self._encode_seconds += finished - started
+            self._wait_seconds += sum(started - request[3] for request in group)
+
+    def stats(self) -> Dict:
+        """Throughput metrics for coalesced requests"""
+        with self._stats_lock:
+            return {
+                'requests': self._requests,
+                'items': self._items,
+                'batches': self._batches,
+                'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+                'items_per_second': self._items / self._encode_seconds if self._encode_seconds else 0.0,
+                'mean_queue_wait_ms': 1000 * self._wait_seconds / self._requests if self._requests else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms
+            }
+
+    def close(self):
+        """Stop the worker after the requests already queued"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout=5)
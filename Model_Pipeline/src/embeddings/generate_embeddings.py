@@ -1,8 +1,7 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import json
 import os
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import logging
 from tqdm import tqdm
 from google.cloud import storage
@@ -12,6 +11,22 @@ import sys
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
+try:
+    from ..data.artifact_fetcher import GCSArtifactFetcher
+    from .encoder_service import BatchingEncoder
+    from .shared_models import acquire_model, release_model
+    from .quantization import (
+        EMBEDDING_ARTIFACTS, FLOAT32_FILE, load_embedding_matrix,
+        quantization_report, save_quantized_embeddings
+    )
+except ImportError:
+    from data.artifact_fetcher import GCSArtifactFetcher
+    from embeddings.encoder_service import BatchingEncoder
+    from embeddings.shared_models import acquire_model, release_model
+    from embeddings.quantization import (
+        EMBEDDING_ARTIFACTS, FLOAT32_FILE, load_embedding_matrix,
+        quantization_report, save_quantized_embeddings
+    )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,9 +37,14 @@ class EmbeddingGenerator:
                  use_gcs: bool = True,
                  bucket_name: str = "mlops-data-oa",
                  project_id: str = "mlops-476419",
-                 credentials_path: str = None):
+                 credentials_path: str = None,
+                 encoder_max_batch_size: int = 64,
+                 encoder_max_wait_ms: float = 5.0):
         logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        # Corpus-sized calls go straight to the model; small concurrent ones share forward passes
+        self.model = BatchingEncoder(acquire_model(model_name),
+                                     max_batch_size=encoder_max_batch_size,
+                                     max_wait_ms=encoder_max_wait_ms)
         self.model_name = model_name
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         self.use_gcs = use_gcs
@@ -57,6 +77,11 @@ class EmbeddingGenerator:
         
         logger.info(f"Model loaded! Embedding dimension: {self.embedding_dim}")
     
+    def close(self):
+        """Stop the encoder worker and release the shared embedding model"""
+        self.model.close()
+        release_model(self.model_name)
+    
     def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
         logger.info(f"Generating embeddings for {len(texts)} texts...")
         
@@ -94,6 +119,11 @@ class EmbeddingGenerator:
                 'url': chunk.get('url', ''),
                 'original_index': i
             }
+            # Chunk position within its source record, used for neighbor expansion at query time
+            if chunk.get('parent_id') is not None:
+                meta['parent_id'] = chunk['parent_id']
+                meta['chunk_index'] = chunk.get('chunk_index', 0)
+                meta['total_chunks'] = chunk.get('total_chunks', 1)
             metadata.append(meta)
         
         logger.info(f"Extracted {len(texts)} valid texts")
@@ -107,24 +137,54 @@ class EmbeddingGenerator:
                        embeddings: np.ndarray, 
                        metadata: List[Dict], 
                        output_dir: str = "models/embeddings",
-                       gcs_prefix: str = "onboarding_ai/embeddings/"):
+                       gcs_prefix: str = "onboarding_ai/embeddings/",
+                       quantization: Optional[str] = None,
+                       keep_float32: bool = True):
         """
         Save embeddings to local directory and optionally to GCS
         
+        Embedding artifacts in formats this run does not write are removed
+        (locally and from GCS), so loaders never pick up an older matrix.
+        
         Args:
             texts: List of text strings
             embeddings: Numpy array of embeddings
             metadata: List of metadata dictionaries
             output_dir: Local directory path (for local storage or temp files)
             gcs_prefix: GCS prefix path (used if use_gcs=True)
+            quantization: Also write a compact copy - "float16" or "int8" (None = float32 only)
+            keep_float32: Write and upload embeddings.npy as well as the quantized copy
         """
+        if quantization is None and not keep_float32:
+            raise ValueError("keep_float32=False requires a quantization format")
+        
         # Always create local temp directory for intermediate storage
         os.makedirs(output_dir, exist_ok=True)
         
+        embedding_files = []
+        
         # Save embeddings locally first
-        embeddings_path = os.path.join(output_dir, "embeddings.npy")
-        np.save(embeddings_path, embeddings)
-        logger.info(f"✓ Saved embeddings locally to: {embeddings_path}")
+        if keep_float32:
+            embeddings_path = os.path.join(output_dir, FLOAT32_FILE)
+            np.save(embeddings_path, embeddings)
+            embedding_files.append(FLOAT32_FILE)
+            logger.info(f"✓ Saved embeddings locally to: {embeddings_path}")
+        
+        quantization_stats = None
+        if quantization:
+            written = save_quantized_embeddings(embeddings, output_dir, quantization)
+            embedding_files.extend(written)
+            logger.info(f"✓ Saved {quantization} embeddings locally: {', '.join(written)}")
+            quantization_stats = quantization_report(embeddings, formats=(quantization,))
+        
+        # Loaders prefer the most precise format present, so artifacts from an
+        # earlier run in a format this run did not write must not survive
+        stale_files = [name for name in EMBEDDING_ARTIFACTS if name not in embedding_files]
+        for filename in stale_files:
+            stale_path = os.path.join(output_dir, filename)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+                logger.info(f"✓ Removed stale local artifact: {stale_path}")
         
         texts_path = os.path.join(output_dir, "texts.json")
         with open(texts_path, 'w', encoding='utf-8') as f:
@@ -142,6 +202,12 @@ class EmbeddingGenerator:
             'num_embeddings': len(embeddings),
             'num_texts': len(texts)
         }
+        if quantization_stats:
+            model_info['quantization'] = {
+                'format': quantization,
+                'float32_shipped': keep_float32,
+                'recall_vs_memory': quantization_stats
+            }
         info_path = os.path.join(output_dir, "model_info.json")
         with open(info_path, 'w', encoding='utf-8') as f:
             json.dump(model_info, f, indent=2)
@@ -150,7 +216,10 @@ class EmbeddingGenerator:
         # Upload to GCS if enabled
         if self.use_gcs:
             logger.info(f"\nUploading embeddings to GCS bucket: {self.bucket_name}")
-            self._upload_to_gcs(embeddings_path, f"{gcs_prefix}embeddings.npy")
+            for filename in embedding_files:
+                self._upload_to_gcs(os.path.join(output_dir, filename), f"{gcs_prefix}{filename}")
+            for filename in stale_files:
+                self._delete_from_gcs(f"{gcs_prefix}{filename}")
             self._upload_to_gcs(texts_path, f"{gcs_prefix}texts.json")
             self._upload_to_gcs(metadata_path, f"{gcs_prefix}metadata.json")
             self._upload_to_gcs(info_path, f"{gcs_prefix}model_info.json")
@@ -168,6 +237,17 @@ class EmbeddingGenerator:
             logger.error(f"  ✗ Failed to upload {gcs_path}: {e}")
             raise
     
+    def _delete_from_gcs(self, gcs_path: str):
+        """Delete a file from GCS if it exists"""
+        try:
+            blob = self.bucket.blob(gcs_path)
+            if blob.exists():
+                blob.delete()
+                logger.info(f"  ✓ Deleted stale: {gcs_path}")
+        except Exception as e:
+            logger.error(f"  ✗ Failed to delete {gcs_path}: {e}")
+            raise
+    
     def _download_from_gcs(self, gcs_path: str, local_path: str):
         """Download a file from GCS"""
         try:
@@ -184,6 +264,8 @@ class EmbeddingGenerator:
         """
         Load embeddings from GCS (if enabled) or local directory
         
+        float16 and int8 artifacts are read transparently and returned as float32.
+        
         Args:
             input_dir: Local directory path
             gcs_prefix: GCS prefix path (used if use_gcs=True)
@@ -194,27 +276,23 @@ class EmbeddingGenerator:
         # If using GCS, download files first
         if self.use_gcs:
             logger.info(f"Downloading embeddings from GCS: gs://{self.bucket_name}/{gcs_prefix}")
-            os.makedirs(input_dir, exist_ok=True)
             
-            self._download_from_gcs(
-                f"{gcs_prefix}embeddings.npy",
-                os.path.join(input_dir, "embeddings.npy")
-            )
-            self._download_from_gcs(
-                f"{gcs_prefix}texts.json",
-                os.path.join(input_dir, "texts.json")
-            )
-            self._download_from_gcs(
-                f"{gcs_prefix}metadata.json",
-                os.path.join(input_dir, "metadata.json")
+            # Any subset of the embedding formats may have been shipped;
+            # files unchanged since the last fetch are not downloaded again
+            summary = GCSArtifactFetcher(self.bucket).fetch(
+                gcs_prefix,
+                input_dir,
+                EMBEDDING_ARTIFACTS + ["texts.json", "metadata.json"],
+                required=["texts.json", "metadata.json"]
             )
+            if all(name in summary['missing'] for name in EMBEDDING_ARTIFACTS):
+                raise FileNotFoundError(f"No embedding artifacts under gs://{self.bucket_name}/{gcs_prefix}")
         
         # Load from local directory
-        embeddings_path = os.path.join(input_dir, "embeddings.npy")
         texts_path = os.path.join(input_dir, "texts.json")
         metadata_path = os.path.join(input_dir, "metadata.json")
         
-        embeddings = np.load(embeddings_path)
+        embeddings = load_embedding_matrix(input_dir)
         
         with open(texts_path, 'r', encoding='utf-8') as f:
             texts = json.load(f)
@@ -0,0 +1,285 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Artifact file names, relative to an embeddings directory
+FLOAT32_FILE = "embeddings.npy"
+FLOAT16_FILE = "embeddings_fp16.npy"
+INT8_FILE = "embeddings_int8.npy"
+INT8_PARAMS_FILE = "embeddings_int8_params.npy"
+
+QUANTIZATION_FORMATS = ("float16", "int8")
+
+# Every file that may hold (part of) an embedding matrix, in order of preference
+EMBEDDING_ARTIFACTS = [FLOAT32_FILE, FLOAT16_FILE, INT8_FILE, INT8_PARAMS_FILE]
+
+
+def quantize_int8(embeddings: np.ndarray, block_size: int = 65536) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Scalar-quantize embeddings to int8 with a per-dimension scale and offset
+
+    Each dimension's [min, max] range is mapped onto [-127, 127], so
+    x ≈ code * scale + offset.
+
+    Args:
+        embeddings: Float matrix of shape (num_vectors, dim); may be a memmap
+        block_size: Rows processed at a time
+
+    Returns:
+        Tuple of (codes int8 (num_vectors, dim), scale float32 (dim,), offset float32 (dim,))
+    """
+    dim = embeddings.shape[1]
+    col_min = np.full(dim, np.inf, dtype=np.float32)
+    col_max = np.full(dim, -np.inf, dtype=np.float32)
+    for start in range(0, len(embeddings), block_size):
+        block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+        col_min = np.minimum(col_min, block.min(axis=0))
+        col_max = np.maximum(col_max, block.max(axis=0))
+
+    offset = (col_max + col_min) / 2
+    scale = np.maximum((col_max - col_min) / 254.0, 1e-12).astype(np.float32)
+
+    codes = np.empty(embeddings.shape, dtype=np.int8)
+    for start in range(0, len(embeddings), block_size):
+        block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+        codes[start:start + len(block)] = np.clip(np.rint((block - offset) / scale), -127, 127)
+
+    return codes, scale, offset.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scale: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    """Reconstruct float32 vectors from int8 codes"""
+    return codes.astype(np.float32) * scale + offset
+
+
+def save_quantized_embeddings(embeddings: np.ndarray, output_dir: str, quantization: str) -> List[str]:
+    """
+    Write a compact copy of the embedding matrix next to embeddings.npy
+
+    Args:
+        embeddings: Float32 embedding matrix
+        output_dir: Embeddings directory
+        quantization: "float16" or "int8"
+
+    Returns:
+        List of file names written
+    """
+    output_dir = Path(output_dir)
+    if quantization == "float16":
+        np.save(output_dir / FLOAT16_FILE, np.asarray(embeddings, dtype=np.float16))
+        return [FLOAT16_FILE]
+    if quantization == "int8":
+        codes, scale, offset = quantize_int8(embeddings)
+        np.save(output_dir / INT8_FILE, codes)
+        np.save(output_dir / INT8_PARAMS_FILE, np.stack([scale, offset]))
+        return [INT8_FILE, INT8_PARAMS_FILE]
+    raise ValueError(f"Unknown quantization: {quantization}. Use one of {QUANTIZATION_FORMATS}")
+
+
+def available_format(input_dir: str) -> Optional[str]:
+    """Return the most precise embedding format present in input_dir, or None"""
+    input_dir = Path(input_dir)
+    if (input_dir / FLOAT32_FILE).exists():
+        return "float32"
+    if (input_dir / FLOAT16_FILE).exists():
+        return "float16"
+    if (input_dir / INT8_FILE).exists() and (input_dir / INT8_PARAMS_FILE).exists():
+        return "int8"
+    return None
+
+
+class QuantizedMatrix:
+    """
+    Row-sliceable view over an embedding matrix stored as float32, float16
+    or int8 codes. Slicing always returns float32 rows, so callers can treat
+    every format like the original embeddings.npy.
+    """
+
+    def __init__(self, data: np.ndarray, fmt: str,
+                 scale: Optional[np.ndarray] = None,
+                 offset: Optional[np.ndarray] = None,
+                 files: Optional[List[Path]] = None):
+        self.data = data
+        self.format = fmt
+        self.scale = scale
+        self.offset = offset
+        self.shape = data.shape
+        self.files = files or []    # artifact files the matrix was loaded from
+
+    @classmethod
+    def load(cls, input_dir: str, fmt: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> "QuantizedMatrix":
+        """
+        Open the embedding matrix in input_dir
+
+        Args:
+            input_dir: Embeddings directory
+            fmt: "float32", "float16" or "int8"; defaults to the most precise format present
+            mmap_mode: Passed to np.load (None loads into RAM)
+        """
+        input_dir = Path(input_dir)
+        fmt = fmt or available_format(input_dir)
+        if fmt == "float32":
+            path = input_dir / FLOAT32_FILE
+            return cls(np.load(path, mmap_mode=mmap_mode), fmt, files=[path])
+        if fmt == "float16":
+            path = input_dir / FLOAT16_FILE
+            return cls(np.load(path, mmap_mode=mmap_mode), fmt, files=[path])
+        if fmt == "int8":
+            scale, offset = np.load(input_dir / INT8_PARAMS_FILE)
+            return cls(np.load(input_dir / INT8_FILE, mmap_mode=mmap_mode), fmt, scale, offset,
+                       files=[input_dir / INT8_FILE, input_dir / INT8_PARAMS_FILE])
+        raise FileNotFoundError(f"No embedding artifacts found in {input_dir}")
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, index) -> np.ndarray:
+        rows = np.asarray(self.data[index])
+        if self.format == "int8":
+            return dequantize_int8(rows, self.scale, self.offset)
+        return rows.astype(np.float32, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes needed to hold the stored matrix in memory"""
+        return int(np.prod(self.shape)) * self.data.dtype.itemsize
+
+    def fingerprint(self) -> Dict:
+        """
+        Shape, format and size/mtime of the artifact files, stored with
+        indexes derived from this matrix so they are rebuilt when the
+        embeddings change (even if the row count does not)
+        """
+        fingerprint = {'num_rows': len(self), 'dim': self.shape[1], 'format': self.format}
+        if self.files:
+            stats = [path.stat() for path in self.files]
+            fingerprint['source_bytes'] = sum(stat.st_size for stat in stats)
+            fingerprint['source_mtime_ns'] = max(stat.st_mtime_ns for stat in stats)
+        return fingerprint
+
+    def dot(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        """
+        Inner products of queries with rows[start:end], computed on the
+        compact representation
+
+        For int8, q·(c*s + o) = (q*s)·c + q·o, so the codes never need to be
+        dequantized into a full float32 block.
+        """
+        block = np.asarray(self.data[start:end])
+        if self.format == "int8":
+            return (queries * self.scale) @ block.T.astype(np.float32) + (queries @ self.offset)[:, None]
+        return queries @ block.T.astype(np.float32)
+
+
+def load_embedding_matrix(input_dir: str) -> np.ndarray:
+    """
+    Load the embedding matrix from input_dir as float32, whichever format
+    (embeddings.npy, float16 or int8) was shipped
+    """
+    matrix = QuantizedMatrix.load(input_dir, mmap_mode=None)
+    if matrix.format != "float32":
+        logger.info(f"✓ Dequantizing {matrix.format} embeddings from {input_dir}")
+    return matrix[:]
+
+
+def _block_top_k(score_block, num_rows: int, k: int, block_size: int = 65536) -> np.ndarray:
+    """
+    Top-k row indices per query, scoring the corpus one block at a time
+
+    Args:
+        score_block: Callable (start, end) -> scores of shape (num_queries, end - start)
+        num_rows: Corpus size
+        k: Number of indices to keep per query
+    """
+    best_idx, best_scores = None, None
+    for start in range(0, num_rows, block_size):
+        scores = score_block(start, min(start + block_size, num_rows))
+        idx = np.arange(start, start + scores.shape[1])[None, :].repeat(len(scores), axis=0)
+        if best_idx is not None:
+            scores = np.concatenate([best_scores, scores], axis=1)
+            idx = np.concatenate([best_idx, idx], axis=1)
+        keep = np.argsort(-scores, axis=1)[:, :k]
+        best_idx = np.take_along_axis(idx, keep, axis=1)
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+    return best_idx
+
+
+def quantization_report(embeddings: np.ndarray,
+                        formats: Tuple[str, ...] = QUANTIZATION_FORMATS,
+                        k: int = 10,
+                        num_queries: int = 200,
+                        rescore_factor: int = 4,
+                        seed: int = 42) -> Dict:
+    """
+    Measure recall@k and memory of each quantized format against exact
+    float32 search, with and without float32 rescoring of the shortlist
+
+    Queries are sampled from the corpus itself (self-retrieval), which is a
+    reasonable proxy for real query embeddings from the same model.
+
+    Returns:
+        Dictionary keyed by format with bytes, compression and recall figures
+    """
+    num_vectors, dim = embeddings.shape
+    k = min(k, num_vectors)
+    shortlist_size = min(k * rescore_factor, num_vectors)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(num_vectors, size=min(num_queries, num_vectors), replace=False))
+    queries = np.asarray(embeddings[sample], dtype=np.float32)
+
+    def exact_block(start, end):
+        return queries @ np.asarray(embeddings[start:end], dtype=np.float32).T
+
+    exact = _block_top_k(exact_block, num_vectors, k)
+    float32_bytes = num_vectors * dim * 4
+
+    def recall(found):
+        return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)]))
+
+    report = {
+        'float32': {
+            'bytes': float32_bytes,
+            'compression': 1.0,
+            f'recall@{k}': 1.0,
+            f'recall@{k}_rescored': 1.0
+        }
+    }
+
+    for fmt in formats:
+        if fmt == "float16":
+            compact = QuantizedMatrix(np.asarray(embeddings, dtype=np.float16), fmt)
+        else:
+            codes, scale, offset = quantize_int8(embeddings)
+            compact = QuantizedMatrix(codes, fmt, scale, offset)
+
+        approx = _block_top_k(lambda start, end: compact.dot(queries, start, end), num_vectors, shortlist_size)
+
+        # Rescore the shortlist against full-precision rows
+        rescored = []
+        for query, shortlist in zip(queries, approx):
+            order = np.sort(shortlist)
+            full_scores = np.asarray(embeddings[order], dtype=np.float32) @ query
+            rescored.append(order[np.argsort(-full_scores)[:k]])
+
+        stored_bytes = compact.nbytes + (2 * dim * 4 if fmt == "int8" else 0)
+        report[fmt] = {
+            'bytes': int(stored_bytes),
+            'compression': float32_bytes / stored_bytes,
+            f'recall@{k}': recall(approx[:, :k]),
+            f'recall@{k}_rescored': recall(rescored)
+        }
+
+    logger.info(f"\n📉 Quantization recall vs memory ({len(sample)} sampled queries, k={k}):")
+    logger.info(f"  {'Format':<10} {'Size (MB)':>10} {'Ratio':>7} {'Recall':>8} {'Rescored':>9}")
+    for fmt, stats in report.items():
+        logger.info(
+            f"  {fmt:<10} {stats['bytes'] / 1024 / 1024:>10.2f} {stats['compression']:>6.1f}x "
+            f"{stats[f'recall@{k}']:>8.3f} {stats[f'recall@{k}_rescored']:>9.3f}"
+        )
+
+    return report
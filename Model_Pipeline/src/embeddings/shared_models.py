@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sentence_transformers import SentenceTransformer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SharedModelRegistry:
+    """
+    One loaded model per (model name, device) for the whole process.
+
+    acquire() loads a model on first use and afterwards returns the same
+    instance, counting references; release() drops the instance once its
+    last user is done. Loads of the same model are serialized by a
+    per-model lock (so concurrent first users wait for one load rather
+    than starting their own), while different models load in parallel.
+    """
+
+    def __init__(self, loader: Callable = SentenceTransformer):
+        """
+        Args:
+            loader: Called as loader(model_name, device=device) to load a model
+        """
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, Dict] = {}
+
+    def acquire(self, model_name: str, device: Optional[str] = None):
+        """Shared instance of a model, loading it if this is the first user"""
+        key = (model_name, device)
+        with self._lock:
+            entry = self._entries.setdefault(
+                key, {'model': None, 'refs': 0, 'load_seconds': None, 'lock': threading.Lock()}
+            )
+            entry['refs'] += 1
+
+        try:
+            with entry['lock']:
+                if entry['model'] is None:
+                    t0 = time.perf_counter()
+                    entry['model'] = self.loader(model_name, device=device)
+                    entry['load_seconds'] = time.perf_counter() - t0
+                    logger.info(f"✓ Loaded {model_name} ({device or 'auto'}) in {entry['load_seconds']:.1f}s")
+                else:
+                    logger.info(f"↻ Reusing loaded {model_name} ({device or 'auto'}), "
+                                f"{entry['refs']} users")
+                return entry['model']
+        except Exception:
+            self.release(model_name, device)
+            raise
+
+    def release(self, model_name: str, device: Optional[str] = None):
+        """Give up one reference; the model is freed when none remain"""
+        key = (model_name, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['refs'] -= 1
+            if entry['refs'] <= 0:
+                del self._entries[key]
+                if entry['model'] is not None:
+                    logger.info(f"✓ Unloaded {model_name} ({device or 'auto'})")
+
+    def stats(self) -> List[Dict]:
+        """Loaded models with their reference counts and load times"""
+        with self._lock:
+            return [
+                {'model': name, 'device': device or 'auto', 'refs': entry['refs'],
+                 'load_seconds': entry['load_seconds']}
+                for (name, device), entry in self._entries.items()
+            ]
+
+
+MODEL_REGISTRY = SharedModelRegistry()
+
+
+def acquire_model(model_name: str, device: Optional[str] = None) -> SentenceTransformer:
+    """Shared SentenceTransformer from the process-wide registry"""
+    return MODEL_REGISTRY.acquire(model_name, device)
+
+
+def release_model(model_name: str, device: Optional[str] = None):
+    """Release a model obtained with acquire_model()"""
+    MODEL_REGISTRY.release(model_name, device)
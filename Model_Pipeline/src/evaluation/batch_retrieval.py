@@ -0,0 +1,8 @@
+from typing import Dict, List
+
+
+def retrieve_all(retriever, queries: List[str], k: int) -> List[List[Dict]]:
+    """Retrieve for all queries, batched when the retriever supports it"""
+    if hasattr(retriever, 'retrieve_batch'):
+        return retriever.retrieve_batch(queries, k=k)
+    return [retriever.retrieve(query, k=k) for query in queries]
@@ -1,6 +1,6 @@
 
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 import json
 from pathlib import Path
@@ -8,6 +8,11 @@ from collections import defaultdict
 from scipy import stats
 import pandas as pd
 
+try:
+    from .batch_retrieval import retrieve_all
+except ImportError:
+    from batch_retrieval import retrieve_all
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -33,7 +38,7 @@ class EnhancedBiasDetector:
         logger.info(f"  Bias threshold: {threshold:.0%}")
     
     def compute_retrieval_metrics(self, query: str, relevant_docs: List[str], 
-                                  k: int = 5) -> Dict:
+                                  k: int = 5, results: Optional[List[Dict]] = None) -> Dict:
         """
         Compute precision, recall, MRR for a single query
         
@@ -41,11 +46,13 @@ class EnhancedBiasDetector:
             query: User query string
             relevant_docs: List of relevant document IDs
             k: Number of documents to retrieve
+            results: Pre-fetched retrieval results (retrieved here if None)
             
         Returns:
             Dictionary with precision, recall, MRR, and similarity metrics
         """
-        results = self.retriever.retrieve(query, k=k)
+        if results is None:
+            results = self.retriever.retrieve(query, k=k)
         retrieved_ids = [doc['metadata'].get('id', '') for doc in results]
         
         # Precision@k
@@ -109,11 +116,13 @@ class EnhancedBiasDetector:
             
             logger.info(f"\nAnalyzing {category} ({len(queries)} queries)...")
             
-            for query_data in queries:
+            batch_results = retrieve_all(self.retriever, [q['query'] for q in queries], k)
+            
+            for query_data, results in zip(queries, batch_results):
                 query = query_data['query']
                 relevant = query_data.get('relevant_docs', [])
                 
-                metrics = self.compute_retrieval_metrics(query, relevant, k=k)
+                metrics = self.compute_retrieval_metrics(query, relevant, k=k, results=results)
                 metrics_list.append(metrics)
             
             # Aggregate metrics for category
@@ -163,10 +172,9 @@ class EnhancedBiasDetector:
             'queries_retrieved_for': set()
         })
         
-        for idx, query_data in enumerate(test_queries):
-            query = query_data['query']
-            results = self.retriever.retrieve(query, k=k)
-            
+        batch_results = retrieve_all(self.retriever, [q['query'] for q in test_queries], k)
+        
+        for idx, results in enumerate(batch_results):
             for rank, doc in enumerate(results, 1):
                 source = doc['metadata'].get('source', 'unknown')
                 title = doc['metadata'].get('title', 'Untitled')
@@ -229,10 +237,9 @@ class EnhancedBiasDetector:
             'avg_rank': []
         })
         
-        for query_data in test_queries:
-            query = query_data['query']
-            results = self.retriever.retrieve(query, k=k)
-            
+        batch_results = retrieve_all(self.retriever, [q['query'] for q in test_queries], k)
+        
+        for results in batch_results:
             for rank, doc in enumerate(results, 1):
                 title = doc['metadata'].get('title', 'Untitled')
                 title_stats[title]['count'] += 1
@@ -382,10 +389,9 @@ class EnhancedBiasDetector:
             queries_with_results = 0
             avg_results_per_query = []
             
-            for query_data in queries:
-                query = query_data['query']
-                results = self.retriever.retrieve(query, k=k)
-                
+            batch_results = retrieve_all(self.retriever, [q['query'] for q in queries], k)
+            
+            for results in batch_results:
                 if results:
                     queries_with_results += 1
                     avg_results_per_query.append(len(results))
@@ -784,9 +790,10 @@ class BiasDetector:
         
         all_metrics = []
         
-        for query_info in test_queries:
+        batch_results = retrieve_all(self.retriever, [q['query'] for q in test_queries], k)
+        
+        for query_info, results in zip(test_queries, batch_results):
             query = query_info['query']
-            results = self.retriever.retrieve(query, k=k)
             
             similarities = [doc.get('similarity', 0) for doc in results]
             
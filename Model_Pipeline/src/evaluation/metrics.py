@@ -4,6 +4,11 @@ import logging
 import json
 from pathlib import Path
 
+try:
+    from .batch_retrieval import retrieve_all
+except ImportError:
+    from batch_retrieval import retrieve_all
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -113,14 +118,15 @@ class RetrievalEvaluator:
         metrics_by_k = {k: {'precision': [], 'recall': [], 'f1': [], 'ndcg': []} 
                        for k in k_values}
         
-        for i, item in enumerate(test_queries, 1):
+        max_k = max(k_values)
+        batch_results = retrieve_all(self.retriever, [item['query'] for item in test_queries], max_k)
+        
+        for i, (item, results) in enumerate(zip(test_queries, batch_results), 1):
             query = item['query']
             relevant_ids = item['relevant_ids']
             
             logger.info(f"\n[{i}/{len(test_queries)}] Query: {query[:60]}...")
             
-            max_k = max(k_values)
-            results = self.retriever.retrieve(query, k=max_k)
             retrieved_ids = [doc['id'] for doc in results]
             
             all_retrieved.append(retrieved_ids)
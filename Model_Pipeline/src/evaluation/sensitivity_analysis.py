@@ -5,6 +5,11 @@ from typing import Dict, List
 import logging
 from collections import defaultdict
 
+try:
+    from .batch_retrieval import retrieve_all
+except ImportError:
+    from batch_retrieval import retrieve_all
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -71,12 +76,11 @@ class RetrievalSensitivityAnalyzer:
             'ranks': []
         })
         
-        for query_data in test_queries:
-            query = query_data['query']
+        batch_results = retrieve_all(self.retriever, [q['query'] for q in test_queries], k=10)
+        
+        for query_data, results in zip(test_queries, batch_results):
             relevant_ids = query_data.get('relevant_ids', [])
             
-            results = self.retriever.retrieve(query, k=10)
-            
             for rank, doc in enumerate(results, 1):
                 source_type = doc['metadata'].get('source_type', 
                              doc['metadata'].get('source', 'unknown'))
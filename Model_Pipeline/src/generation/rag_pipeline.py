@@ -1,6 +1,6 @@
-from groq import Groq
-from groq import Groq
+from groq import Groq, AsyncGroq
 # from openai import OpenAI
+import asyncio
 import os
 from typing import List, Dict, Optional
 import logging
@@ -13,6 +13,8 @@ load_dotenv()
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from retrieval.advanced_retriever import AdvancedRetriever
+from retrieval.timing import LatencyStats, StageTimer
+from generation.semantic_cache import SemanticCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,7 +29,13 @@ class UniversalRAGPipeline:
                  use_gcs: bool = True,
                  bucket_name: str = "mlops-data-oa",
                  project_id: str = "mlops-476419",
-                 credentials_path: Optional[str] = None):
+                 credentials_path: Optional[str] = None,
+                 semantic_cache: bool = True,
+                 cache_similarity_threshold: float = 0.9,
+                 cache_ttl_seconds: Optional[float] = 24 * 3600,
+                 cache_max_entries: int = 1000,
+                 adaptive_retrieval: bool = True,
+                 diversity_lambda: Optional[float] = 0.7):
         """
         Initialize Universal RAG Pipeline with GCS support
         
@@ -40,6 +48,15 @@ class UniversalRAGPipeline:
             bucket_name: GCS bucket name
             project_id: GCP project ID
             credentials_path: Path to service account credentials
+            semantic_cache: Serve answers to paraphrases of earlier questions from cache
+            cache_similarity_threshold: Minimum query cosine similarity for a cache hit
+            cache_ttl_seconds: Age after which a cached answer is regenerated
+            cache_max_entries: Cached answers kept (least recently used evicted first)
+            adaptive_retrieval: Let the retriever pick candidate depth, number of
+                sources and whether to rerank per query (k becomes an upper bound)
+            diversity_lambda: MMR relevance/diversity trade-off for the sources
+                passed to the LLM, so overlapping chunks do not fill the prompt
+                (None keeps the plain ranking)
         """
         logger.info("=" * 80)
         logger.info(f"Initializing Universal RAG Pipeline with {provider.upper()}...")
@@ -58,13 +75,23 @@ class UniversalRAGPipeline:
             use_gcs=use_gcs,
             bucket_name=bucket_name,
             project_id=project_id,
-            credentials_path=credentials_path
+            credentials_path=credentials_path,
+            adaptive_depth=adaptive_retrieval,
+            mmr_lambda=diversity_lambda
         )
         
+        self.semantic_cache = SemanticCache(
+            similarity_threshold=cache_similarity_threshold,
+            max_entries=cache_max_entries,
+            ttl_seconds=cache_ttl_seconds
+        ) if semantic_cache else None
+        self.latency_stats = LatencyStats()
+        
         self.provider = provider.lower()
         self.temperature = temperature
         self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.client = None
+        self.async_client = None  # Used by agenerate_answer; None falls back to the sync client in a thread
         self.model_name = model
         
         if self.provider == "gemini":
@@ -108,8 +135,9 @@ class UniversalRAGPipeline:
             logger.warning("   Pipeline will only retrieve, not generate")
             return
         
-        from openai import OpenAI
+        from openai import AsyncOpenAI, OpenAI
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
         self.model_name = model or "gpt-3.5-turbo"
         logger.info(f"✓ OpenAI initialized: {self.model_name}")
     
@@ -126,12 +154,13 @@ class UniversalRAGPipeline:
             return
         
         self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
         self.model_name = model or "llama-3.3-70b-versatile"
         logger.info(f"✓ Groq initialized: {self.model_name} (FREE & FAST!)")
     
-    def retrieve_context(self, query: str, k: int = 5) -> List[Dict]:
+    def retrieve_context(self, query: str, k: int = 5, timer: Optional[StageTimer] = None) -> List[Dict]:
         """Retrieve relevant documents"""
-        return self.retriever.retrieve(query, k=k)
+        return self.retriever.retrieve(query, k=k, timer=timer)
     
     def build_prompt(self, query: str, retrieved_docs: List[Dict]) -> str:
         """Build prompt with retrieved context - optimized for token limits"""
@@ -166,51 +195,141 @@ Answer:"""
         return prompt
     
     def generate_answer(self, query: str, k: int = 5) -> Dict:
-        """Generate answer using RAG"""
+        """
+        Generate answer using RAG
+        
+        The result carries 'timings': milliseconds per stage (cache lookup,
+        encode, search, rerank, ..., prompt, generation) and the total.
+        """
         logger.info("=" * 80)
         logger.info(f"🔍 Processing query: {query}")
         logger.info("=" * 80)
         
+        timer = StageTimer()
+        with timer.stage('cache_lookup'):
+            cache_key, cached = self._check_semantic_cache(query, k)
+        if cached is not None:
+            return self._with_timings(cached, timer)
+        
         # Retrieve documents
-        retrieved_docs = self.retrieve_context(query, k=k)
+        retrieved_docs = self.retrieve_context(query, k=k, timer=timer)
         logger.info(f"✓ Retrieved {len(retrieved_docs)} documents with reranking")
         
         # If no client, return retrieval only
         if self.client is None:
-            logger.warning("⚠️ No LLM client - returning retrieval only")
-            return {
-                'query': query,
-                'answer': "[Generation not available - no API key set]",
-                'sources': retrieved_docs,
-                'num_sources': len(retrieved_docs),
-                'provider': self.provider,
-                'model': None
-            }
+            return self._with_timings(self._retrieval_only_result(query, retrieved_docs), timer)
         
         # Build prompt
-        prompt = self.build_prompt(query, retrieved_docs)
+        with timer.stage('prompt'):
+            prompt = self.build_prompt(query, retrieved_docs)
         logger.info("✓ Built prompt with context")
         
         # Generate answer
         logger.info(f"🤖 Generating answer using {self.provider.upper()}...")
         
         try:
-            if self.provider == "gemini":
-                answer = self._generate_gemini(prompt)
-            elif self.provider == "openai":
-                answer = self._generate_openai(prompt)
-            elif self.provider == "groq":
-                answer = self._generate_groq(prompt)
-            else:
-                raise ValueError(f"Unknown provider: {self.provider}")
+            with timer.stage('generation'):
+                answer = self._generate(prompt)
+            logger.info("✓ Answer generated successfully")
             
+        except Exception as e:
+            logger.error(f"✗ Error generating answer: {e}")
+            answer = f"[Error: {str(e)}]"
+            cache_key = None  # Never serve a failed generation from cache
+        
+        return self._build_result(query, k, answer, retrieved_docs, cache_key, timer)
+    
+    async def agenerate_answer(self, query: str, k: int = 5) -> Dict:
+        """
+        Coroutine version of generate_answer()
+        
+        Query encoding and retrieval run on the retriever's bounded thread
+        pool and the LLM call uses the provider's async client, so one
+        request's encoding overlaps with other requests' LLM waits instead
+        of blocking the event loop.
+        """
+        logger.info("=" * 80)
+        logger.info(f"🔍 Processing query: {query}")
+        logger.info("=" * 80)
+        
+        loop = asyncio.get_running_loop()
+        timer = StageTimer()
+        with timer.stage('cache_lookup'):
+            cache_key, cached = await loop.run_in_executor(
+                self.retriever.executor, self._check_semantic_cache, query, k
+            )
+        if cached is not None:
+            return self._with_timings(cached, timer)
+        
+        retrieved_docs = await self.retriever.aretrieve(query, k=k, timer=timer)
+        logger.info(f"✓ Retrieved {len(retrieved_docs)} documents with reranking")
+        
+        if self.client is None:
+            return self._with_timings(self._retrieval_only_result(query, retrieved_docs), timer)
+        
+        with timer.stage('prompt'):
+            prompt = self.build_prompt(query, retrieved_docs)
+        logger.info(f"🤖 Generating answer using {self.provider.upper()} (async)...")
+        
+        try:
+            with timer.stage('generation'):
+                answer = await self._agenerate(prompt, loop)
             logger.info("✓ Answer generated successfully")
             
         except Exception as e:
             logger.error(f"✗ Error generating answer: {e}")
             answer = f"[Error: {str(e)}]"
+            cache_key = None
+        
+        return self._build_result(query, k, answer, retrieved_docs, cache_key, timer)
+    
+    async def _agenerate(self, prompt: str, loop) -> str:
+        """Call the configured provider without blocking the event loop"""
+        if self.async_client is not None:
+            request = self._groq_request(prompt) if self.provider == "groq" else self._openai_request(prompt)
+            response = await self.async_client.chat.completions.create(**request)
+            return response.choices[0].message.content
+        # No async client for this provider; keep the blocking call off the event loop
+        return await loop.run_in_executor(None, self._generate, prompt)
+    
+    def _check_semantic_cache(self, query: str, k: int):
+        """
+        Look the query up in the semantic cache
         
-        # Format response
+        Returns:
+            (cache key to store the new answer under, cached result or None)
+        """
+        if self.semantic_cache is None:
+            return None, None
+        
+        # Paraphrases of an earlier question reuse its sources and answer
+        cache_key = (self.retriever.encode_query(query), self.retriever.vector_store.index_version())
+        cached = self.semantic_cache.lookup(*cache_key, k=k)
+        if cached is not None:
+            logger.info(f"✓ Semantic cache hit (similarity {cached['cache_similarity']:.3f} "
+                        f"to: {cached['cached_query']})")
+            cached['query'] = query
+        return cache_key, cached
+    
+    def _retrieval_only_result(self, query: str, retrieved_docs: List[Dict]) -> Dict:
+        logger.warning("⚠️ No LLM client - returning retrieval only")
+        return {
+            'query': query,
+            'answer': "[Generation not available - no API key set]",
+            'sources': retrieved_docs,
+            'num_sources': len(retrieved_docs),
+            'provider': self.provider,
+            'model': None
+        }
+    
+    def _build_result(self,
+                      query: str,
+                      k: int,
+                      answer: str,
+                      retrieved_docs: List[Dict],
+                      cache_key,
+                      timer: Optional[StageTimer] = None) -> Dict:
+        """Format the response and cache it when generation succeeded"""
         result = {
             'query': query,
             'answer': answer,
@@ -219,12 +338,38 @@ Answer:"""
             'provider': self.provider,
             'model': self.model_name
         }
+        if retrieved_docs and 'retrieval_plan' in retrieved_docs[0]:
+            result['retrieval_plan'] = retrieved_docs[0]['retrieval_plan']
+        
+        if cache_key is not None and retrieved_docs:
+            self.semantic_cache.store(*cache_key, k=k, result=result)
         
+        return self._with_timings(result, timer) if timer is not None else result
+    
+    def _with_timings(self, result: Dict, timer: StageTimer) -> Dict:
+        """Attach this request's stage timings to a result and add them to the running stats"""
+        result['timings'] = timer.as_dict()
+        self.latency_stats.record(result['timings'])
         return result
     
-    def _generate_openai(self, prompt: str) -> str:
-        """Generate with OpenAI"""
-        response = self.client.chat.completions.create(
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage latency percentiles (ms) over recent requests"""
+        return self.latency_stats.percentiles()
+    
+    def _generate(self, prompt: str) -> str:
+        """Call the configured provider synchronously"""
+        if self.provider == "gemini":
+            return self._generate_gemini(prompt)
+        elif self.provider == "openai":
+            return self._generate_openai(prompt)
+        elif self.provider == "groq":
+            return self._generate_groq(prompt)
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
+    
+    def _openai_request(self, prompt: str) -> Dict:
+        """Chat completion arguments for OpenAI"""
+        return dict(
             model=self.model_name,
             messages=[
                 {"role": "system", "content": "You are a helpful GitLab onboarding assistant."},
@@ -233,11 +378,10 @@ Answer:"""
             temperature=self.temperature,
             max_tokens=500
         )
-        return response.choices[0].message.content
     
-    def _generate_groq(self, prompt: str) -> str:
-        """Generate with Groq"""
-        response = self.client.chat.completions.create(
+    def _groq_request(self, prompt: str) -> Dict:
+        """Chat completion arguments for Groq"""
+        return dict(
             model=self.model_name,
             messages=[
                 {"role": "system", "content": "You are a helpful GitLab onboarding assistant. Answer based on the provided context."},
@@ -247,6 +391,15 @@ Answer:"""
             max_tokens=500,
             top_p=1,
         )
+    
+    def _generate_openai(self, prompt: str) -> str:
+        """Generate with OpenAI"""
+        response = self.client.chat.completions.create(**self._openai_request(prompt))
+        return response.choices[0].message.content
+    
+    def _generate_groq(self, prompt: str) -> str:
+        """Generate with Groq"""
+        response = self.client.chat.completions.create(**self._groq_request(prompt))
         return response.choices[0].message.content
     
     def print_response(self, result: Dict, show_full_sources: bool = False):
@@ -0,0 +1,160 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Answers keyed by query embedding rather than query text.
+
+    A lookup returns the stored result of the most similar earlier query
+    (cosine similarity at or above similarity_threshold, same k), so
+    paraphrases of a question already answered skip retrieval and the LLM.
+    Entries expire after ttl_seconds, the least recently used are evicted
+    beyond max_entries, and everything is dropped when the index version
+    changes so answers never outlive the documents they cite (only lookups
+    move the cache to a new version; a store for an older one is dropped).
+    """
+
+    def __init__(self,
+                 similarity_threshold: float = 0.9,
+                 max_entries: int = 1000,
+                 ttl_seconds: Optional[float] = 24 * 3600):
+        """
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit
+            max_entries: Cached answers kept (least recently used evicted first)
+            ttl_seconds: Age after which an answer is no longer served (None = never)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_version = None
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_key = 0
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query_embedding: np.ndarray, index_version: str, k: int) -> Optional[Dict]:
+        """
+        Cached result for the closest earlier query, or None
+
+        Returns:
+            Deep copy of the stored result with cached, cached_query and
+            cache_similarity added
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._check_version(index_version)
+            self._expire()
+
+            best_key, best_similarity = None, -1.0
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = list(self._entries)
+                    self._matrix = np.stack([self._entries[key]['embedding'] for key in self._matrix_keys])
+                similarities = self._matrix @ query
+                for row in np.argsort(-similarities):
+                    if similarities[row] < self.similarity_threshold:
+                        break
+                    key = self._matrix_keys[row]
+                    if self._entries[key]['k'] == k:
+                        best_key, best_similarity = key, float(similarities[row])
+                        break
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            result = copy.deepcopy(entry['result'])
+
+        result.update({
+            'cached': True,
+            'cached_query': entry['result'].get('query'),
+            'cache_similarity': best_similarity
+        })
+        return result
+
+    def store(self, query_embedding: np.ndarray, index_version: str, k: int, result: Dict):
+        """
+        Cache a result for a query
+
+        index_version is the version the result was retrieved against. If a
+        lookup has since moved the cache to another version, the result is
+        discarded rather than dropping the newer entries.
+        """
+        with self._lock:
+            if self.index_version is None:
+                self.index_version = index_version
+            elif index_version != self.index_version:
+                logger.info("Index version changed since retrieval; not caching this answer")
+                return
+            self._entries[self._next_key] = {
+                'embedding': self._normalize(query_embedding),
+                'k': k,
+                'result': copy.deepcopy(result),
+                'created': time.monotonic()
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'index_version': self.index_version
+            }
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def _check_version(self, index_version: str):
+        """Drop every entry when the index has changed; caller holds the lock"""
+        if index_version != self.index_version:
+            if self._entries:
+                logger.info(f"↻ Index version changed; dropping {len(self._entries)} cached answers")
+            self._entries.clear()
+            self._matrix = None
+            self.index_version = index_version
+
+    def _expire(self):
+        """Remove entries older than the TTL; caller holds the lock"""
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry['created'] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
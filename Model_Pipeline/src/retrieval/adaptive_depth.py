@@ -0,0 +1,66 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+def plan_retrieval_depth(scores: Sequence[Optional[float]],
+                         k: int,
+                         min_k: int = 1,
+                         gap_threshold: float = 0.08,
+                         rerank_window: float = 0.04) -> Dict:
+    """
+    Decide how many candidates to keep and whether reranking can change the
+    answer, from the dense similarity scores of one query
+
+    The largest drop between consecutive scores within the first k ranks is
+    treated as the elbow: if it is at least gap_threshold, everything after
+    it is dropped and final_k shrinks to the elbow (never below min_k).
+    Candidates scoring within rerank_window of the last kept one are
+    "contenders" that could swap places with it; the reranker only runs
+    when there are contenders beyond final_k, i.e. when the boundary is
+    ambiguous.
+
+    Args:
+        scores: Dense similarity per candidate (None entries are ignored)
+        k: Requested number of results (upper bound for final_k)
+        min_k: Smallest final_k an elbow may cut to
+        gap_threshold: Minimum score drop that counts as an elbow
+        rerank_window: Score distance below the boundary that still counts as a contender
+
+    Returns:
+        Dict with final_k, depth (candidates to keep), rerank flag, the
+        gaps it was based on and a short reason
+    """
+    s = np.sort(np.asarray([x for x in scores if x is not None], dtype=np.float64))[::-1]
+    if len(s) < 2 or k <= 1:
+        final_k = min(max(k, 0), len(s))
+        return {'mode': 'adaptive', 'candidates': len(s), 'final_k': final_k, 'depth': final_k,
+                'rerank': False, 'top_gap': None, 'elbow_gap': None,
+                'reason': 'too few candidates to compare'}
+
+    gaps = s[:-1] - s[1:]
+    head = gaps[:min(k, len(gaps))]
+    elbow = int(np.argmax(head))
+    if head[elbow] >= gap_threshold:
+        final_k = max(min(min_k, len(s)), elbow + 1)
+        reason = f"score gap of {head[elbow]:.3f} after rank {elbow + 1}"
+    else:
+        final_k = min(k, len(s))
+        reason = "no clear score gap"
+
+    boundary = s[final_k - 1]
+    depth = max(final_k, int(np.count_nonzero(s >= boundary - rerank_window)))
+    rerank = depth > final_k
+    if rerank:
+        reason += f"; {depth - final_k} contenders within {rerank_window} of rank {final_k}"
+
+    return {
+        'mode': 'adaptive',
+        'candidates': len(s),
+        'final_k': final_k,
+        'depth': depth,
+        'rerank': rerank,
+        'top_gap': float(gaps[0]),
+        'elbow_gap': float(head[elbow]),
+        'reason': reason
+    }
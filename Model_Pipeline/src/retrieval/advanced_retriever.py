@@ -1,15 +1,33 @@
 # src/retrieval/advanced_retriever.py
 
-from sentence_transformers import SentenceTransformer  # CrossEncoder disabled
 import sys
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 from vector_store import VectorStore
+from embedding_cache import QueryEmbeddingCache
+from reranker import CrossEncoderReranker
+from adaptive_depth import plan_retrieval_depth
+from mmr import mmr_select
+from bm25_index import BM25_INDEX_FILE, BM25Index, matches_where, reciprocal_rank_fusion
+from chunk_adjacency import CHUNK_ADJACENCY_FILE, ChunkAdjacency, stitch_chunks
+from timing import StageTimer
 
+try:
+    from ..embeddings.encoder_service import BatchingEncoder
+    from ..embeddings.shared_models import acquire_model, release_model
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from embeddings.encoder_service import BatchingEncoder
+    from embeddings.shared_models import acquire_model, release_model
+
+import asyncio
+import functools
+import threading
 import numpy as np
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 import logging
 import os
 
@@ -27,7 +45,25 @@ class AdvancedRetriever:
                  use_gcs: bool = True,
                  bucket_name: str = "mlops-data-oa",
                  project_id: str = "mlops-476419",
-                 credentials_path: str = None):
+                 credentials_path: str = None,
+                 search_backend: str = "auto",
+                 embeddings_dir: str = "models/embeddings",
+                 snapshot_prefix: Optional[str] = "onboarding_ai/vector_store_snapshots/",
+                 query_cache_size: int = 10000,
+                 query_cache_path: Optional[str] = None,
+                 rerank: bool = True,
+                 reranker_cache_dir: str = "models/reranker",
+                 rerank_batch_size: int = 32,
+                 rerank_latency_budget_ms: Optional[float] = None,
+                 hybrid: bool = True,
+                 rrf_k: int = 60,
+                 max_concurrency: int = 4,
+                 encoder_max_batch_size: int = 64,
+                 encoder_max_wait_ms: float = 5.0,
+                 adaptive_depth: bool = False,
+                 mmr_lambda: Optional[float] = None,
+                 mmr_pool: int = 20,
+                 neighbor_window: int = 0):
         """
         Initialize advanced retriever with GCS support
         
@@ -40,6 +76,32 @@ class AdvancedRetriever:
             bucket_name: GCS bucket name
             project_id: GCP project ID
             credentials_path: Path to service account credentials
+            search_backend: Vector store search backend ("auto", "chroma", "numpy", "ivfpq", "sharded")
+            embeddings_dir: Embedding artifacts used by in-process backends
+            snapshot_prefix: GCS prefix of vector store snapshots restored on
+                startup when use_gcs is set (None to always use the local index)
+            query_cache_size: Query embeddings kept in the in-memory LRU
+            query_cache_path: SQLite file that persists query embeddings
+                across restarts (None for memory only)
+            rerank: Load the cross-encoder (False for dense-only retrieval)
+            reranker_cache_dir: Local directory the cross-encoder is cached in
+            rerank_batch_size: Query-document pairs per cross-encoder forward pass
+            rerank_latency_budget_ms: Time allowed for reranking per query; fewer
+                candidates are reranked when it is short (None = unlimited)
+            hybrid: Also run BM25 keyword search and fuse it with the dense
+                results by reciprocal rank fusion
+            rrf_k: Rank offset in the fusion formula 1 / (rrf_k + rank)
+            max_concurrency: Worker threads running retrievals for aretrieve()
+            encoder_max_batch_size: Queries per coalesced encoder forward pass
+            encoder_max_wait_ms: Longest a query waits to share a forward pass
+            adaptive_depth: Choose candidate depth, final k and whether to
+                rerank per query from the dense score distribution
+            mmr_lambda: Diversify the final results by maximal marginal
+                relevance with this relevance/diversity trade-off (1.0 =
+                relevance only; None disables MMR)
+            mmr_pool: Top-ranked candidates MMR picks the final k from
+            neighbor_window: Expand every result with this many neighboring
+                chunks of the same document on each side (0 = off)
         """
         logger.info("=" * 80)
         logger.info("Initializing AdvancedRetriever with reranking...")
@@ -54,14 +116,28 @@ class AdvancedRetriever:
                     credentials_path = str(default_creds)
         
         logger.info(f"\n📚 Loading embedding model: {embedding_model}")
-        self.encoder = SentenceTransformer(embedding_model)
+        self.encoder = BatchingEncoder(acquire_model(embedding_model),
+                                       max_batch_size=encoder_max_batch_size,
+                                       max_wait_ms=encoder_max_wait_ms)
         self.embedding_model_name = embedding_model
+        self.query_cache = QueryEmbeddingCache(embedding_model, max_entries=query_cache_size,
+                                               persist_path=query_cache_path)
         logger.info(f"✓ Loaded embedding model")
         
-        logger.info(f"\n🔄 Loading reranker model: {reranker_model}")
-        self.reranker = None  # Disabled to avoid HuggingFace rate limits
+        self.reranker = None
         self.reranker_model_name = reranker_model
-        logger.info(f"✓ Loaded reranker model")
+        if rerank:
+            logger.info(f"\n🔄 Loading reranker model: {reranker_model}")
+            try:
+                self.reranker = CrossEncoderReranker(
+                    reranker_model,
+                    cache_dir=reranker_cache_dir,
+                    batch_size=rerank_batch_size,
+                    latency_budget_ms=rerank_latency_budget_ms
+                )
+                logger.info(f"✓ Loaded reranker model")
+            except Exception as e:
+                logger.warning(f"⚠ Reranker unavailable, using dense ranking only: {e}")
         
         logger.info(f"\n📊 Connecting to vector store: {vector_store_dir}")
         self.vector_store = VectorStore(
@@ -70,10 +146,33 @@ class AdvancedRetriever:
             use_gcs=use_gcs,
             bucket_name=bucket_name,
             project_id=project_id,
-            credentials_path=credentials_path
+            credentials_path=credentials_path,
+            backend=search_backend,
+            embeddings_dir=embeddings_dir,
+            snapshot_prefix=snapshot_prefix
         )
         logger.info(f"✓ Connected to vector store")
         
+        self.max_concurrency = max_concurrency
+        self.adaptive_depth = adaptive_depth
+        self.mmr_lambda = mmr_lambda
+        self.mmr_pool = mmr_pool
+        self.neighbor_window = neighbor_window
+        self._adjacency = None
+        self._adjacency_paths = (embeddings_dir, Path(vector_store_dir) / CHUNK_ADJACENCY_FILE)
+        self._adjacency_lock = threading.Lock()
+        self._executor = None
+        
+        # Keyword index persisted next to the vector store, built from texts.json
+        self.bm25 = None
+        self.rrf_k = rrf_k
+        if hybrid:
+            logger.info(f"\n🔤 Loading BM25 keyword index...")
+            try:
+                self.bm25 = BM25Index.open_or_build(embeddings_dir, Path(vector_store_dir) / BM25_INDEX_FILE)
+            except Exception as e:
+                logger.warning(f"⚠ BM25 index unavailable, using dense retrieval only: {e}")
+        
         logger.info("\n" + "=" * 80)
         logger.info("✅ ADVANCED RETRIEVER INITIALIZED!")
         logger.info("=" * 80 + "\n")
@@ -81,7 +180,11 @@ class AdvancedRetriever:
     def retrieve(self, 
                 query: str, 
                 k: int = 5, 
-                rerank_top_n: int = 20) -> List[Dict]:
+                rerank_top_n: int = 20,
+                where: Optional[Dict] = None,
+                adaptive: Optional[bool] = None,
+                neighbor_window: Optional[int] = None,
+                timer: Optional[StageTimer] = None) -> List[Dict]:
         """
         Retrieve with two-stage approach: dense retrieval + reranking
 
@@ -89,59 +192,205 @@ class AdvancedRetriever:
             query: User query
             k: Final number of documents to return
             rerank_top_n: Number of candidates to retrieve before reranking
+            where: Optional metadata filter, e.g. {"source_type": "handbook"};
+                filters on the partition field only search that partition
+            adaptive: Override the retriever's adaptive_depth setting. When on,
+                k is an upper bound and each result carries the per-query
+                decision under 'retrieval_plan'
+            neighbor_window: Override the retriever's neighbor_window setting
+            timer: Record stage timings into this timer (e.g. a caller's
+                per-request timer) instead of a new one
 
         Returns:
-            Top-k reranked documents (list of dict). Returns [] if no candidates found.
+            Top-k reranked documents (list of dict), each with the request's
+            per-stage 'timings' in ms. Returns [] if no candidates found.
         """
+        timer = timer or StageTimer()
+        adaptive = self.adaptive_depth if adaptive is None else adaptive
         logger.info(f"🔍 Query: '{query[:60]}...'")
         logger.info(f"   Stage 1: Retrieving top-{rerank_top_n} candidates...")
 
         # Stage 1: Dense retrieval
-        try:
-            query_embedding = self.encoder.encode(query, normalize_embeddings=True)
-        except Exception:
-            # fallback: encode without normalization if model doesn't support it
-            logger.exception("Failed to encode query with normalize_embeddings=True, retrying without normalization.")
-            query_embedding = self.encoder.encode(query)
+        with timer.stage('encode'):
+            query_embedding = self.encode_query(query)
 
         # Query the vector store
         try:
-            results = self.vector_store.query(
-                query_embedding=query_embedding,
-                n_results=rerank_top_n
-            )
+            # Candidate texts are only needed when a reranker will read all of them
+            with timer.stage('search'):
+                results = self.vector_store.query(
+                    query_embedding=query_embedding,
+                    n_results=rerank_top_n,
+                    where=where,
+                    include_documents=self.reranker is not None and not adaptive,
+                    include_embeddings=self.mmr_lambda is not None
+                )
         except Exception:
             logger.exception("vector_store.query() raised an exception. Returning empty results.")
             return []
 
+        candidates = self._build_candidates(results, 0)
+        if candidates is None:
+            return []
+
+        # If the query returns no items (empty collection), return early
+        if not candidates:
+            logger.info("   ✓ Retrieved 0 candidates (vector store empty or no match).")
+            return []
+
+        logger.info(f"   ✓ Retrieved {len(candidates)} candidates")
+
+        # Stage 2: Fusion and reranking
+        final_results = self._select_results(query, query_embedding, candidates, k, rerank_top_n, where,
+                                             adaptive, timer)
+        with timer.stage('hydrate'):
+            self._attach_documents(final_results)
+        with timer.stage('expand'):
+            final_results = self._expand_neighbors([final_results], neighbor_window)[0]
+
+        timings = timer.as_dict()
+        for doc in final_results:
+            doc['timings'] = dict(timings)
+        return final_results
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Bounded pool for encoding, search and reranking off the event loop"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix="retrieval")
+        return self._executor
+
+    def close(self):
+        """Stop worker threads and release the shared embedding model"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.encoder.close()
+        release_model(self.embedding_model_name)
+
+    async def aretrieve(self,
+                        query: str,
+                        k: int = 5,
+                        rerank_top_n: int = 20,
+                        where: Optional[Dict] = None,
+                        adaptive: Optional[bool] = None,
+                        neighbor_window: Optional[int] = None,
+                        timer: Optional[StageTimer] = None) -> List[Dict]:
+        """
+        Coroutine version of retrieve()
+
+        Encoding, search and reranking run on the retriever's bounded thread
+        pool, so the event loop stays free to serve other requests (e.g. LLM
+        calls awaiting a response) while this query is processed.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self.retrieve, query, k=k, rerank_top_n=rerank_top_n, where=where,
+                              adaptive=adaptive, neighbor_window=neighbor_window, timer=timer)
+        )
+
+    def retrieve_batch(self,
+                       queries: List[str],
+                       k: int = 5,
+                       rerank_top_n: int = 20,
+                       where: Optional[Dict] = None,
+                       adaptive: Optional[bool] = None,
+                       neighbor_window: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Retrieve for many queries at once: one batched encode, one batched
+        vector store round-trip, then per-query reranking
+
+        Args:
+            queries: List of user queries
+            k: Final number of documents to return per query
+            rerank_top_n: Number of candidates to retrieve per query before reranking
+            where: Optional metadata filter applied to every query
+            adaptive: Override the retriever's adaptive_depth setting
+            neighbor_window: Override the retriever's neighbor_window setting
+
+        Returns:
+            One list of top-k documents per query, in input order
+        """
+        if not queries:
+            return []
+        adaptive = self.adaptive_depth if adaptive is None else adaptive
+
+        logger.info(f"🔍 Batch of {len(queries)} queries: retrieving top-{rerank_top_n} candidates each...")
+
+        query_embeddings = self.query_cache.encode(queries, self._encode_uncached)
+
+        try:
+            results = self.vector_store.query_batch(query_embeddings, n_results=rerank_top_n, where=where,
+                                                    include_documents=self.reranker is not None and not adaptive,
+                                                    include_embeddings=self.mmr_lambda is not None)
+        except Exception:
+            logger.exception("vector_store.query_batch() raised an exception. Returning empty results.")
+            return [[] for _ in queries]
+
+        batch_results = []
+        for row, query in enumerate(queries):
+            candidates = self._build_candidates(results, row)
+            if not candidates:
+                batch_results.append([])
+                continue
+            batch_results.append(self._select_results(query, query_embeddings[row], candidates,
+                                                      k, rerank_top_n, where, adaptive))
+
+        # One text store lookup for the final documents of every query
+        self._attach_documents([doc for docs in batch_results for doc in docs])
+        batch_results = self._expand_neighbors(batch_results, neighbor_window)
+
+        logger.info(f"   ✓ Retrieved results for {len(batch_results)} queries")
+
+        return batch_results
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Encode a single query, reusing the cached embedding if it was seen before"""
+        return self.query_cache.encode([query], self._encode_uncached)[0]
+
+    def _encode_uncached(self, queries: List[str]) -> np.ndarray:
+        """Run the encoder, falling back to unnormalized output if needed"""
+        try:
+            return self.encoder.encode(queries, normalize_embeddings=True, convert_to_numpy=True)
+        except Exception:
+            # fallback: encode without normalization if model doesn't support it
+            logger.exception("Failed to encode queries with normalize_embeddings=True, retrying without normalization.")
+            return self.encoder.encode(queries, convert_to_numpy=True)
+
+    def _build_candidates(self, results: Dict, row: int) -> Optional[List[Dict]]:
+        """
+        Format one row of a Chroma-style result dict into candidate dicts.
+        Returns None if the result structure is unusable.
+        """
         # Defensive: ensure results structure is present and non-empty
         try:
             ids_batch = results.get('ids', [])
             docs_batch = results.get('documents', [])
             dists_batch = results.get('distances', [])
             metas_batch = results.get('metadatas', [])
+            embeddings_batch = results.get('embeddings')
         except Exception:
             logger.exception("Unexpected vector_store.query() return format.")
-            return []
+            return None
 
-        # If the query returns no items (empty collection), return early
-        if not ids_batch or not ids_batch[0]:
-            logger.info("   ✓ Retrieved 0 candidates (vector store empty or no match).")
+        if not ids_batch or len(ids_batch) <= row or not ids_batch[row]:
             return []
 
         # Format candidates safely (guard index accesses)
         candidates = []
-        num_items = len(ids_batch[0])
+        num_items = len(ids_batch[row])
         for i in range(num_items):
             doc_text = ""
-            if docs_batch and isinstance(docs_batch, list) and docs_batch and len(docs_batch[0]) > i:
-                doc_text = docs_batch[0][i]
+            if docs_batch and isinstance(docs_batch, list) and len(docs_batch) > row and len(docs_batch[row]) > i:
+                doc_text = docs_batch[row][i]
             dist = None
-            if dists_batch and isinstance(dists_batch, list) and dists_batch and len(dists_batch[0]) > i:
-                dist = dists_batch[0][i]
+            if dists_batch and isinstance(dists_batch, list) and len(dists_batch) > row and len(dists_batch[row]) > i:
+                dist = dists_batch[row][i]
             meta = {}
-            if metas_batch and isinstance(metas_batch, list) and metas_batch and len(metas_batch[0]) > i:
-                meta = metas_batch[0][i] or {}
+            if metas_batch and isinstance(metas_batch, list) and len(metas_batch) > row and metas_batch[row] and len(metas_batch[row]) > i:
+                meta = metas_batch[row][i] or {}
 
             dense_score = None
             if dist is not None:
@@ -150,69 +399,320 @@ class AdvancedRetriever:
                 except Exception:
                     dense_score = None
 
-            candidates.append({
-                'id': ids_batch[0][i],
+            candidate = {
+                'id': ids_batch[row][i],
                 'document': doc_text,
                 'dense_score': dense_score,
                 'metadata': meta
-            })
+            }
+            if embeddings_batch is not None and len(embeddings_batch) > row and len(embeddings_batch[row]) > i:
+                candidate['embedding'] = np.asarray(embeddings_batch[row][i], dtype=np.float32)
+            candidates.append(candidate)
 
-        logger.info(f"   ✓ Retrieved {len(candidates)} candidates")
+        return candidates
 
-        # Stage 2: Reranking
-        logger.info(f"   Stage 2: Reranking with cross-encoder...")
+    def _select_results(self,
+                        query: str,
+                        query_embedding: np.ndarray,
+                        candidates: List[Dict],
+                        k: int,
+                        rerank_top_n: int,
+                        where: Optional[Dict],
+                        adaptive: bool,
+                        timer: Optional[StageTimer] = None) -> List[Dict]:
+        """Fuse keyword hits into the dense candidates, rerank, then diversify down to the final results"""
+        timer = timer or StageTimer()
+        plan = None
+        if adaptive:
+            # Decided on the dense ranking, so the depth cut applies to it before
+            # fusion reorders the candidates and adds keyword-only hits
+            plan = plan_retrieval_depth([c['dense_score'] for c in candidates], k)
+            logger.info(f"   Adaptive depth: keep {plan['depth']}, return {plan['final_k']}, "
+                        f"rerank={plan['rerank']} ({plan['reason']})")
+            candidates = candidates[:plan['depth']]
+
+        # A plan that skips reranking has already fixed the top results, and
+        # keyword-only hits would only displace them; otherwise fusion may add
+        # hits but never grow the pool beyond the planned depth
+        if self.bm25 is not None and (plan is None or plan['rerank']):
+            with timer.stage('keyword_fusion'):
+                candidates = self._fuse_keyword_hits(query, query_embedding, candidates,
+                                                     rerank_top_n if plan is None else plan['depth'], where)
+
+        if plan is None:
+            with timer.stage('rerank'):
+                ranked = self._rerank_candidates(query, candidates, self._mmr_depth(k))
+            with timer.stage('diversify'):
+                return self._diversify(ranked, k)
+
+        with timer.stage('rerank'):
+            if plan['rerank']:
+                ranked = self._rerank_candidates(query, candidates, self._mmr_depth(plan['final_k']))
+            else:
+                ranked = self._dense_fallback(candidates, self._mmr_depth(plan['final_k']))
+        with timer.stage('diversify'):
+            final_results = self._diversify(ranked, plan['final_k'])
+        for doc in final_results:
+            doc['retrieval_plan'] = plan
+        return final_results
+
+    def _mmr_depth(self, k: int) -> int:
+        """How many ranked candidates to keep for the MMR stage"""
+        return k if self.mmr_lambda is None else max(k, self.mmr_pool)
+
+    def _diversify(self, ranked: List[Dict], k: int) -> List[Dict]:
+        """
+        Pick the final k from the ranked pool by maximal marginal relevance,
+        so near-duplicate chunks (overlapping windows, original and debiased
+        copies) do not crowd out other relevant documents
+        """
+        if self.mmr_lambda is None or len(ranked) <= 1:
+            return self._strip_embeddings(ranked[:k])
+
+        missing = [doc['id'] for doc in ranked if doc.get('embedding') is None]
+        if missing:
+            try:
+                fetched = self.vector_store.get_embeddings(missing)
+            except Exception:
+                logger.exception("Failed to fetch candidate embeddings; MMR treats them as unique.")
+                fetched = {}
+            for doc in ranked:
+                if doc['id'] in fetched:
+                    doc['embedding'] = fetched[doc['id']]
+
+        dim = next((len(doc['embedding']) for doc in ranked if doc.get('embedding') is not None), 0)
+        if dim == 0:
+            return self._strip_embeddings(ranked[:k])
+        embeddings = np.zeros((len(ranked), dim), dtype=np.float32)
+        for i, doc in enumerate(ranked):
+            if doc.get('embedding') is not None:
+                embeddings[i] = doc['embedding']
+
+        order = mmr_select(embeddings, self._mmr_relevance(ranked), k, lambda_mult=self.mmr_lambda)
+        final_results = [ranked[i] for i in order]
+        for i, doc in enumerate(final_results, 1):
+            doc['rank_before_mmr'] = doc['rank']
+            doc['rank'] = i
+
+        moved = sum(doc['rank'] != doc['rank_before_mmr'] for doc in final_results)
+        logger.info(f"   ✓ MMR (lambda={self.mmr_lambda}) picked {len(final_results)} of "
+                    f"{len(ranked)} candidates, {moved} changed rank")
+        return self._strip_embeddings(final_results)
+
+    @staticmethod
+    def _mmr_relevance(ranked: List[Dict]) -> np.ndarray:
+        """
+        Relevance of ranked candidates on a [0, 1] scale for MMR: min-max
+        scaled reranker, fused or dense scores, or rank-based when only some
+        candidates were reranked and the scores are not comparable
+        """
+        reranked = ['rerank_score' in doc for doc in ranked]
+        if all(reranked):
+            scores = np.array([doc['rerank_score'] for doc in ranked], dtype=np.float32)
+        elif not any(reranked) and all(doc.get('rrf_score') is not None for doc in ranked):
+            scores = np.array([doc['rrf_score'] for doc in ranked], dtype=np.float32)
+        elif not any(reranked) and all(doc.get('dense_score') is not None for doc in ranked):
+            scores = np.array([doc['dense_score'] for doc in ranked], dtype=np.float32)
+        else:
+            scores = -np.arange(len(ranked), dtype=np.float32)
+        spread = float(scores.max() - scores.min())
+        if spread <= 0:
+            return np.ones(len(ranked), dtype=np.float32)
+        return (scores - scores.min()) / spread
+
+    @staticmethod
+    def _strip_embeddings(docs: List[Dict]) -> List[Dict]:
+        """Drop candidate embeddings so results stay small and serializable"""
+        for doc in docs:
+            doc.pop('embedding', None)
+        return docs
+
+    def _fuse_keyword_hits(self,
+                           query: str,
+                           query_embedding: np.ndarray,
+                           candidates: List[Dict],
+                           top_n: int,
+                           where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Merge BM25 hits into the dense candidates with reciprocal rank fusion
+
+        Keyword-only hits get their dense score from the stored embedding so
+        every candidate carries the same fields. Returns the top_n fused
+        candidates, best first, each with rrf_score and bm25_score.
+        """
+        try:
+            # Overfetch when filtering, since the filter is applied after the keyword search
+            hits = self.bm25.search(query, k=top_n * 4 if where else top_n)
+            fetched = {}
+            if where and hits:
+                docs = self.vector_store.fetch_documents([doc_id for doc_id, _ in hits])
+                fetched = {doc_id: (text, meta) for doc_id, text, meta
+                           in zip(docs['ids'], docs['documents'], docs['metadatas'])}
+                hits = [(doc_id, score) for doc_id, score in hits if matches_where(fetched[doc_id][1], where)]
+            hits = hits[:top_n]
+        except Exception:
+            logger.exception("BM25 search failed; using dense candidates only.")
+            return candidates
 
+        bm25_scores = dict(hits)
+        fused = reciprocal_rank_fusion(
+            [[c['id'] for c in candidates], [doc_id for doc_id, _ in hits]], k=self.rrf_k
+        )[:top_n]
+
+        by_id = {c['id']: c for c in candidates}
+        keyword_only = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if keyword_only:
+            embeddings = self.vector_store.get_embeddings(keyword_only)
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+            for doc_id in keyword_only:
+                text, meta = fetched.get(doc_id, ("", {}))
+                dense_score = None
+                if doc_id in embeddings:
+                    e = embeddings[doc_id]
+                    dense_score = float(query_vector @ e / max(float(np.linalg.norm(e)), 1e-12))
+                by_id[doc_id] = {'id': doc_id, 'document': text or "", 'dense_score': dense_score,
+                                 'metadata': meta or {}}
+                if doc_id in embeddings:
+                    by_id[doc_id]['embedding'] = embeddings[doc_id]
+
+        merged = []
+        for doc_id, score in fused:
+            candidate = by_id[doc_id]
+            candidate['rrf_score'] = score
+            candidate['bm25_score'] = bm25_scores.get(doc_id)
+            merged.append(candidate)
+
+        logger.info(f"   ✓ Fused {len(candidates)} dense and {len(hits)} keyword candidates "
+                    f"({len(keyword_only)} keyword-only)")
+        return merged
+
+    def _attach_documents(self, docs: List[Dict]) -> List[Dict]:
+        """Fill in text and metadata for final results that were retrieved as ids only"""
+        pending = [doc for doc in docs if not doc.get('document')]
+        if not pending:
+            return docs
+        try:
+            fetched = self.vector_store.fetch_documents([doc['id'] for doc in pending])
+        except Exception:
+            logger.exception("Failed to fetch document texts; returning results without text.")
+            return docs
+        for doc, text, meta in zip(pending, fetched['documents'], fetched['metadatas']):
+            doc['document'] = text or ""
+            doc['metadata'] = meta or doc.get('metadata') or {}
+        return docs
+
+    @property
+    def chunk_adjacency(self) -> Optional[ChunkAdjacency]:
+        """Chunk adjacency map, loaded (or built) on first use; None if unavailable"""
+        with self._adjacency_lock:
+            if self._adjacency is None:
+                try:
+                    self._adjacency = ChunkAdjacency.open_or_build(*self._adjacency_paths)
+                except Exception as e:
+                    logger.warning(f"⚠ Chunk adjacency unavailable, neighbor expansion disabled: {e}")
+                    self._adjacency = False
+            return self._adjacency or None
+
+    def _expand_neighbors(self, batch_results: List[List[Dict]], window: Optional[int]) -> List[List[Dict]]:
+        """
+        Widen each query's results into contiguous windows of neighboring
+        chunks, merging windows that overlap so no text is sent twice
+
+        Neighbors come from the precomputed adjacency map and their texts
+        from one document lookup for the whole batch; no extra searches run.
+        Each result keeps the fields of the best-ranked hit in its window,
+        with 'document' replaced by the stitched window text and the hit's
+        own text kept under 'hit_document'.
+        """
+        window = self.neighbor_window if window is None else window
+        if not window or window <= 0 or not any(batch_results):
+            return batch_results
+        adjacency = self.chunk_adjacency
+        if adjacency is None:
+            return batch_results
+
+        spans_per_query = [adjacency.expand([doc['id'] for doc in docs], window) for docs in batch_results]
+
+        texts = {doc['id']: doc['document'] for docs in batch_results for doc in docs}
+        missing = list(dict.fromkeys(doc_id for spans in spans_per_query for span in spans
+                                     for doc_id in span if doc_id not in texts))
+        if missing:
+            try:
+                fetched = self.vector_store.fetch_documents(missing)
+                texts.update((doc_id, text) for doc_id, text in zip(missing, fetched['documents']) if text)
+            except Exception:
+                logger.exception("Failed to fetch neighboring chunks; returning unexpanded results.")
+                return batch_results
+
+        expanded_batch = []
+        for docs, spans in zip(batch_results, spans_per_query):
+            by_id = {doc['id']: doc for doc in docs}
+            expanded = []
+            for span in spans:
+                span = [doc_id for doc_id in span if doc_id in texts]
+                hits = [doc_id for doc_id in span if doc_id in by_id]
+                if not hits:
+                    continue
+                # The span was opened by its best-ranked hit
+                doc = dict(min((by_id[doc_id] for doc_id in hits), key=lambda d: d.get('rank', 0)))
+                doc['hit_document'] = doc['document']
+                doc['document'] = stitch_chunks([texts[doc_id] for doc_id in span])
+                doc['window_ids'] = span
+                doc['window_hits'] = hits
+                expanded.append(doc)
+            for i, doc in enumerate(expanded, 1):
+                doc['rank'] = i
+            expanded_batch.append(expanded)
+
+        logger.info(f"   ✓ Expanded results with ±{window} neighboring chunks "
+                    f"({sum(map(len, batch_results))} hits -> {sum(map(len, expanded_batch))} windows)")
+        return expanded_batch
+
+    def _dense_fallback(self, candidates: List[Dict], k: int) -> List[Dict]:
+        """Return top-k candidates ordered by fused score (when keyword hits were fused) or dense score"""
+        key = 'rrf_score' if any(c.get('rrf_score') is not None for c in candidates) else 'dense_score'
+        fallback_sorted = sorted(
+            [c for c in candidates if c.get(key) is not None],
+            key=lambda x: x[key],
+            reverse=True
+        )
+        final_results = fallback_sorted[:k]
+        for idx, doc in enumerate(final_results, 1):
+            doc['rank'] = idx
+            doc['similarity'] = doc.get('dense_score')
+        return final_results
+
+    def _rerank_candidates(self, query: str, candidates: List[Dict], k: int) -> List[Dict]:
+        """Stage 2: rerank candidates with the cross-encoder and keep the top-k"""
         # Defensive: if no candidates, skip reranker
         if not candidates:
             logger.info("   No candidates to rerank; returning empty result set.")
             return []
 
-        # CrossEncoder expects list of tuples (query, doc_text). Use tuples for pairs.
-        pairs = [(query, doc['document']) for doc in candidates]
+        if self.reranker is None:
+            return self._dense_fallback(candidates, k)
+
+        logger.info(f"   Stage 2: Reranking with cross-encoder...")
+
+        # Candidates that arrived as ids only (keyword hits, adaptive mode) need their text
+        self._attach_documents(candidates)
 
-        # Defensive call to reranker: catch errors (including empty input or unexpected exceptions)
         try:
-            rerank_scores = self.reranker.predict(pairs)
-        except IndexError as e:
-            # This may occur if reranker receives empty list — should be avoided by checks above.
-            logger.exception("Reranker IndexError (likely empty input). Returning dense-ranked candidates.")
-            # Fall back: return top-k by dense_score if available
-            fallback_sorted = sorted(
-                [c for c in candidates if c['dense_score'] is not None],
-                key=lambda x: x['dense_score'],
-                reverse=True
-            )
-            final_results = fallback_sorted[:k]
-            for idx, doc in enumerate(final_results, 1):
-                doc['rank'] = idx
-                doc['similarity'] = doc.get('dense_score')
-            return final_results
+            rerank_scores = self.reranker.score(query, candidates)
         except Exception:
             logger.exception("Unexpected error during reranking. Returning dense-ranked candidates as fallback.")
-            fallback_sorted = sorted(
-                [c for c in candidates if c['dense_score'] is not None],
-                key=lambda x: x['dense_score'],
-                reverse=True
-            )
-            final_results = fallback_sorted[:k]
-            for idx, doc in enumerate(final_results, 1):
-                doc['rank'] = idx
-                doc['similarity'] = doc.get('dense_score')
-            return final_results
-
-        # Add reranking scores (ensure lengths match)
-        if len(rerank_scores) != len(candidates):
-            logger.warning("Reranker returned %d scores but there are %d candidates. Truncating/padding as needed.",
-                           len(rerank_scores), len(candidates))
-
-        for i, doc in enumerate(candidates):
-            score = float(rerank_scores[i]) if i < len(rerank_scores) else (doc.get('dense_score') or 0.0)
-            doc['rerank_score'] = score
+            return self._dense_fallback(candidates, k)
+
+        for i, (doc, score) in enumerate(zip(candidates, rerank_scores)):
             doc['rank_before_rerank'] = i + 1
+            if score is not None:
+                doc['rerank_score'] = score
 
-        # Sort by rerank score and build final list
-        reranked = sorted(candidates, key=lambda x: x.get('rerank_score', 0.0), reverse=True)
-        final_results = reranked[:k]
+        # Candidates left unscored by the latency budget keep their dense order after the scored ones
+        scored = sorted((c for c in candidates if 'rerank_score' in c), key=lambda x: x['rerank_score'], reverse=True)
+        unscored = [c for c in candidates if 'rerank_score' not in c]
+        final_results = (scored + unscored)[:k]
 
         for i, doc in enumerate(final_results, 1):
             doc['rank'] = i
@@ -237,13 +737,10 @@ class AdvancedRetriever:
         advanced_results = self.retrieve(query, k=k)
         
         # Get baseline results (dense only)
-        try:
-            query_embedding = self.encoder.encode(query, normalize_embeddings=True)
-        except Exception:
-            query_embedding = self.encoder.encode(query)
+        query_embedding = self.encode_query(query)
 
         try:
-            baseline_query = self.vector_store.query(query_embedding, n_results=k)
+            baseline_query = self.vector_store.query(query_embedding, n_results=k, include_documents=False)
         except Exception:
             logger.exception("vector_store.query() failed during baseline compare.")
             baseline_query = {'ids': [[]], 'distances': [[]]}
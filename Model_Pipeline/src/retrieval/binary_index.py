@@ -0,0 +1,188 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .numpy_backend import NumpyBackend
+except ImportError:
+    from numpy_backend import NumpyBackend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BINARY_INDEX_FILE = "binary_index.npz"
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(words)
+else:
+    # NumPy < 2.0: count set bits byte-wise through a lookup table
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        counts = _BYTE_POPCOUNT[words.view(np.uint8)]
+        return counts.reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_sign_bits(vectors: np.ndarray) -> np.ndarray:
+    """
+    One bit per dimension (set where the value is positive), packed into
+    uint64 words
+
+    Returns:
+        Array of shape (num_vectors, ceil(dim / 64)), dtype uint64
+    """
+    vectors = np.asarray(vectors)
+    bits = np.packbits(vectors > 0, axis=1, bitorder='little')
+    padding = (-bits.shape[1]) % 8
+    if padding:
+        bits = np.pad(bits, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def hamming_distances(query_codes: np.ndarray, word_columns: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance of every query code to every row code
+
+    Args:
+        query_codes: (num_queries, words) uint64
+        word_columns: (words, num_rows) uint64, i.e. codes stored word-major so
+            each XOR/popcount pass runs over one contiguous array
+
+    Returns:
+        (num_queries, num_rows) distances in bits
+    """
+    num_words, num_rows = word_columns.shape
+    distances = np.zeros((len(query_codes), num_rows), dtype=np.uint16)
+    diff = np.empty(num_rows, dtype=np.uint64)
+    for qi, query in enumerate(query_codes):
+        for w in range(num_words):
+            np.bitwise_xor(word_columns[w], query[w], out=diff)
+            distances[qi] += _popcount(diff)
+    return distances
+
+
+class BinaryIndex:
+    """
+    Sign-bit codes of every embedding, packed into uint64 words.
+
+    A 768-d float32 vector (3 KB) becomes twelve 64-bit words (96 bytes),
+    32x smaller, and the Hamming distance between codes (XOR + popcount)
+    tracks the angle between the original vectors closely enough to
+    shortlist candidates for exact cosine rescoring. Codes are stored
+    word-major (one contiguous array per 64 dimensions), so scoring the
+    corpus is one XOR + popcount sweep per word.
+    """
+
+    def __init__(self, codes: np.ndarray, dim: int):
+        self.codes = codes      # (ceil(dim / 64), num_vectors) uint64, word-major
+        self.dim = dim
+
+    def __len__(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """RAM held by the index"""
+        return int(self.codes.nbytes)
+
+    @classmethod
+    def build(cls, embeddings, block_size: int = 65536) -> "BinaryIndex":
+        """
+        Encode every row of embeddings
+
+        Args:
+            embeddings: Row-sliceable matrix (np.memmap or QuantizedMatrix)
+            block_size: Rows encoded at a time
+        """
+        num_vectors, dim = embeddings.shape
+        t0 = time.perf_counter()
+        codes = np.empty(((dim + 63) // 64, num_vectors), dtype=np.uint64)
+        for start in range(0, num_vectors, block_size):
+            block = embeddings[start:start + block_size]
+            codes[:, start:start + len(block)] = pack_sign_bits(block).T
+        logger.info(f"✓ Built binary index: {num_vectors} x {dim} bits "
+                    f"({codes.nbytes / 1024 / 1024:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+        return cls(codes, dim)
+
+    def save(self, path: str, **info):
+        """Save the codes (and any fingerprint fields in info) to an .npz file"""
+        np.savez(path, codes=self.codes, **{f"info_{key}": np.asarray(value) for key, value in info.items()})
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BinaryIndex", Dict]:
+        """Load an index saved with save(); returns (index, info)"""
+        with np.load(path) as data:
+            info = {key[5:]: data[key].item() for key in data.files if key.startswith("info_")}
+            index = cls(data['codes'], int(info.get('dim', data['codes'].shape[0] * 64)))
+        return index, info
+
+    @classmethod
+    def open_or_build(cls, embeddings, index_path: str, block_size: int = 65536) -> "BinaryIndex":
+        """
+        Load the index at index_path, rebuilding it when it is missing or
+        was built for different embeddings (shape, format or artifact file
+        size/mtime)
+        """
+        index_path = Path(index_path)
+        fingerprint = embeddings.fingerprint()
+
+        if index_path.exists():
+            index, info = cls.load(str(index_path))
+            if info == fingerprint:
+                return index
+            logger.warning(f"⚠ {index_path} was built for {info}; rebuilding")
+
+        index = cls.build(embeddings, block_size=block_size)
+        index.save(str(index_path), **fingerprint)
+        logger.info(f"✓ Saved binary index: {index_path}")
+        return index
+
+
+class BinaryBackend(NumpyBackend):
+    """
+    Hamming-distance prefilter over sign-bit codes held in RAM, with exact
+    float32 rescoring of the n_results * rescore_factor shortlisted rows
+    against the memory-mapped embedding matrix.
+
+    The codes are built by load_and_index_embeddings() (or on first use)
+    and cached next to the embeddings as binary_index.npz.
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 rescore_factor: int = 20,
+                 index_path: Optional[str] = None,
+                 **kwargs):
+        """
+        Args:
+            embeddings_dir: Directory with the embedding artifacts
+            rescore_factor: Shortlist size as a multiple of n_results
+            index_path: Index file (defaults to embeddings_dir/binary_index.npz)
+        """
+        super().__init__(embeddings_dir, **kwargs)
+        self.rescore_factor = rescore_factor
+        self.index = BinaryIndex.open_or_build(
+            self.embeddings,
+            index_path or self.embeddings_dir / BINARY_INDEX_FILE,
+            block_size=self.block_size
+        )
+
+        logger.info(
+            f"✓ Binary backend ready: {self.count()} vectors, {self.index.codes.shape[0]} words/vector, "
+            f"{self.index.nbytes / 1024 / 1024:.1f} MB in RAM, rescoring x{rescore_factor} in float32"
+        )
+
+    def _search(self, queries, n_results, mask):
+        query_codes = pack_sign_bits(queries)
+
+        def hamming_block(start, end):
+            # Fewer differing bits is better; _scan keeps the highest scores
+            return -hamming_distances(query_codes, self.index.codes[:, start:end]).astype(np.float32)
+
+        shortlist = min(n_results * self.rescore_factor, self.count())
+        candidates, candidate_scores = self._scan(hamming_block, shortlist, mask)
+        return self._rescore(queries, candidates, candidate_scores, n_results)
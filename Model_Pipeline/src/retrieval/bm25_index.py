@@ -0,0 +1,244 @@
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .indexing import content_hash_ids, first_occurrence_rows
+    from .text_store import source_fingerprint
+except ImportError:
+    from indexing import content_hash_ids, first_occurrence_rows
+    from text_store import source_fingerprint
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BM25_INDEX_FILE = "bm25_index.npz"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about an and are as at be been but by can could did do does for from had has have how i if in
+into is it its me my of on or our should so than that the their them then there these they this
+to was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens, stopwords and single characters dropped"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def matches_where(metadata: Optional[Dict], where: Optional[Dict]) -> bool:
+    """Evaluate a Chroma-style where clause against one metadata dict"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, target in condition.items():
+                if op == '$eq' and value != target:
+                    return False
+                if op == '$ne' and value == target:
+                    return False
+                if op == '$in' and value not in target:
+                    return False
+                if op == '$nin' and value in target:
+                    return False
+                if op not in ('$eq', '$ne', '$in', '$nin'):
+                    raise ValueError(f"Unsupported where operator for keyword search: {op}")
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index in CSR layout.
+
+    Postings for term t are doc_rows[indptr[t]:indptr[t + 1]] with matching
+    term frequencies in tfs, so a query touches only the postings of its
+    own terms and scores them with a few vectorized numpy operations. The
+    per-document length normalization is precomputed at load time.
+    """
+
+    def __init__(self,
+                 vocabulary: np.ndarray,
+                 indptr: np.ndarray,
+                 doc_rows: np.ndarray,
+                 tfs: np.ndarray,
+                 doc_lengths: np.ndarray,
+                 ids: np.ndarray,
+                 k1: float = 1.2,
+                 b: float = 0.75):
+        self.term_ids = {term: i for i, term in enumerate(vocabulary.tolist())}
+        self.indptr = indptr
+        self.doc_rows = doc_rows
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.ids = ids
+        self.k1 = k1
+        self.b = b
+
+        num_docs = len(doc_lengths)
+        avg_length = float(doc_lengths.mean()) if num_docs else 0.0
+        self._doc_norm = (k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+        df = np.diff(indptr).astype(np.float32)
+        self._idf = np.log1p((num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: List[str], ids: List[str], **kwargs) -> "BM25Index":
+        """
+        Build an index over texts
+
+        Args:
+            texts: Document texts
+            ids: Document ids aligned with texts
+        """
+        t0 = time.perf_counter()
+        term_ids: Dict[str, int] = {}
+        token_ids: List[int] = []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[row] = len(tokens)
+            token_ids.extend(term_ids.setdefault(t, len(term_ids)) for t in tokens)
+
+        # One (term, row) key per token; a sort-and-count yields postings grouped by term
+        num_docs = max(len(texts), 1)
+        keys = np.asarray(token_ids, dtype=np.int64) * num_docs + np.repeat(
+            np.arange(len(texts), dtype=np.int64), doc_lengths
+        )
+        keys, tfs = np.unique(keys, return_counts=True)
+        posting_terms = keys // num_docs
+        indptr = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(term_ids)), out=indptr[1:])
+
+        vocabulary = np.array(sorted(term_ids, key=term_ids.get), dtype=str)
+        index = cls(
+            vocabulary,
+            indptr,
+            (keys % num_docs).astype(np.int32),
+            np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16),
+            doc_lengths,
+            np.asarray(ids, dtype=str),
+            **kwargs
+        )
+        logger.info(f"✓ Built BM25 index: {len(texts)} documents, {len(term_ids)} terms, "
+                    f"{len(keys)} postings ({time.perf_counter() - t0:.2f}s)")
+        return index
+
+    def save(self, path: str, source_fingerprint: Optional[Dict] = None):
+        """Write the index to one .npz file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            vocabulary=np.array(sorted(self.term_ids, key=self.term_ids.get), dtype=str),
+            indptr=self.indptr,
+            doc_rows=self.doc_rows,
+            tfs=self.tfs,
+            doc_lengths=self.doc_lengths,
+            ids=self.ids,
+            info_=np.array(json.dumps({'source': source_fingerprint, 'k1': self.k1, 'b': self.b}))
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BM25Index", Dict]:
+        """Load an index and the info it was saved with"""
+        with np.load(path) as data:
+            info = json.loads(str(data['info_']))
+            index = cls(data['vocabulary'], data['indptr'], data['doc_rows'], data['tfs'],
+                        data['doc_lengths'], data['ids'], k1=info['k1'], b=info['b'])
+        return index, info
+
+    @classmethod
+    def open_or_build(cls, input_dir: str, index_path: str) -> "BM25Index":
+        """
+        Load the index at index_path, (re)building it from input_dir's
+        texts.json and metadata.json when it is missing or older than them
+        """
+        input_dir, index_path = Path(input_dir), Path(index_path)
+        fingerprint = source_fingerprint(input_dir)
+
+        if index_path.exists():
+            index, info = cls.load(str(index_path))
+            # A shipped index without its JSON sources is used as-is
+            if fingerprint is None or info.get('source') == fingerprint:
+                logger.info(f"✓ Loaded BM25 index: {len(index)} documents from {index_path}")
+                return index
+            logger.info("BM25 index is stale; rebuilding from texts.json")
+        elif fingerprint is None:
+            raise FileNotFoundError(f"No BM25 index at {index_path} and no texts.json/metadata.json in {input_dir}")
+
+        with open(input_dir / "texts.json", 'r', encoding='utf-8') as f:
+            texts = json.load(f)
+        with open(input_dir / "metadata.json", 'r', encoding='utf-8') as f:
+            metadatas = json.load(f)
+
+        # Same ids as the vector store; duplicate chunks are indexed once
+        ids = content_hash_ids(texts, metadatas)
+        rows = first_occurrence_rows(ids)
+        index = cls.build([texts[row] for row in rows], [ids[row] for row in rows])
+        index.save(str(index_path), source_fingerprint=fingerprint)
+        return index
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Top-k documents for a query
+
+        Returns:
+            (document id, BM25 score) pairs, best first; documents sharing no
+            term with the query are never returned
+        """
+        term_ids = {self.term_ids[t] for t in tokenize(query) if t in self.term_ids}
+        if not term_ids or k <= 0:
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            rows = self.doc_rows[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            # rows are unique within one term's postings, so fancy += is safe
+            scores[rows] += self._idf[term_id] * tf * (self.k1 + 1) / (tf + self._doc_norm[rows])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        return [(str(self.ids[row]), float(scores[row])) for row in hits]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merge ranked id lists with reciprocal rank fusion
+
+    Each id scores sum(1 / (k + rank)) over the lists it appears in (rank
+    starting at 1), so agreement between retrievers outweighs a single high
+    rank while raw score scales never need to be comparable.
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,220 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .indexing import content_hash_ids
+    from .text_store import source_fingerprint
+except ImportError:
+    from indexing import content_hash_ids
+    from text_store import source_fingerprint
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_ADJACENCY_FILE = "chunk_adjacency.json"
+
+
+def document_groups(metadatas: Sequence[Dict]) -> List[List[int]]:
+    """
+    Rows of the corpus grouped per source document, in reading order
+
+    Rows with a parent_id (written by GCSDataLoader for chunked records) are
+    grouped by it and ordered by chunk_index. Metadata without parent_id
+    (older artifacts, records that were never split) falls back to runs of
+    consecutive rows sharing source type, title and url.
+    """
+    by_parent: Dict[str, List[int]] = {}
+    groups: List[List[int]] = []
+    run_key = None
+    for row, meta in enumerate(metadatas):
+        meta = meta or {}
+        parent = meta.get('parent_id')
+        if parent is not None:
+            by_parent.setdefault(parent, []).append(row)
+            run_key = None
+            continue
+        key = (meta.get('source_type'), meta.get('title'), meta.get('url'))
+        if key == run_key and key != (None, None, None):
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+            run_key = key
+
+    for rows in by_parent.values():
+        rows.sort(key=lambda row: metadatas[row].get('chunk_index', 0))
+        groups.append(rows)
+    return groups
+
+
+def stitch_chunks(texts: List[str], max_overlap: int = 1000, min_overlap: int = 20) -> str:
+    """
+    Join consecutive chunks into one passage, writing the text they overlap
+    by only once
+
+    The overlap is the longest prefix of each chunk (up to max_overlap
+    characters) that the previous chunk ends with. Shorter matches than
+    min_overlap are coincidences ("the" + "elephant"), not the loader's
+    chunk overlap, so those chunks are joined with a blank line instead.
+    """
+    if not texts:
+        return ""
+    merged = texts[0]
+    for text in texts[1:]:
+        overlap = 0
+        for size in range(min(max_overlap, len(merged), len(text)), min_overlap - 1, -1):
+            if merged.endswith(text[:size]):
+                overlap = size
+                break
+        merged = merged + text[overlap:] if overlap else merged + "\n\n" + text
+    return merged
+
+
+class ChunkAdjacency:
+    """
+    Previous/next chunk of every chunk id within its source document.
+
+    Built once from metadata.json and persisted as JSON next to the vector
+    store, so expanding a hit into its surrounding window is a handful of
+    dictionary lookups rather than further vector searches.
+    """
+
+    def __init__(self, neighbors: Dict[str, List[Optional[str]]]):
+        """
+        Args:
+            neighbors: Chunk id -> [previous chunk id, next chunk id] (None at document edges)
+        """
+        self.neighbors = neighbors
+
+    def __len__(self) -> int:
+        return len(self.neighbors)
+
+    @classmethod
+    def build(cls, ids: List[str], metadatas: List[Dict]) -> "ChunkAdjacency":
+        """
+        Build the adjacency map for a corpus
+
+        Args:
+            ids: Chunk ids aligned with metadatas (duplicate ids keep the
+                neighbors of their first occurrence)
+            metadatas: Per-chunk metadata
+        """
+        t0 = time.perf_counter()
+        neighbors: Dict[str, List[Optional[str]]] = {}
+        for rows in document_groups(metadatas):
+            for i, row in enumerate(rows):
+                if ids[row] in neighbors:
+                    continue
+                prev_id = ids[rows[i - 1]] if i > 0 else None
+                next_id = ids[rows[i + 1]] if i + 1 < len(rows) else None
+                neighbors[ids[row]] = [prev_id if prev_id != ids[row] else None,
+                                       next_id if next_id != ids[row] else None]
+        linked = sum(1 for prev_id, next_id in neighbors.values() if prev_id or next_id)
+        logger.info(f"✓ Built chunk adjacency: {len(neighbors)} chunks, {linked} with neighbors "
+                    f"({time.perf_counter() - t0:.2f}s)")
+        return cls(neighbors)
+
+    def save(self, path: str, source_fingerprint: Optional[Dict] = None):
+        """Write the adjacency map to one JSON file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': source_fingerprint, 'neighbors': self.neighbors}, f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def open_or_build(cls, input_dir: str, index_path: str) -> "ChunkAdjacency":
+        """
+        Load the adjacency map at index_path, (re)building it from
+        input_dir's texts.json and metadata.json when it is missing or
+        older than them
+        """
+        input_dir, index_path = Path(input_dir), Path(index_path)
+        fingerprint = source_fingerprint(input_dir)
+
+        if index_path.exists():
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # A shipped map without its JSON sources is used as-is
+            if fingerprint is None or data.get('source') == fingerprint:
+                logger.info(f"✓ Loaded chunk adjacency: {len(data['neighbors'])} chunks from {index_path}")
+                return cls(data['neighbors'])
+            logger.info("Chunk adjacency is stale; rebuilding from metadata.json")
+        elif fingerprint is None:
+            raise FileNotFoundError(f"No chunk adjacency at {index_path} and no texts.json/metadata.json in {input_dir}")
+
+        with open(input_dir / "texts.json", 'r', encoding='utf-8') as f:
+            texts = json.load(f)
+        with open(input_dir / "metadata.json", 'r', encoding='utf-8') as f:
+            metadatas = json.load(f)
+
+        # Same ids as the vector store
+        adjacency = cls.build(content_hash_ids(texts, metadatas), metadatas)
+        adjacency.save(str(index_path), source_fingerprint=fingerprint)
+        return adjacency
+
+    def _step(self, doc_id: str, direction: int) -> Tuple[Optional[str], bool]:
+        """
+        Neighbor of doc_id in direction (0 = previous, 1 = next), and whether
+        that neighbor links back to doc_id
+
+        A chunk duplicated across documents has one id but keeps only the
+        neighbors of its first occurrence, so a link into it from another
+        document is one-way. Walks include such a chunk but stop there
+        rather than follow it into the other document.
+        """
+        neighbor = self.neighbors.get(doc_id, [None, None])[direction]
+        if neighbor is None:
+            return None, False
+        return neighbor, self.neighbors.get(neighbor, [None, None])[1 - direction] == doc_id
+
+    def _walk(self, doc_id: str, direction: int, steps: Optional[int], allowed=None, taken=()) -> List[str]:
+        """Ids reached from doc_id in one direction, nearest first"""
+        path = []
+        current = doc_id
+        while steps is None or len(path) < steps:
+            neighbor, mutual = self._step(current, direction)
+            if (neighbor is None or neighbor == doc_id or neighbor in path or neighbor in taken
+                    or (allowed is not None and neighbor not in allowed)):
+                break
+            path.append(neighbor)
+            if not mutual:
+                break
+            current = neighbor
+        return path
+
+    def window(self, doc_id: str, before: int = 1, after: int = 1) -> List[str]:
+        """Ids of up to before/after neighboring chunks around doc_id, in document order"""
+        return self._walk(doc_id, 0, before)[::-1] + [doc_id] + self._walk(doc_id, 1, after)
+
+    def expand(self, hit_ids: List[str], window: int = 1) -> List[List[str]]:
+        """
+        Expand ranked hits into contiguous windows of chunks
+
+        Each hit is widened by window chunks on both sides; windows that
+        overlap or touch within a document are merged into one span, so no
+        chunk appears twice.
+
+        Returns:
+            One list of chunk ids per span, in document order, ordered by the
+            best-ranked hit each span contains (every hit is in some span)
+        """
+        selected = set()
+        for doc_id in hit_ids:
+            selected.update(self.window(doc_id, window, window))
+
+        spans = []
+        emitted = set()
+        for doc_id in hit_ids:
+            if doc_id in emitted:
+                continue
+            # Walk outwards from the hit while neighbors are part of some hit's window
+            before = self._walk(doc_id, 0, None, allowed=selected, taken=emitted)
+            after = self._walk(doc_id, 1, None, allowed=selected, taken=emitted.union(before))
+            span = before[::-1] + [doc_id] + after
+            emitted.update(span)
+            spans.append(span)
+        return spans
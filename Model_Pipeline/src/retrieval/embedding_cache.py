@@ -0,0 +1,187 @@
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a query: Unicode NFKC, trimmed, runs of whitespace
+    collapsed. Case is kept because it can change the embedding.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+class QueryEmbeddingCache:
+    """
+    Query embeddings keyed by (model name, normalized query text).
+
+    An in-memory LRU bounded to max_entries sits in front of an optional
+    SQLite file, so repeated questions skip the encoder both within a
+    process and across restarts. Safe to share between threads.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 max_entries: int = 10000,
+                 persist_path: Optional[str] = None,
+                 max_persisted: int = 200000):
+        """
+        Args:
+            model_name: Embedding model the vectors come from (part of the key)
+            max_entries: In-memory LRU capacity (0 disables the memory tier)
+            persist_path: SQLite file for the on-disk tier (None for memory only)
+            max_persisted: Rows kept on disk; the oldest are pruned beyond this
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_persisted = max_persisted
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if persist_path:
+            Path(persist_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " model TEXT NOT NULL, query TEXT NOT NULL, dim INTEGER NOT NULL,"
+                " embedding BLOB NOT NULL, PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+            logger.info(f"✓ Query embedding cache persisted to: {persist_path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Cached embedding for a query, or None"""
+        key = normalize_query(query)
+        with self._lock:
+            embedding = self._lookup(key)
+            if embedding is None:
+                self.misses += 1
+            return embedding
+
+    def put(self, query: str, embedding: np.ndarray):
+        """Store the embedding for a query"""
+        with self._lock:
+            self._store({normalize_query(query): np.asarray(embedding, dtype=np.float32)})
+
+    def encode(self,
+               queries: Sequence[str],
+               encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings for queries, calling encode_fn once for the cache misses
+
+        Args:
+            queries: Query strings
+            encode_fn: Encodes a list of queries into a 2-D array
+
+        Returns:
+            Array of shape (len(queries), dim), in input order
+        """
+        keys = [normalize_query(q) for q in queries]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                embedding = self._lookup(key)
+                if embedding is not None:
+                    found[key] = embedding
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            self.misses += len(missing)
+
+        if missing:
+            # Encode outside the lock so other threads can still read the cache
+            encoded = np.asarray(encode_fn(missing), dtype=np.float32).reshape(len(missing), -1)
+            new_entries = dict(zip(missing, encoded))
+            found.update(new_entries)
+            with self._lock:
+                self._store(new_entries)
+
+        return np.stack([found[key] for key in keys])
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop all cached embeddings for this model and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_embeddings WHERE model = ?", (self.model_name,))
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        """Memory tier, then disk tier; caller holds the lock"""
+        embedding = self._entries.get(key)
+        if embedding is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT dim, embedding FROM query_embeddings WHERE model = ? AND query = ?",
+            (self.model_name, key)
+        ).fetchone()
+        if row is None:
+            return None
+        embedding = np.frombuffer(row[1], dtype=np.float32, count=row[0]).copy()
+        self._remember(key, embedding)
+        self.disk_hits += 1
+        return embedding
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, entries: Dict[str, np.ndarray]):
+        """Add entries to both tiers; caller holds the lock"""
+        for key, embedding in entries.items():
+            self._remember(key, embedding)
+
+        if self._db is None or not entries:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (model, query, dim, embedding) VALUES (?, ?, ?, ?)",
+            [(self.model_name, key, int(e.shape[0]), e.astype(np.float32).tobytes()) for key, e in entries.items()]
+        )
+        self._db.execute(
+            "DELETE FROM query_embeddings WHERE rowid <= "
+            "(SELECT MAX(rowid) FROM query_embeddings) - ?",
+            (self.max_persisted,)
+        )
+        self._db.commit()
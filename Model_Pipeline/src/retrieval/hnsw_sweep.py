@@ -0,0 +1,232 @@
+"""
+HNSW parameter sweep for the Chroma vector store
+
+Builds one throwaway collection per (M, construction_ef) setting from the
+embedding artifacts, then queries it at every search_ef (a query-time
+setting) and measures build time, on-disk index size, single-query p50/p99
+latency and recall@k against exact brute-force search.
+
+Usage:
+    python src/retrieval/hnsw_sweep.py --embeddings-dir models/embeddings \
+        --m 8 16 32 --construction-ef 100 200 --search-ef 10 50 100
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+try:
+    from .numpy_backend import ExactSearchBackend
+    from .vector_store import VectorStore
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from numpy_backend import ExactSearchBackend
+    from vector_store import VectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _directory_size(path: Path) -> int:
+    """Total bytes of all files under path"""
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+def _set_search_ef(collection, search_ef: int):
+    """Change the query-time search_ef of a built collection in place"""
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": int(search_ef)}})
+    except Exception:
+        # Older Chroma versions read HNSW settings from the collection metadata
+        metadata = {key: value for key, value in (collection.metadata or {}).items() if key != "hnsw:space"}
+        metadata["hnsw:search_ef"] = int(search_ef)
+        collection.modify(metadata=metadata)
+
+
+def _close_client(client):
+    """Stop a Chroma client so the files it holds open can be deleted"""
+    system = getattr(client, "_system", None)
+    if system is not None:
+        system.stop()
+    client.clear_system_cache()
+
+
+def pareto_front(rows: List[Dict], recall_key: str, latency_key: str = 'p50_ms') -> List[bool]:
+    """
+    Flag settings that no other setting beats on both recall and latency
+
+    Returns:
+        One bool per row, True if the row is Pareto-optimal
+    """
+    flags = []
+    for row in rows:
+        dominated = any(
+            other[recall_key] >= row[recall_key] and other[latency_key] <= row[latency_key]
+            and (other[recall_key] > row[recall_key] or other[latency_key] < row[latency_key])
+            for other in rows
+        )
+        flags.append(not dominated)
+    return flags
+
+
+def run_sweep(embeddings_dir: str,
+              m_values: Sequence[int] = (8, 16, 32),
+              construction_ef_values: Sequence[int] = (100, 200),
+              search_ef_values: Sequence[int] = (10, 50, 100),
+              k: int = 10,
+              num_queries: int = 200,
+              batch_size: int = 1000,
+              seed: int = 42) -> Dict:
+    """
+    Sweep HNSW parameters over a grid
+
+    Queries are sampled from the corpus itself; ground truth is the exact
+    top-k from ExactSearchBackend over the same artifacts, so recall reflects
+    only the approximation error of the HNSW graph.
+
+    Args:
+        embeddings_dir: Directory with the embedding matrix, texts.json and metadata.json
+        m_values: Values of M (graph out-degree) to try
+        construction_ef_values: Values of construction_ef to try
+        search_ef_values: Values of search_ef to try
+        k: Number of results per query
+        num_queries: Number of sampled queries
+        batch_size: Rows per collection write while building
+        seed: Random seed for query sampling
+
+    Returns:
+        Dictionary with the sweep configuration and one result row per setting
+    """
+    exact = ExactSearchBackend(embeddings_dir)
+    embeddings = exact.embeddings
+    texts, metadatas = exact.text_store.get_rows(range(exact.count()))
+    k = min(k, exact.count())
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False))
+    queries = np.asarray(embeddings[sample], dtype=np.float32)
+
+    logger.info(f"Computing exact top-{k} ground truth for {len(queries)} queries...")
+    truth = exact.query(queries, n_results=k)['ids']
+
+    recall_key = f'recall@{k}'
+    rows = []
+    for m, construction_ef in itertools.product(m_values, construction_ef_values):
+        logger.info(f"\n🔧 Building index with M={m}, construction_ef={construction_ef}")
+        work_dir = Path(tempfile.mkdtemp(prefix="hnsw_sweep_"))
+        store = None
+        try:
+            store = VectorStore(
+                collection_name="hnsw_sweep",
+                persist_directory=str(work_dir),
+                backend="chroma",
+                partition_by=None,
+                hnsw_params={"M": m, "construction_ef": construction_ef, "search_ef": search_ef_values[0]}
+            )
+
+            t0 = time.perf_counter()
+            store.add_documents(texts, embeddings[:len(embeddings)], metadatas, batch_size=batch_size)
+            build_seconds = time.perf_counter() - t0
+
+            # search_ef only affects queries, so every value reuses this build
+            build_rows = []
+            for search_ef in search_ef_values:
+                _set_search_ef(store.collection, search_ef)
+
+                latencies = []
+                found = []
+                for query in queries:
+                    t0 = time.perf_counter()
+                    result = store.collection.query(query_embeddings=[query.tolist()], n_results=k)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    found.append(result['ids'][0])
+
+                recall = float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+                build_rows.append({
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    'build_seconds': build_seconds,
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p99_ms': float(np.percentile(latencies, 99)),
+                    recall_key: recall
+                })
+
+            index_bytes = _directory_size(work_dir)
+            for row in build_rows:
+                row['index_bytes'] = index_bytes
+            rows.extend(build_rows)
+        finally:
+            if store is not None:
+                _close_client(store.client)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    for row, optimal in zip(rows, pareto_front(rows, recall_key)):
+        row['pareto_optimal'] = optimal
+
+    return {
+        'embeddings_dir': str(embeddings_dir),
+        'num_vectors': exact.count(),
+        'num_queries': len(queries),
+        'k': k,
+        'results': rows
+    }
+
+
+def print_sweep_table(report: Dict):
+    """Print sweep results as a table, Pareto-optimal settings marked with *"""
+    recall_key = f"recall@{report['k']}"
+    print("\n" + "=" * 92)
+    print(f" HNSW SWEEP: {report['num_vectors']} vectors, {report['num_queries']} queries, k={report['k']}")
+    print("=" * 92)
+    print(f"  {'M':>4} {'c_ef':>6} {'s_ef':>6} {'build (s)':>10} {'size (MB)':>10} "
+          f"{'p50 (ms)':>9} {'p99 (ms)':>9} {recall_key:>10}  pareto")
+    for row in sorted(report['results'], key=lambda r: (-r[recall_key], r['p50_ms'])):
+        print(
+            f"  {row['M']:>4} {row['construction_ef']:>6} {row['search_ef']:>6} "
+            f"{row['build_seconds']:>10.2f} {row['index_bytes'] / 1024 / 1024:>10.2f} "
+            f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row[recall_key]:>10.3f}  "
+            f"{'*' if row['pareto_optimal'] else ''}"
+        )
+    print("=" * 92)
+
+
+def save_sweep(report: Dict, output_path: str = "experiments/hnsw_sweep.json"):
+    """Save sweep results to JSON"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Sweep results saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Chroma HNSW parameters for recall vs latency")
+    parser.add_argument("--embeddings-dir", default="models/embeddings")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--output", default="experiments/hnsw_sweep.json")
+    args = parser.parse_args()
+
+    report = run_sweep(
+        args.embeddings_dir,
+        m_values=args.m,
+        construction_ef_values=args.construction_ef,
+        search_ef_values=args.search_ef,
+        k=args.k,
+        num_queries=args.num_queries
+    )
+    print_sweep_table(report)
+    save_sweep(report, args.output)
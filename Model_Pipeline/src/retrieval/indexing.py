@@ -0,0 +1,312 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def content_hash_id(text: str, metadata: Optional[Dict] = None) -> str:
+    """
+    Stable chunk id derived from the chunk's content
+
+    The id depends only on source type, title and text, so it survives
+    re-ordering of the corpus and changes exactly when the chunk does.
+    """
+    metadata = metadata or {}
+    key = "\x1f".join([
+        str(metadata.get('source_type', '')),
+        str(metadata.get('title', '')),
+        text
+    ])
+    return "chunk_" + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def content_hash_ids(texts: List[str], metadatas: List[Dict]) -> List[str]:
+    """Content-hash ids for a corpus, aligned with its rows"""
+    return [content_hash_id(text, meta) for text, meta in zip(texts, metadatas)]
+
+
+def first_occurrence_rows(ids: List[str]) -> np.ndarray:
+    """Row indices of the first occurrence of each id (duplicates dropped)"""
+    seen = set()
+    rows = []
+    for row, doc_id in enumerate(ids):
+        if doc_id not in seen:
+            seen.add(doc_id)
+            rows.append(row)
+    return np.asarray(rows, dtype=np.int64)
+
+
+def _read_checkpoint(checkpoint_path: Path) -> Optional[Dict]:
+    """Read an indexing checkpoint, ignoring missing or corrupt files"""
+    if not checkpoint_path.exists():
+        return None
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠ Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return None
+
+
+def ids_digest(ids: Sequence[str]) -> str:
+    """sha1 over an ordered id list, used to tie a checkpoint to the exact corpus it was written for"""
+    digest = hashlib.sha1()
+    for doc_id in ids:
+        digest.update(doc_id.encode('utf-8'))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def checkpoint_matches(checkpoint_path: str, source, num_rows: int) -> bool:
+    """True if checkpoint_path holds progress for the same source and row count"""
+    state = _read_checkpoint(Path(checkpoint_path))
+    return bool(state) and state.get('source') == source and state.get('num_rows') == num_rows
+
+
+def _write_checkpoint(checkpoint_path: Path, state: Dict):
+    """Atomically write an indexing checkpoint"""
+    tmp_path = checkpoint_path.with_suffix(checkpoint_path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def stream_index_embeddings(collection,
+                            embeddings,
+                            texts: List[str],
+                            metadatas: List[Dict],
+                            ids: Optional[List[str]] = None,
+                            batch_size: int = 1000,
+                            checkpoint_path: Optional[str] = None,
+                            max_batch_size: Optional[int] = None,
+                            source: Optional[Dict] = None,
+                            rows: Optional[Sequence[int]] = None) -> Dict:
+    """
+    Stream a memory-mapped embedding matrix into a Chroma collection in
+    fixed-size batches, checkpointing after every committed batch
+
+    Only one batch of embeddings is materialised in memory at a time. If a
+    checkpoint from an interrupted run over the same source exists, indexing
+    resumes from the first uncommitted batch. Batches are written with
+    upsert so replaying a batch after a crash is idempotent.
+
+    Args:
+        collection: Chroma collection to write into
+        embeddings: Row-sliceable matrix (np.memmap or QuantizedMatrix)
+        texts: Document texts, aligned with embedding rows
+        metadatas: Metadata dicts, aligned with embedding rows
+        ids: Document ids (defaults to content_hash_ids(texts, metadatas))
+        batch_size: Number of rows per collection write
+        checkpoint_path: Where to persist progress (no resume if None)
+        max_batch_size: Backend limit on rows per write; batch_size is capped to it
+        source: JSON-serialisable identity of the data being indexed (e.g. the
+            embeddings' fingerprint plus ids_digest of the ids); a checkpoint
+            is only resumed when it was written for an equal source
+        rows: Subset of row indices to index, in order (defaults to all rows)
+
+    Returns:
+        Dictionary with indexing statistics
+    """
+    if len(texts) != len(embeddings) or len(metadatas) != len(embeddings):
+        raise ValueError(
+            f"Row count mismatch: {len(embeddings)} embeddings, {len(texts)} texts, {len(metadatas)} metadata entries"
+        )
+
+    if ids is None:
+        ids = content_hash_ids(texts, metadatas)
+
+    rows = np.arange(len(embeddings)) if rows is None else np.asarray(rows, dtype=np.int64)
+    num_rows = len(rows)
+
+    if max_batch_size is not None and batch_size > max_batch_size:
+        logger.info(f"  Capping batch size {batch_size} to backend limit {max_batch_size}")
+        batch_size = max_batch_size
+
+    start_row = 0
+    checkpoint_file = Path(checkpoint_path) if checkpoint_path else None
+    if checkpoint_file is not None:
+        if checkpoint_matches(checkpoint_file, source, num_rows):
+            start_row = int(_read_checkpoint(checkpoint_file).get('next_row', 0))
+            logger.info(f"↻ Resuming indexing from row {start_row}/{num_rows}")
+        elif checkpoint_file.exists():
+            logger.warning("⚠ Checkpoint does not match current embeddings; starting from scratch")
+
+    logger.info(f"Streaming {num_rows - start_row} documents in batches of {batch_size}...")
+
+    total_start = time.perf_counter()
+    num_batches = 0
+
+    for batch_start in range(start_row, num_rows, batch_size):
+        batch_end = min(batch_start + batch_size, num_rows)
+        t0 = time.perf_counter()
+
+        batch_rows = rows[batch_start:batch_end]
+        if batch_rows[-1] - batch_rows[0] == len(batch_rows) - 1:
+            # Contiguous rows: plain slice keeps memmap reads sequential
+            batch_embeddings = embeddings[int(batch_rows[0]):int(batch_rows[-1]) + 1]
+        else:
+            batch_embeddings = embeddings[batch_rows]
+        batch_embeddings = np.asarray(batch_embeddings, dtype=np.float32)
+
+        collection.upsert(
+            ids=[ids[r] for r in batch_rows],
+            embeddings=batch_embeddings.tolist(),
+            documents=[texts[r] for r in batch_rows],
+            metadatas=[metadatas[r] for r in batch_rows]
+        )
+
+        if checkpoint_file is not None:
+            _write_checkpoint(checkpoint_file, {
+                'source': source,
+                'num_rows': num_rows,
+                'next_row': batch_end
+            })
+
+        elapsed = time.perf_counter() - t0
+        num_batches += 1
+        rate = (batch_end - batch_start) / elapsed if elapsed > 0 else float('inf')
+        logger.info(
+            f"  ✓ Batch {num_batches}: items {batch_start}-{batch_end - 1} "
+            f"({elapsed:.2f}s, {rate:,.0f} docs/s)"
+        )
+
+    total_elapsed = time.perf_counter() - total_start
+    indexed = num_rows - start_row
+
+    if checkpoint_file is not None and checkpoint_file.exists():
+        checkpoint_file.unlink()
+
+    stats = {
+        'indexed': indexed,
+        'batches': num_batches,
+        'batch_size': batch_size,
+        'resumed_from_row': start_row,
+        'seconds': total_elapsed,
+        'docs_per_second': indexed / total_elapsed if total_elapsed > 0 else 0.0
+    }
+
+    logger.info(
+        f"✓ Streamed {indexed} documents in {num_batches} batches "
+        f"({total_elapsed:.2f}s, {stats['docs_per_second']:,.0f} docs/s)"
+    )
+
+    return stats
+
+
+def _existing_documents(collection, page_size: int = 5000) -> Dict[str, Dict]:
+    """Map of id -> metadata for everything currently in the collection, fetched in pages"""
+    existing = {}
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=page_size, offset=offset)
+        page_ids = page.get('ids') or []
+        for doc_id, meta in zip(page_ids, page.get('metadatas') or [{}] * len(page_ids)):
+            existing[doc_id] = meta or {}
+        if len(page_ids) < page_size:
+            break
+        offset += page_size
+    return existing
+
+
+def sync_collection(collection,
+                    embeddings,
+                    texts: List[str],
+                    metadatas: List[Dict],
+                    batch_size: int = 1000,
+                    max_batch_size: Optional[int] = None) -> Dict:
+    """
+    Incrementally bring a collection in line with the current corpus
+
+    Chunk ids are content hashes, so the diff against ids already in the
+    collection tells us exactly which chunks are new, gone, or unchanged in
+    text but changed in metadata. Only those adds, deletes and metadata
+    updates are applied. An interrupted sync is resumed simply by running
+    it again: committed batches show up as existing ids in the next diff.
+
+    Args:
+        collection: Chroma collection to sync
+        embeddings: Row-sliceable embedding matrix aligned with texts
+        texts: Chunk texts
+        metadatas: Chunk metadata dicts
+        batch_size: Rows per collection write
+        max_batch_size: Backend limit on rows per write
+
+    Returns:
+        Summary with added/updated/deleted/unchanged counts and per-phase seconds
+    """
+    timings = {}
+    if max_batch_size is not None:
+        batch_size = min(batch_size, max_batch_size)
+
+    t0 = time.perf_counter()
+    ids = content_hash_ids(texts, metadatas)
+    rows = first_occurrence_rows(ids)
+    current = {ids[r]: r for r in rows}
+    timings['hash'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    existing = _existing_documents(collection)
+    to_delete = [doc_id for doc_id in existing if doc_id not in current]
+    to_add = [row for doc_id, row in current.items() if doc_id not in existing]
+    to_update = [row for doc_id, row in current.items()
+                 if doc_id in existing and existing[doc_id] != metadatas[row]]
+    timings['diff'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for start in range(0, len(to_delete), batch_size):
+        collection.delete(ids=to_delete[start:start + batch_size])
+    timings['delete'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if to_add:
+        stream_index_embeddings(
+            collection,
+            embeddings=embeddings,
+            texts=texts,
+            metadatas=metadatas,
+            ids=ids,
+            batch_size=batch_size,
+            rows=sorted(to_add)
+        )
+    timings['add'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for start in range(0, len(to_update), batch_size):
+        batch_rows = to_update[start:start + batch_size]
+        collection.update(
+            ids=[ids[r] for r in batch_rows],
+            metadatas=[metadatas[r] for r in batch_rows]
+        )
+    timings['update'] = time.perf_counter() - t0
+
+    summary = {
+        'added': len(to_add),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': len(current) - len(to_add) - len(to_update),
+        'duplicates_skipped': len(ids) - len(rows),
+        'total_documents': len(current),
+        'timings_seconds': timings,
+        'total_seconds': sum(timings.values())
+    }
+
+    logger.info("\n🔁 Incremental sync summary:")
+    logger.info(f"  + added:      {summary['added']}")
+    logger.info(f"  ~ updated:    {summary['updated']}")
+    logger.info(f"  - deleted:    {summary['deleted']}")
+    logger.info(f"  = unchanged:  {summary['unchanged']}")
+    if summary['duplicates_skipped']:
+        logger.info(f"  duplicate chunks skipped: {summary['duplicates_skipped']}")
+    for phase, seconds in timings.items():
+        logger.info(f"  {phase:<8} {seconds * 1000:>10.1f} ms")
+    logger.info(f"  {'total':<8} {summary['total_seconds'] * 1000:>10.1f} ms")
+
+    return summary
@@ -0,0 +1,421 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from ..embeddings.quantization import QuantizedMatrix
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from embeddings.quantization import QuantizedMatrix
+
+try:
+    from .numpy_backend import NumpyBackend
+    from .pca_index import PCAIndex, pca_index_path
+except ImportError:
+    from numpy_backend import NumpyBackend
+    from pca_index import PCAIndex, pca_index_path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IVFPQ_INDEX_FILE = "ivfpq_index.npz"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, spherical: bool, block_size: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid for every row, computed block-wise"""
+    # argmin ||x - c||^2 == argmax (x·c - ||c||^2 / 2); on the unit sphere the bias is constant
+    bias = None if spherical else (-0.5 * np.sum(centroids ** 2, axis=1)).astype(np.float32)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start:start + block_size], dtype=np.float32)
+        scores = block @ centroids.T
+        if bias is not None:
+            scores += bias
+        labels[start:start + len(block)] = np.argmax(scores, axis=1)
+    return labels
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 42, spherical: bool = False) -> np.ndarray:
+    """
+    Lloyd's k-means in NumPy
+
+    Args:
+        data: Training vectors (num_vectors, dim)
+        k: Number of centroids
+        iterations: Lloyd iterations
+        seed: Random seed for initialisation
+        spherical: Keep centroids on the unit sphere (cosine k-means)
+
+    Returns:
+        Centroids of shape (k, dim)
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    # Dimension-major copy, so each per-dimension bincount reads contiguous memory
+    columns = np.ascontiguousarray(data.T)
+
+    for _ in range(iterations):
+        labels = _assign(data, centroids, spherical)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=column, minlength=k) for column in columns], axis=1)
+
+        empty = counts == 0
+        centroids[~empty] = (sums[~empty] / counts[~empty, None]).astype(centroids.dtype)
+        # Re-seed empty clusters from random training points
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        if spherical:
+            centroids = _normalize(centroids)
+
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Inverted-file index with product-quantized residuals.
+
+    A coarse spherical k-means splits the corpus into nlist partitions; each
+    vector is stored as its partition plus a PQ code of its residual (one
+    byte per subquantizer). A query scores only the nprobe closest
+    partitions using per-query lookup tables (asymmetric distance), so the
+    index needs num_vectors * num_subquantizers bytes of codes in RAM rather
+    than the full float32 matrix.
+    """
+
+    def __init__(self,
+                 centroids: np.ndarray,
+                 codebooks: np.ndarray,
+                 codes: np.ndarray,
+                 list_rows: np.ndarray,
+                 list_offsets: np.ndarray,
+                 projection: Optional[np.ndarray] = None):
+        self.centroids = centroids          # (nlist, dim)
+        self.codebooks = codebooks          # (num_subquantizers, 256, dim / num_subquantizers)
+        self.codes = codes                  # (num_vectors, num_subquantizers) uint8, grouped by list
+        self.list_rows = list_rows          # (num_vectors,) corpus row of each code
+        self.list_offsets = list_offsets    # (nlist + 1,) start of each list in codes/list_rows
+        self.projection = projection        # (full dim, dim) PCA components, or None
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def num_subquantizers(self) -> int:
+        return len(self.codebooks)
+
+    @property
+    def nbytes(self) -> int:
+        """RAM held by the index"""
+        arrays = [self.centroids, self.codebooks, self.codes, self.list_rows, self.list_offsets]
+        if self.projection is not None:
+            arrays.append(self.projection)
+        return int(sum(a.nbytes for a in arrays))
+
+    @classmethod
+    def train(cls,
+              embeddings,
+              nlist: Optional[int] = None,
+              num_subquantizers: Optional[int] = None,
+              train_sample: int = 100000,
+              iterations: int = 20,
+              block_size: int = 65536,
+              seed: int = 42) -> "IVFPQIndex":
+        """
+        Train coarse centroids and PQ codebooks, then encode every row
+
+        Args:
+            embeddings: Row-sliceable matrix (np.memmap or QuantizedMatrix)
+            nlist: Number of coarse partitions (default ~4 * sqrt(num_vectors))
+            num_subquantizers: PQ subspaces; must divide the dimension
+                (default: dim / 8, i.e. 8-d subvectors)
+            train_sample: Rows sampled for k-means training
+            iterations: k-means iterations
+            block_size: Rows assigned/encoded at a time
+            seed: Random seed
+        """
+        num_vectors, dim = embeddings.shape
+        nlist = nlist or max(1, int(4 * np.sqrt(num_vectors)))
+        num_subquantizers = num_subquantizers or max(1, dim // 8)
+        if dim % num_subquantizers:
+            raise ValueError(f"num_subquantizers={num_subquantizers} must divide embedding dim {dim}")
+        sub_dim = dim // num_subquantizers
+
+        t0 = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(num_vectors, size=min(train_sample, num_vectors), replace=False))
+        sample = _normalize(embeddings[sample_rows])
+
+        logger.info(f"Training IVF-PQ: {num_vectors} vectors, nlist={nlist}, "
+                    f"{num_subquantizers} subquantizers x {sub_dim}d, {len(sample)} training rows")
+        centroids = _kmeans(sample, nlist, iterations, seed, spherical=True)
+        nlist = len(centroids)
+
+        residuals = sample - centroids[_assign(sample, centroids, spherical=True)]
+        codebooks = np.zeros((num_subquantizers, 256, sub_dim), dtype=np.float32)
+        for j in range(num_subquantizers):
+            sub = np.ascontiguousarray(residuals[:, j * sub_dim:(j + 1) * sub_dim])
+            trained = _kmeans(sub, 256, iterations, seed + j)
+            codebooks[j, :len(trained)] = trained
+
+        # Encode the full corpus block by block
+        labels = np.empty(num_vectors, dtype=np.int64)
+        codes = np.empty((num_vectors, num_subquantizers), dtype=np.uint8)
+        for start in range(0, num_vectors, block_size):
+            block = _normalize(embeddings[start:start + block_size])
+            block_labels = _assign(block, centroids, spherical=True)
+            labels[start:start + len(block)] = block_labels
+            block_residuals = block - centroids[block_labels]
+            for j in range(num_subquantizers):
+                sub = block_residuals[:, j * sub_dim:(j + 1) * sub_dim]
+                codes[start:start + len(block), j] = _assign(sub, codebooks[j], spherical=False)
+
+        list_rows = np.argsort(labels, kind='stable')
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+
+        logger.info(f"✓ Trained IVF-PQ index in {time.perf_counter() - t0:.1f}s")
+        return cls(centroids, codebooks, codes[list_rows], list_rows, list_offsets)
+
+    def save(self, path: str, **info):
+        """Save the index (and any fingerprint fields in info) to an .npz file"""
+        arrays = {'projection': self.projection} if self.projection is not None else {}
+        np.savez(
+            path,
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            codes=self.codes,
+            list_rows=self.list_rows,
+            list_offsets=self.list_offsets,
+            **arrays,
+            **{f"info_{key}": np.asarray(value) for key, value in info.items()}
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["IVFPQIndex", Dict]:
+        """Load an index saved with save(); returns (index, info)"""
+        with np.load(path) as data:
+            index = cls(data['centroids'], data['codebooks'], data['codes'],
+                        data['list_rows'], data['list_offsets'],
+                        data['projection'] if 'projection' in data.files else None)
+            info = {key[5:]: data[key].item() for key in data.files if key.startswith("info_")}
+        return index, info
+
+    @staticmethod
+    def fingerprint(embeddings, pca_components: Optional[int] = None) -> Dict:
+        """Identifies the embeddings (and PCA dimension) an index was trained for"""
+        fingerprint = embeddings.fingerprint()
+        if pca_components:
+            fingerprint['pca_components'] = min(pca_components, embeddings.shape[1])
+        return fingerprint
+
+    @classmethod
+    def open(cls, embeddings, index_path: str, pca_components: Optional[int] = None) -> Optional["IVFPQIndex"]:
+        """The index at index_path, or None when it is missing or was trained for other embeddings"""
+        index_path = Path(index_path)
+        if not index_path.exists():
+            return None
+        index, info = cls.load(str(index_path))
+        if info != cls.fingerprint(embeddings, pca_components):
+            logger.warning(f"⚠ {index_path} was built for {info}; it needs retraining")
+            return None
+        return index
+
+    @classmethod
+    def open_or_build(cls,
+                      embeddings,
+                      index_path: str,
+                      pca_components: Optional[int] = None,
+                      nlist: Optional[int] = None,
+                      num_subquantizers: Optional[int] = None,
+                      train_sample: int = 100000,
+                      iterations: int = 20,
+                      block_size: int = 65536) -> "IVFPQIndex":
+        """
+        Load the index at index_path, retraining it when it is missing or
+        was trained for different embeddings
+
+        Training is an offline step (load_and_index_embeddings or this
+        module's CLI); serving backends only open() the result.
+
+        Args:
+            embeddings: Row-sliceable matrix (np.memmap or QuantizedMatrix)
+            index_path: Index file
+            pca_components: Train in a PCA-reduced space of this dimension
+                (the projection is stored with the index)
+            nlist, num_subquantizers, train_sample, iterations, block_size: See train()
+        """
+        index = cls.open(embeddings, index_path, pca_components)
+        if index is not None:
+            return index
+
+        training_matrix, projection = embeddings, None
+        if pca_components:
+            pca = PCAIndex.open_or_build(embeddings, pca_index_path(Path(index_path).parent, pca_components),
+                                         num_components=pca_components, block_size=block_size)
+            training_matrix, projection = pca.reduced, pca.components
+
+        index = cls.train(training_matrix, nlist=nlist, num_subquantizers=num_subquantizers,
+                          train_sample=train_sample, iterations=iterations, block_size=block_size)
+        index.projection = projection
+        index.save(str(index_path), **cls.fingerprint(embeddings, pca_components))
+        logger.info(f"✓ Saved IVF-PQ index: {index_path}")
+        return index
+
+    def search(self,
+               queries: np.ndarray,
+               k: int,
+               nprobe: int = 8,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by inner product with normalized queries
+
+        Lists are visited in order of centroid similarity. At least nprobe
+        lists are scanned, and scanning continues past nprobe until k
+        candidates pass the mask, so selective filters still fill the result.
+
+        Returns:
+            (row indices, approximate scores), each (num_queries, k), padded with -inf
+        """
+        sub_dim = self.codebooks.shape[2]
+        out_idx = np.zeros((len(queries), k), dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        coarse = queries @ self.centroids.T
+        subspaces = np.arange(self.num_subquantizers)[None, :]
+
+        for qi, query in enumerate(queries):
+            # Lookup table: inner product of each query subvector with every codeword
+            tables = np.einsum('md,mkd->mk', query.reshape(self.num_subquantizers, sub_dim), self.codebooks)
+
+            rows_found, scores_found, num_found = [], [], 0
+            for probed, li in enumerate(np.argsort(-coarse[qi])):
+                if probed >= nprobe and num_found >= k:
+                    break
+                start, end = self.list_offsets[li], self.list_offsets[li + 1]
+                if start == end:
+                    continue
+                rows = self.list_rows[start:end]
+                codes = self.codes[start:end]
+                if mask is not None:
+                    keep = mask[rows]
+                    rows, codes = rows[keep], codes[keep]
+                if len(rows) == 0:
+                    continue
+                rows_found.append(rows)
+                scores_found.append(coarse[qi, li] + tables[subspaces, codes].sum(axis=1))
+                num_found += len(rows)
+
+            if not rows_found:
+                continue
+            rows = np.concatenate(rows_found)
+            scores = np.concatenate(scores_found)
+            top = np.argsort(-scores)[:k]
+            out_idx[qi, :len(top)] = rows[top]
+            out_scores[qi, :len(top)] = scores[top]
+
+        return out_idx, out_scores
+
+
+def ivfpq_index_path(embeddings_dir, pca_components: Optional[int] = None) -> Path:
+    """Default index file (full-dimension and each PCA variant can coexist)"""
+    name = IVFPQ_INDEX_FILE.replace(".npz", f"_pca{pca_components}.npz") if pca_components else IVFPQ_INDEX_FILE
+    return Path(embeddings_dir) / name
+
+
+class IVFPQBackend(NumpyBackend):
+    """
+    Approximate search over an IVF-PQ index, with exact float32 rescoring of
+    the shortlist against the memory-mapped embedding matrix.
+
+    Only the PQ codes, coarse centroids and codebooks live in RAM; full
+    vectors are read from disk for the n_results * rescore_factor
+    shortlisted rows. The index is trained offline, by
+    load_and_index_embeddings(ivfpq_options=...) or this module's CLI, and
+    cached next to the embeddings as ivfpq_index.npz.
+
+    With pca_components set, the index is trained on PCA-reduced vectors
+    and queries are projected the same way, which shrinks the coarse
+    centroids, codebooks and lookup tables by the reduction factor.
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 nprobe: int = 8,
+                 rescore_factor: int = 10,
+                 index_path: Optional[str] = None,
+                 pca_components: Optional[int] = None,
+                 build_if_missing: bool = False,
+                 **kwargs):
+        """
+        Args:
+            embeddings_dir: Directory with the embedding artifacts
+            nprobe: Coarse partitions scanned per query (recall vs latency)
+            rescore_factor: Shortlist size as a multiple of n_results
+            index_path: Index file (defaults to embeddings_dir/ivfpq_index.npz)
+            pca_components: Search the index trained in a PCA-reduced space
+                of this dimension (None = full dimension)
+            build_if_missing: Train the index here when it is missing or
+                stale instead of raising (for offline tools such as
+                search_benchmark.py; training takes minutes on large corpora)
+        """
+        super().__init__(embeddings_dir, **kwargs)
+        self.nprobe = nprobe
+        self.rescore_factor = rescore_factor
+
+        index_path = Path(index_path or ivfpq_index_path(self.embeddings_dir, pca_components))
+        if build_if_missing:
+            self.index = IVFPQIndex.open_or_build(self.embeddings, index_path, pca_components,
+                                                  block_size=self.block_size)
+        else:
+            self.index = IVFPQIndex.open(self.embeddings, index_path, pca_components)
+            if self.index is None:
+                raise FileNotFoundError(
+                    f"No up-to-date IVF-PQ index at {index_path}. Train it with "
+                    f"load_and_index_embeddings(ivfpq_options=...) or "
+                    f"python src/retrieval/ivfpq_index.py --embeddings-dir {self.embeddings_dir}"
+                )
+        self.projection = self.index.projection
+
+        logger.info(
+            f"✓ IVF-PQ backend ready: {self.count()} vectors, nlist={self.index.nlist}, "
+            f"{self.index.num_subquantizers} bytes/vector, nprobe={nprobe}, "
+            f"{'PCA ' + str(self.projection.shape[1]) + 'd, ' if self.projection is not None else ''}"
+            f"{self.index.nbytes / 1024 / 1024:.1f} MB in RAM"
+        )
+
+    def _search(self, queries, n_results, mask):
+        shortlist = min(n_results * self.rescore_factor, self.count())
+        coarse_queries = queries if self.projection is None else queries @ self.projection
+        candidates, candidate_scores = self.index.search(coarse_queries, shortlist, nprobe=self.nprobe, mask=mask)
+        return self._rescore(queries, candidates, candidate_scores, n_results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the IVF-PQ index used by the 'ivfpq' search backend")
+    parser.add_argument("--embeddings-dir", default="models/embeddings")
+    parser.add_argument("--pca-components", type=int, default=None)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--num-subquantizers", type=int, default=None)
+    parser.add_argument("--train-sample", type=int, default=100000)
+    args = parser.parse_args()
+
+    matrix = QuantizedMatrix.load(args.embeddings_dir)
+    IVFPQIndex.open_or_build(
+        matrix,
+        ivfpq_index_path(args.embeddings_dir, args.pca_components),
+        pca_components=args.pca_components,
+        nlist=args.nlist,
+        num_subquantizers=args.num_subquantizers,
+        train_sample=args.train_sample
+    )
@@ -0,0 +1,55 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+def mmr_select(embeddings: np.ndarray,
+               relevance: Sequence[float],
+               k: int,
+               lambda_mult: float = 0.7) -> List[int]:
+    """
+    Pick k candidates by maximal marginal relevance
+
+    Each step takes the candidate maximizing
+    lambda_mult * relevance - (1 - lambda_mult) * max similarity to the
+    candidates already picked. All pairwise cosine similarities come from
+    one matrix product up front; a running max-similarity vector is updated
+    with one row of it per pick, so selection is k vectorized steps rather
+    than a Python loop over pairs.
+
+    Args:
+        embeddings: (num_candidates, dim) candidate embeddings; zero rows
+            (unknown embeddings) are never penalized
+        relevance: Relevance per candidate, higher is better (ideally in [0, 1]
+            so it is on the same scale as cosine similarity)
+        k: Number of candidates to pick
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+
+    Returns:
+        Indices into the candidates, in selection order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    vectors = np.asarray(embeddings, dtype=np.float32).reshape(n, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    for _ in range(k - 1):
+        mmr = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        mmr[~available] = -np.inf
+        pick = int(np.argmax(mmr))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, similarity[pick], out=max_similarity)
+
+    return selected
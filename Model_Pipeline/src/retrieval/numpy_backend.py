@@ -0,0 +1,355 @@
+import logging
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from ..embeddings.quantization import QuantizedMatrix
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from embeddings.quantization import QuantizedMatrix
+
+try:
+    from .indexing import first_occurrence_rows
+    from .text_store import TextStore
+except ImportError:
+    from indexing import first_occurrence_rows
+    from text_store import TextStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class NumpyBackend:
+    """
+    Base class for in-process search backends that serve queries straight
+    from the embedding artifacts (embeddings.npy plus a TextStore built from
+    texts.json and metadata.json) instead of going through Chroma.
+
+    Subclasses implement _search(); this class handles loading, metadata
+    filters and formatting results in the same shape as collection.query().
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 ids: Optional[List[str]] = None,
+                 indexed_fields: Sequence[str] = ("source_type", "source"),
+                 block_size: int = 65536):
+        """
+        Args:
+            embeddings_dir: Directory containing the embedding matrix (embeddings.npy or a
+                quantized copy) and texts.json/metadata.json or a prebuilt text store
+            ids: Document ids aligned with embedding rows (defaults to the text store's
+                content-hash ids, matching the ids used when indexing into Chroma)
+            indexed_fields: Metadata fields whose equality masks are precomputed at load time
+            block_size: Number of rows scored per matmul block
+        """
+        self.embeddings_dir = Path(embeddings_dir)
+        self.block_size = block_size
+
+        # Memory-mapped, most precise format available; slices come back as float32
+        self.embeddings = QuantizedMatrix.load(self.embeddings_dir)
+
+        # Texts and metadata stay on disk; only returned rows are read
+        self.text_store = TextStore.open_or_build(self.embeddings_dir)
+
+        if len(self.embeddings) != len(self.text_store):
+            raise ValueError(
+                f"Artifact row mismatch in {embeddings_dir}: {len(self.embeddings)} embeddings, "
+                f"{len(self.text_store)} documents in text store"
+            )
+
+        self.ids = ids if ids is not None else self.text_store.ids
+
+        # Duplicate chunks share an id; only the first copy is searchable
+        unique_rows = first_occurrence_rows(self.ids)
+        self._unique_mask = None
+        if len(unique_rows) < len(self.ids):
+            self._unique_mask = np.zeros(len(self.ids), dtype=bool)
+            self._unique_mask[unique_rows] = True
+
+        # Equality masks keyed by (field, value); indexed fields are filled eagerly
+        self._masks: Dict[Tuple[str, object], np.ndarray] = {}
+        self._indexed_fields = set()
+        self._index_fields(indexed_fields)
+
+    def count(self) -> int:
+        """Number of searchable documents"""
+        return len(self.ids)
+
+    def query(self,
+              query_embeddings: np.ndarray,
+              n_results: int = 5,
+              where: Optional[Dict] = None,
+              include_documents: bool = True,
+              include_embeddings: bool = False) -> Dict:
+        """
+        Search for the nearest documents of each query embedding
+
+        Args:
+            query_embeddings: 2-D array of shape (num_queries, embedding_dim)
+            n_results: Number of results per query
+            where: Optional Chroma-style metadata filter
+            include_documents: Read texts and metadata for the results; if False
+                only ids and distances are returned (documents/metadatas are None)
+            include_embeddings: Also return the stored embedding of every result
+
+        Returns:
+            Chroma-style result dict (ids, documents, metadatas, distances and
+            optionally embeddings)
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.maximum(norms, 1e-12)
+
+        mask = self._where_mask(where) if where else None
+        if self._unique_mask is not None:
+            mask = self._unique_mask if mask is None else mask & self._unique_mask
+        n_results = min(n_results, self.count() if mask is None else int(mask.sum()))
+
+        if n_results <= 0 or len(queries) == 0:
+            indices = np.zeros((len(queries), 0), dtype=np.int64)
+            scores = np.zeros((len(queries), 0), dtype=np.float32)
+        else:
+            indices, scores = self._search(queries, n_results, mask)
+
+        return self._format_results(indices, scores, include_documents, include_embeddings)
+
+    def _search(self,
+                queries: np.ndarray,
+                n_results: int,
+                mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, cosine similarities), each of shape (num_queries, n_results)"""
+        raise NotImplementedError
+
+    def _scan(self,
+              score_block: Callable[[int, int], np.ndarray],
+              k: int,
+              mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Block-wise top-k over the whole corpus
+
+        Args:
+            score_block: Callable (start, end) -> scores of shape (num_queries, end - start)
+            k: Number of rows to keep per query
+            mask: Optional boolean row mask; rows outside it are never returned
+
+        Returns:
+            (row indices, scores), each of shape (num_queries, k)
+        """
+        best_idx, best_scores = None, None
+
+        for start in range(0, self.count(), self.block_size):
+            end = min(start + self.block_size, self.count())
+            scores = score_block(start, end)
+            if mask is not None:
+                scores[:, ~mask[start:end]] = -np.inf
+
+            idx, block_scores = top_k_rows(scores, k)
+            idx = idx + start
+            if best_idx is not None:
+                idx = np.concatenate([best_idx, idx], axis=1)
+                block_scores = np.concatenate([best_scores, block_scores], axis=1)
+                keep, block_scores = top_k_rows(block_scores, k)
+                idx = np.take_along_axis(idx, keep, axis=1)
+            best_idx, best_scores = idx, block_scores
+
+        return best_idx, best_scores
+
+    def _rescore(self,
+                 queries: np.ndarray,
+                 candidates: np.ndarray,
+                 candidate_scores: np.ndarray,
+                 n_results: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-rank each query's shortlist by exact cosine against self.embeddings
+
+        Returns:
+            (row indices, scores), each of shape (num_queries, n_results);
+            missing slots are padded with score -inf
+        """
+        out_idx = np.zeros((len(queries), n_results), dtype=np.int64)
+        out_scores = np.full((len(queries), n_results), -np.inf, dtype=np.float32)
+
+        for row, (query, cands, cand_scores) in enumerate(zip(queries, candidates, candidate_scores)):
+            cands = np.sort(cands[np.isfinite(cand_scores)])
+            if len(cands) == 0:
+                continue
+            vectors = self.embeddings[cands]
+            sims = (vectors @ query) / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+            order = np.argsort(-sims)[:n_results]
+            out_idx[row, :len(order)] = cands[order]
+            out_scores[row, :len(order)] = sims[order]
+
+        return out_idx, out_scores
+
+    def _format_results(self,
+                        indices: np.ndarray,
+                        scores: np.ndarray,
+                        include_documents: bool = True,
+                        include_embeddings: bool = False) -> Dict:
+        """Build a collection.query()-shaped dict from row indices and similarities"""
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if include_embeddings:
+            results['embeddings'] = []
+        for row_indices, row_scores in zip(indices, scores):
+            keep = np.isfinite(row_scores)
+            row_indices = row_indices[keep]
+            row_scores = row_scores[keep]
+            results['ids'].append([self.ids[i] for i in row_indices])
+            results['distances'].append([float(1.0 - s) for s in row_scores])
+            if include_documents:
+                texts, metadatas = self.text_store.get_rows(row_indices)
+                results['documents'].append(texts)
+                results['metadatas'].append(metadatas)
+            if include_embeddings:
+                results['embeddings'].append(self.embeddings[row_indices])
+        if not include_documents:
+            results['documents'] = results['metadatas'] = None
+        return results
+
+    # ------------------------------------------------------------------
+    # Metadata filters
+    # ------------------------------------------------------------------
+
+    def _index_fields(self, fields: Sequence[str]):
+        """Precompute one boolean mask per distinct value of each field, in one pass over the metadata"""
+        if not fields:
+            return
+        values = {field: [] for field in fields}
+        for meta in self.text_store.iter_metadatas():
+            meta = meta or {}
+            for field in fields:
+                values[field].append(meta.get(field))
+
+        for field, column in values.items():
+            for value in set(v for v in column if isinstance(v, (str, int, float, bool, type(None)))):
+                self._masks[(field, value)] = np.fromiter(
+                    (v == value for v in column), dtype=bool, count=len(column)
+                )
+            self._indexed_fields.add(field)
+
+    def _equals_mask(self, field: str, value) -> np.ndarray:
+        """Mask of rows whose metadata field equals value"""
+        key = (field, value)
+        if key not in self._masks:
+            if field in self._indexed_fields:
+                # Field was indexed eagerly and this value never occurs
+                return np.zeros(self.count(), dtype=bool)
+            self._masks[key] = np.fromiter(
+                ((meta or {}).get(field) == value for meta in self.text_store.iter_metadatas()),
+                dtype=bool, count=self.count()
+            )
+        return self._masks[key]
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """Translate a Chroma-style where clause into a boolean row mask"""
+        mask = np.ones(self.count(), dtype=bool)
+        for key, condition in where.items():
+            if key == '$and':
+                for clause in condition:
+                    mask &= self._where_mask(clause)
+            elif key == '$or':
+                any_mask = np.zeros(self.count(), dtype=bool)
+                for clause in condition:
+                    any_mask |= self._where_mask(clause)
+                mask &= any_mask
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    if op == '$eq':
+                        mask &= self._equals_mask(key, value)
+                    elif op == '$ne':
+                        mask &= ~self._equals_mask(key, value)
+                    elif op == '$in':
+                        in_mask = np.zeros(self.count(), dtype=bool)
+                        for v in value:
+                            in_mask |= self._equals_mask(key, v)
+                        mask &= in_mask
+                    elif op == '$nin':
+                        for v in value:
+                            mask &= ~self._equals_mask(key, v)
+                    else:
+                        raise ValueError(f"Unsupported where operator for in-process search: {op}")
+            else:
+                mask &= self._equals_mask(key, condition)
+        return mask
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest-scoring columns of each row with argpartition
+
+    Returns:
+        (column indices, scores), both of shape (num_rows, k), sorted descending
+    """
+    k = min(k, scores.shape[1])
+    if k == scores.shape[1]:
+        part = np.broadcast_to(np.arange(k), (scores.shape[0], k))
+    else:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class ExactSearchBackend(NumpyBackend):
+    """
+    Brute-force cosine search over a memory-mapped embedding matrix.
+
+    At a few thousand 768-d vectors a single float32 matmul is far cheaper
+    than an HNSW lookup plus SQLite round-trip, and the results are exact.
+
+    With quantization="float16" or "int8" the scan runs over the compact
+    copy held in RAM, and the top n_results * rescore_factor candidates are
+    rescored in float32 against the memory-mapped full-precision rows (or
+    the dequantized rows, if only the compact artifact was shipped).
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 quantization: Optional[str] = None,
+                 rescore_factor: int = 4,
+                 **kwargs):
+        super().__init__(embeddings_dir, **kwargs)
+        self.rescore_factor = rescore_factor
+
+        if quantization is None and self.embeddings.format != "float32":
+            quantization = self.embeddings.format
+        self.quantization = quantization
+
+        self.compact = QuantizedMatrix.load(embeddings_dir, quantization, mmap_mode=None) if quantization else None
+        scanned = self.compact if self.compact is not None else self.embeddings
+
+        # Inverse row norms of the scanned matrix, computed block-wise
+        self._inv_norms = np.empty(self.count(), dtype=np.float32)
+        for start in range(0, self.count(), self.block_size):
+            block = scanned[start:start + self.block_size]
+            self._inv_norms[start:start + len(block)] = 1.0 / np.maximum(np.linalg.norm(block, axis=1), 1e-12)
+
+        if self.compact is not None:
+            logger.info(
+                f"✓ Exact search backend ready: {self.count()} vectors from {embeddings_dir} "
+                f"({self.quantization}, {self.compact.nbytes / 1024 / 1024:.1f} MB in RAM, "
+                f"rescoring x{rescore_factor} in float32)"
+            )
+        else:
+            logger.info(f"✓ Exact search backend ready: {self.count()} vectors from {embeddings_dir}")
+
+    def _search(self, queries, n_results, mask):
+        if self.compact is None:
+            def score_block(start, end):
+                block = self.embeddings[start:end]
+                return (queries @ block.T) * self._inv_norms[start:end]
+
+            return self._scan(score_block, n_results, mask)
+
+        def compact_block(start, end):
+            return self.compact.dot(queries, start, end) * self._inv_norms[start:end]
+
+        shortlist = min(n_results * self.rescore_factor, self.count())
+        candidates, candidate_scores = self._scan(compact_block, shortlist, mask)
+        return self._rescore(queries, candidates, candidate_scores, n_results)
@@ -0,0 +1,241 @@
+import json
+import logging
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARTITIONS_MANIFEST = "partitions.json"
+
+
+def _partition_collection_name(collection_name: str, value) -> str:
+    """Chroma-safe collection name for one partition value"""
+    slug = re.sub(r'[^a-zA-Z0-9_-]+', '-', str(value)).strip('-_') or "none"
+    return f"{collection_name}__{slug}"[:63]
+
+
+def route_where(where: Optional[Dict], partition_by: str) -> Tuple[Optional[List], Optional[Dict]]:
+    """
+    Split a where clause into the partition values it selects and the
+    remaining filter to apply inside those partitions
+
+    Returns:
+        (partition values, residual where); values is None when the clause
+        does not pin down the partition key and the global index must be used
+    """
+    if not where:
+        return None, None
+
+    if partition_by in where and len(where) == 1:
+        condition = where[partition_by]
+        if not isinstance(condition, dict):
+            return [condition], None
+        if set(condition) == {'$eq'}:
+            return [condition['$eq']], None
+        if set(condition) == {'$in'}:
+            return list(condition['$in']), None
+        return None, where
+
+    if set(where) == {'$and'}:
+        clauses = list(where['$and'])
+        for i, clause in enumerate(clauses):
+            values, residual = route_where(clause, partition_by)
+            if values is not None and residual is None:
+                rest = clauses[:i] + clauses[i + 1:]
+                if not rest:
+                    return values, None
+                return values, rest[0] if len(rest) == 1 else {'$and': rest}
+
+    return None, where
+
+
+class PartitionedCollection:
+    """
+    Chroma collection wrapper that keeps one sub-collection per value of a
+    metadata field (e.g. source_type) alongside the global collection.
+
+    Writes go to the global collection and to the matching partition.
+    Queries whose where clause pins the partition field are answered by the
+    partition's own HNSW graph instead of post-filtering the global graph;
+    everything else (including unfiltered queries) is served by the global
+    collection, which is the merged index over all partitions. Any attribute
+    not defined here is delegated to the global collection, so this can be
+    used anywhere a collection is expected.
+    """
+
+    def __init__(self,
+                 client,
+                 collection,
+                 partition_by: str,
+                 persist_directory: str,
+                 collection_metadata: Optional[Dict] = None):
+        self._client = client
+        self._global = collection
+        self.partition_by = partition_by
+        self._collection_metadata = collection_metadata
+        self._manifest_path = Path(persist_directory) / PARTITIONS_MANIFEST
+        self._partitions: Dict[object, object] = {}
+
+        manifest = self._read_manifest()
+        if manifest.get('partition_by') == partition_by:
+            for value, name in manifest.get('partitions', {}).items():
+                self._partitions[value] = client.get_or_create_collection(
+                    name=name, metadata=collection_metadata
+                )
+        elif collection.count() > 0:
+            # One-time migration: every document is copied into its partition
+            logger.warning(
+                f"⚠ Copying {collection.count()} documents into '{partition_by}' partitions; "
+                f"partitioned stores keep each document twice"
+            )
+            self.rebuild_partitions()
+
+        logger.info(f"✓ Partitioned by '{partition_by}': {sorted(map(str, self._partitions))}")
+
+    def __getattr__(self, name):
+        return getattr(self._global, name)
+
+    @property
+    def partitions(self) -> Dict[object, object]:
+        """Partition value -> Chroma collection"""
+        return dict(self._partitions)
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self) -> Dict:
+        if not self._manifest_path.exists():
+            return {}
+        with open(self._manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        manifest = {
+            'partition_by': self.partition_by,
+            'partitions': {value: col.name for value, col in self._partitions.items()}
+        }
+        with open(self._manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    def _partition(self, value):
+        """Get or create the sub-collection for a partition value"""
+        if value not in self._partitions:
+            name = _partition_collection_name(self._global.name, value)
+            self._partitions[value] = self._client.get_or_create_collection(
+                name=name, metadata=self._collection_metadata
+            )
+            self._write_manifest()
+        return self._partitions[value]
+
+    def rebuild_partitions(self, page_size: int = 1000):
+        """Re-derive every partition from the global collection"""
+        logger.info(f"Building '{self.partition_by}' partitions from global collection...")
+        self.drop_partitions()
+        offset = 0
+        while True:
+            page = self._global.get(
+                include=['embeddings', 'documents', 'metadatas'], limit=page_size, offset=offset
+            )
+            if not len(page['ids']):
+                break
+            self._write_partitions(page['ids'], page['embeddings'], page['documents'], page['metadatas'])
+            offset += page_size
+        self._write_manifest()
+
+    def drop_partitions(self):
+        """Delete all partition sub-collections"""
+        for col in self._partitions.values():
+            self._client.delete_collection(name=col.name)
+        self._partitions = {}
+        if self._manifest_path.exists():
+            self._manifest_path.unlink()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _write_partitions(self, ids, embeddings, documents, metadatas, method: str = 'upsert'):
+        groups = defaultdict(list)
+        for i, meta in enumerate(metadatas):
+            groups[(meta or {}).get(self.partition_by)].append(i)
+        for value, rows in groups.items():
+            getattr(self._partition(value), method)(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows] if documents is not None else None,
+                metadatas=[metadatas[i] for i in rows]
+            )
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self._global.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        self._write_partitions(ids, embeddings, documents, metadatas or [{}] * len(ids), method='add')
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._global.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        # An upserted id may have moved partition; clear it everywhere first
+        for col in self._partitions.values():
+            col.delete(ids=ids)
+        self._write_partitions(ids, embeddings, documents, metadatas or [{}] * len(ids))
+
+    def delete(self, ids=None, **kwargs):
+        self._global.delete(ids=ids, **kwargs)
+        for col in self._partitions.values():
+            col.delete(ids=ids, **kwargs)
+
+    def update(self, ids, metadatas=None, **kwargs):
+        self._global.update(ids=ids, metadatas=metadatas, **kwargs)
+        # Re-file the updated rows; their partition value may have changed
+        rows = self._global.get(ids=ids, include=['embeddings', 'documents', 'metadatas'])
+        for col in self._partitions.values():
+            col.delete(ids=ids)
+        self._write_partitions(rows['ids'], rows['embeddings'], rows['documents'], rows['metadatas'])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None, **kwargs) -> Dict:
+        values, residual = route_where(where, self.partition_by)
+        if values is None:
+            return self._global.query(query_embeddings=query_embeddings, n_results=n_results, where=where, **kwargs)
+
+        targets = [self._partitions[v] for v in values if v in self._partitions]
+        per_partition = []
+        for col in targets:
+            size = col.count()
+            if size == 0:
+                continue
+            per_partition.append(col.query(
+                query_embeddings=query_embeddings,
+                n_results=min(n_results, size),
+                where=residual,
+                **kwargs
+            ))
+
+        return self._merge(per_partition, len(query_embeddings), n_results)
+
+    @staticmethod
+    def _merge(results: List[Dict], num_queries: int, n_results: int) -> Dict:
+        """Merge per-partition results by distance, keeping the top n_results per query"""
+        keys = ['ids', 'documents', 'metadatas', 'distances']
+        # Only the per-result fields are merged; Chroma also returns e.g. an
+        # 'included' list of field names. Embeddings may come back as an array.
+        if any(result.get('embeddings') is not None for result in results):
+            keys.append('embeddings')
+        merged = {key: [] for key in keys}
+
+        for q in range(num_queries):
+            rows = []
+            for result in results:
+                for i in range(len(result['ids'][q])):
+                    rows.append({key: result[key][q][i] for key in keys if result.get(key) is not None})
+            rows.sort(key=lambda r: r['distances'])
+            rows = rows[:n_results]
+            for key in keys:
+                merged[key].append([r[key] for r in rows if key in r])
+
+        return merged
@@ -0,0 +1,200 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .numpy_backend import NumpyBackend
+except ImportError:
+    from numpy_backend import NumpyBackend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PCA_INDEX_FILE = "pca_index.npz"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class PCAIndex:
+    """
+    PCA projection of the normalized corpus plus every row's reduced vector.
+
+    For a query q and row x, q·x = q·mean + q·(x - mean), and the first term
+    is the same for every row. Ranking by (q @ components)·((x - mean) @
+    components) therefore approximates cosine ranking using only the
+    leading principal directions. At 768 -> 128 dimensions the reduced
+    matrix is 6x smaller than the float32 embeddings and is scanned 6x
+    faster; a shortlist is then rescored with the full vectors.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, reduced: np.ndarray, explained: np.ndarray):
+        self.mean = mean                # (dim,)
+        self.components = components    # (dim, num_components)
+        self.reduced = reduced          # (num_vectors, num_components) float32
+        self.explained = explained      # (num_components,) explained variance ratio
+
+    @property
+    def num_components(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """RAM held by the index"""
+        return int(sum(a.nbytes for a in (self.mean, self.components, self.reduced, self.explained)))
+
+    @classmethod
+    def fit(cls,
+            embeddings,
+            num_components: int = 128,
+            train_sample: int = 100000,
+            block_size: int = 65536,
+            seed: int = 42) -> "PCAIndex":
+        """
+        Learn the projection from a sample of rows, then project every row
+
+        Args:
+            embeddings: Row-sliceable matrix (np.memmap or QuantizedMatrix)
+            num_components: Reduced dimension
+            train_sample: Rows sampled to estimate the covariance
+            block_size: Rows projected at a time
+            seed: Random seed
+        """
+        num_vectors, dim = embeddings.shape
+        num_components = min(num_components, dim)
+
+        t0 = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(num_vectors, size=min(train_sample, num_vectors), replace=False))
+        sample = _normalize(embeddings[sample_rows]).astype(np.float64)
+
+        mean = sample.mean(axis=0)
+        centered = sample - mean
+        # dim x dim covariance; its eigenvectors are the principal directions
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered / max(len(sample) - 1, 1))
+        order = np.argsort(eigenvalues)[::-1][:num_components]
+        components = eigenvectors[:, order].astype(np.float32)
+        explained = (eigenvalues[order] / max(float(eigenvalues.sum()), 1e-12)).astype(np.float32)
+        mean = mean.astype(np.float32)
+
+        reduced = np.empty((num_vectors, num_components), dtype=np.float32)
+        for start in range(0, num_vectors, block_size):
+            block = _normalize(embeddings[start:start + block_size])
+            reduced[start:start + len(block)] = (block - mean) @ components
+
+        logger.info(f"✓ Fitted PCA {dim} -> {num_components} on {len(sample)} rows "
+                    f"({float(explained.sum()):.1%} of variance kept, {time.perf_counter() - t0:.1f}s)")
+        return cls(mean, components, reduced, explained)
+
+    def project_queries(self, queries: np.ndarray) -> np.ndarray:
+        """Reduced query vectors (the mean term is constant per query and dropped)"""
+        return np.asarray(queries, dtype=np.float32) @ self.components
+
+    def save(self, path: str, **info):
+        """Save the index (and any fingerprint fields in info) to an .npz file"""
+        np.savez(
+            path,
+            mean=self.mean,
+            components=self.components,
+            reduced=self.reduced,
+            explained=self.explained,
+            **{f"info_{key}": np.asarray(value) for key, value in info.items()}
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["PCAIndex", Dict]:
+        """Load an index saved with save(); returns (index, info)"""
+        with np.load(path) as data:
+            index = cls(data['mean'], data['components'], data['reduced'], data['explained'])
+            info = {key[5:]: data[key].item() for key in data.files if key.startswith("info_")}
+        return index, info
+
+    @classmethod
+    def open_or_build(cls,
+                      embeddings,
+                      index_path: str,
+                      num_components: int = 128,
+                      train_sample: int = 100000,
+                      block_size: int = 65536) -> "PCAIndex":
+        """
+        Load the index at index_path, refitting it when it is missing or was
+        built for different embeddings (shape, format or artifact file
+        size/mtime) or a different number of components
+        """
+        index_path = Path(index_path)
+        fingerprint = embeddings.fingerprint()
+        fingerprint['components'] = min(num_components, embeddings.shape[1])
+
+        if index_path.exists():
+            index, info = cls.load(str(index_path))
+            if info == fingerprint:
+                return index
+            logger.warning(f"⚠ {index_path} was built for {info}; refitting")
+
+        index = cls.fit(embeddings, num_components, train_sample=train_sample, block_size=block_size)
+        index.save(str(index_path), **fingerprint)
+        logger.info(f"✓ Saved PCA index: {index_path}")
+        return index
+
+
+def pca_index_path(embeddings_dir, num_components: int) -> Path:
+    """Default index file for a number of components (several can coexist)"""
+    return Path(embeddings_dir) / PCA_INDEX_FILE.replace(".npz", f"_{num_components}.npz")
+
+
+class PCABackend(NumpyBackend):
+    """
+    Two-stage search: a coarse scan over PCA-reduced vectors held in RAM,
+    then exact float32 rescoring of the n_results * rescore_factor
+    shortlisted rows against the memory-mapped embedding matrix.
+
+    The projection is fitted on first use (or at indexing time by
+    load_and_index_embeddings(pca_components=...)) and cached next to the
+    embeddings as pca_index_<components>.npz.
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 components: int = 128,
+                 rescore_factor: int = 10,
+                 train_sample: int = 100000,
+                 index_path: Optional[str] = None,
+                 **kwargs):
+        """
+        Args:
+            embeddings_dir: Directory with the embedding artifacts
+            components: Reduced dimension of the coarse scan
+            rescore_factor: Shortlist size as a multiple of n_results
+            train_sample: Rows sampled when fitting the projection
+            index_path: Index file (defaults to embeddings_dir/pca_index_<components>.npz)
+        """
+        super().__init__(embeddings_dir, **kwargs)
+        self.rescore_factor = rescore_factor
+        self.index = PCAIndex.open_or_build(
+            self.embeddings,
+            index_path or pca_index_path(self.embeddings_dir, components),
+            num_components=components,
+            train_sample=train_sample,
+            block_size=self.block_size
+        )
+
+        logger.info(
+            f"✓ PCA backend ready: {self.count()} vectors, {self.embeddings.shape[1]} -> "
+            f"{self.index.num_components} dims ({float(self.index.explained.sum()):.1%} variance), "
+            f"{self.index.nbytes / 1024 / 1024:.1f} MB in RAM, rescoring x{rescore_factor} in float32"
+        )
+
+    def _search(self, queries, n_results, mask):
+        reduced_queries = self.index.project_queries(queries)
+
+        def reduced_block(start, end):
+            return reduced_queries @ self.index.reduced[start:end].T
+
+        shortlist = min(n_results * self.rescore_factor, self.count())
+        candidates, candidate_scores = self._scan(reduced_block, shortlist, mask)
+        return self._rescore(queries, candidates, candidate_scores, n_results)
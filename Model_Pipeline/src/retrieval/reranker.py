@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+try:
+    from .embedding_cache import normalize_query
+except ImportError:
+    from embedding_cache import normalize_query
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_cross_encoder(model_name: str, cache_dir: str, max_length: int = 512) -> CrossEncoder:
+    """
+    Load a cross-encoder from the local artifact cache, downloading it there
+    once if it is not present yet
+
+    Args:
+        model_name: Hugging Face model id
+        cache_dir: Directory holding one saved model per id
+        max_length: Maximum tokens per (query, document) pair
+
+    Returns:
+        Loaded CrossEncoder
+    """
+    local_path = Path(cache_dir) / model_name.replace("/", "__")
+    if (local_path / "config.json").exists():
+        logger.info(f"✓ Loading cross-encoder from local cache: {local_path}")
+        return CrossEncoder(str(local_path), max_length=max_length, device="cpu")
+
+    logger.info(f"↻ Cross-encoder not cached locally; downloading {model_name} once...")
+    model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+    local_path.mkdir(parents=True, exist_ok=True)
+    model.save(str(local_path))
+    logger.info(f"✓ Cached cross-encoder to: {local_path}")
+    return model
+
+
+class CrossEncoderReranker:
+    """
+    CPU cross-encoder reranking with caching and a latency budget.
+
+    The model is loaded from a local artifact cache (no hub round-trip on
+    startup) and its Linear layers are dynamically quantized to int8.
+    Scores are cached per (normalized query, document id); ids are content
+    hashes, so a cached score can never belong to stale text. Pairs are
+    scored in batches, and an EWMA of per-pair latency decides how many
+    uncached candidates fit in the latency budget. Candidates beyond that
+    are left unscored and keep their dense order.
+    """
+
+    def __init__(self,
+                 model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 cache_dir: str = "models/reranker",
+                 batch_size: int = 32,
+                 quantize: bool = True,
+                 max_length: int = 512,
+                 latency_budget_ms: Optional[float] = None,
+                 score_cache_size: int = 50000):
+        """
+        Args:
+            model_name: Hugging Face cross-encoder id
+            cache_dir: Local directory the model is saved to and loaded from
+            batch_size: Pairs per forward pass
+            quantize: Apply int8 dynamic quantization to Linear layers
+            max_length: Maximum tokens per pair
+            latency_budget_ms: Default time allowed for scoring per query (None = unlimited)
+            score_cache_size: (query, doc id) scores kept in memory
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.score_cache_size = score_cache_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.ms_per_pair: Optional[float] = None
+        self.cache_hits = 0
+        self.pairs_scored = 0
+
+        self.model = load_cross_encoder(model_name, cache_dir, max_length=max_length)
+        self.quantized = self._quantize() if quantize else False
+
+        if latency_budget_ms is not None:
+            # Seed the latency estimate so the first real query is already budgeted
+            self._predict([("warm up", "warm up")] * batch_size)
+
+        logger.info(f"✓ Reranker ready: {model_name} "
+                    f"({'int8' if self.quantized else 'fp32'}, batch size {batch_size})")
+
+    def _quantize(self) -> bool:
+        """Swap the underlying transformer for an int8 dynamically quantized copy"""
+        try:
+            import torch
+            self.model.model = torch.quantization.quantize_dynamic(
+                self.model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"⚠ int8 quantization unavailable, using fp32 reranker: {e}")
+            return False
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Score pairs and update the per-pair latency estimate"""
+        t0 = time.perf_counter()
+        scores = np.asarray(
+            self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+            dtype=np.float32
+        ).reshape(-1)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        observed = elapsed_ms / max(len(pairs), 1)
+        with self._lock:
+            self.ms_per_pair = observed if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * observed
+            self.pairs_scored += len(pairs)
+        return scores
+
+    def score(self,
+              query: str,
+              candidates: List[Dict],
+              latency_budget_ms: Optional[float] = None) -> List[Optional[float]]:
+        """
+        Cross-encoder scores for candidates in their given (dense) order
+
+        Args:
+            query: User query
+            candidates: Dicts with 'id' and 'document', best dense match first
+            latency_budget_ms: Time allowed for uncached pairs (defaults to the
+                reranker's budget)
+
+        Returns:
+            One score per candidate; None for candidates that did not fit the budget
+        """
+        key = normalize_query(query)
+        budget = latency_budget_ms if latency_budget_ms is not None else self.latency_budget_ms
+
+        scores: List[Optional[float]] = [None] * len(candidates)
+        with self._lock:
+            for i, doc in enumerate(candidates):
+                cached = self._scores.get((key, doc['id']))
+                if cached is not None:
+                    self._scores.move_to_end((key, doc['id']))
+                    scores[i] = cached
+            self.cache_hits += sum(score is not None for score in scores)
+            ms_per_pair = self.ms_per_pair
+
+        todo = [i for i, score in enumerate(scores) if score is None]
+        if budget is not None and ms_per_pair:
+            allowed = max(1, int(budget / ms_per_pair))
+            if allowed < len(todo):
+                logger.info(f"   Latency budget {budget:.0f}ms: reranking {allowed} of "
+                            f"{len(todo)} uncached candidates")
+                todo = todo[:allowed]
+
+        if todo:
+            new_scores = self._predict([(query, candidates[i]['document']) for i in todo])
+            with self._lock:
+                for i, value in zip(todo, new_scores):
+                    scores[i] = float(value)
+                    self._scores[(key, candidates[i]['id'])] = float(value)
+                while len(self._scores) > self.score_cache_size:
+                    self._scores.popitem(last=False)
+
+        return scores
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'model': self.model_name,
+                'quantized': self.quantized,
+                'ms_per_pair': self.ms_per_pair,
+                'pairs_scored': self.pairs_scored,
+                'score_cache_hits': self.cache_hits,
+                'score_cache_entries': len(self._scores)
+            }
@@ -1,8 +1,18 @@
-from sentence_transformers import SentenceTransformer
 from .vector_store import VectorStore
+from .embedding_cache import QueryEmbeddingCache
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
+import sys
+from pathlib import Path
+
+try:
+    from ..embeddings.encoder_service import BatchingEncoder
+    from ..embeddings.shared_models import acquire_model, release_model
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from embeddings.encoder_service import BatchingEncoder
+    from embeddings.shared_models import acquire_model, release_model
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,47 +21,102 @@ class BaselineRetriever:
     def __init__(self, 
                  embedding_model: str = "all-mpnet-base-v2",
                  vector_store_dir: str = "models/vector_store",
-                 collection_name: str = "gitlab_onboarding"):
+                 collection_name: str = "gitlab_onboarding",
+                 search_backend: str = "auto",
+                 embeddings_dir: str = "models/embeddings",
+                 query_cache_size: int = 10000,
+                 query_cache_path: Optional[str] = None,
+                 encoder_max_batch_size: int = 64,
+                 encoder_max_wait_ms: float = 5.0):
 
         logger.info("Initializing BaselineRetriever...")
         
         logger.info(f"Loading embedding model: {embedding_model}")
-        self.encoder = SentenceTransformer(embedding_model)
+        self.encoder = BatchingEncoder(acquire_model(embedding_model),
+                                       max_batch_size=encoder_max_batch_size,
+                                       max_wait_ms=encoder_max_wait_ms)
         self.model_name = embedding_model
+        self.query_cache = QueryEmbeddingCache(embedding_model, max_entries=query_cache_size,
+                                               persist_path=query_cache_path)
         
         logger.info(f"Connecting to vector store: {vector_store_dir}")
         self.vector_store = VectorStore(
             collection_name=collection_name,
-            persist_directory=vector_store_dir
+            persist_directory=vector_store_dir,
+            backend=search_backend,
+            embeddings_dir=embeddings_dir
         )
         
         logger.info(" BaselineRetriever initialized successfully!")
     
-    def retrieve(self, query: str, k: int = 5) -> List[Dict]:
+    def retrieve(self, query: str, k: int = 5, where: Optional[Dict] = None) -> List[Dict]:
 
         logger.info(f"Query: {query}")
         logger.info(f"Retrieving top-{k} documents...")
         
-        query_embedding = self.encoder.encode(query, normalize_embeddings=True)
+        query_embedding = self._encode_queries([query])[0]
         
         results = self.vector_store.query(
             query_embedding=query_embedding,
-            n_results=k
+            n_results=k,
+            where=where
         )
         
+        retrieved_docs = self._format_results(results, 0)
+        
+        logger.info(f" Retrieved {len(retrieved_docs)} documents")
+        return retrieved_docs
+    
+    def retrieve_batch(self, queries: List[str], k: int = 5, where: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Retrieve top-k documents for many queries with one encode pass and
+        one vector store round-trip
+        
+        Args:
+            queries: List of query strings
+            k: Number of documents to retrieve per query
+            where: Optional metadata filter, e.g. {"source_type": "handbook"}
+            
+        Returns:
+            One list of retrieved documents per query, in input order
+        """
+        if not queries:
+            return []
+        
+        logger.info(f"Retrieving top-{k} documents for {len(queries)} queries...")
+        
+        query_embeddings = self._encode_queries(queries)
+        
+        results = self.vector_store.query_batch(query_embeddings, n_results=k, where=where)
+        
+        return [self._format_results(results, row) for row in range(len(queries))]
+    
+    def close(self):
+        """Stop the encoder worker and release the shared embedding model"""
+        self.encoder.close()
+        release_model(self.model_name)
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode queries, reusing cached embeddings for ones seen before"""
+        return self.query_cache.encode(
+            queries,
+            lambda missing: self.encoder.encode(missing, normalize_embeddings=True, convert_to_numpy=True)
+        )
+    
+    def _format_results(self, results: Dict, row: int) -> List[Dict]:
+        """Convert one row of a Chroma-style result dict into document dicts"""
         retrieved_docs = []
-        for i in range(len(results['ids'][0])):
+        for i in range(len(results['ids'][row])):
             doc = {
                 'rank': i + 1,
-                'id': results['ids'][0][i],
-                'document': results['documents'][0][i],
-                'distance': results['distances'][0][i],
-                'similarity': 1 - results['distances'][0][i],  
-                'metadata': results['metadatas'][0][i] if results['metadatas'][0] else {}
+                'id': results['ids'][row][i],
+                'document': results['documents'][row][i],
+                'distance': results['distances'][row][i],
+                'similarity': 1 - results['distances'][row][i],  
+                'metadata': results['metadatas'][row][i] if results['metadatas'][row] else {}
             }
             retrieved_docs.append(doc)
         
-        logger.info(f" Retrieved {len(retrieved_docs)} documents")
         return retrieved_docs
     
     def print_results(self, results: List[Dict], show_full_text: bool = False):
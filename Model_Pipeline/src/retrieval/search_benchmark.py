@@ -0,0 +1,172 @@
+"""
+Recall and latency of the in-process search backends
+
+Loads each backend configuration over the same embedding artifacts and
+measures single-query p50/p99 latency, hot index memory and recall@k
+against exact float32 brute-force search (the default "numpy" path).
+
+Usage:
+    python src/retrieval/search_benchmark.py --embeddings-dir models/embeddings \
+        --pca-components 64 128 256
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .vector_store import SEARCH_BACKENDS
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from vector_store import SEARCH_BACKENDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def default_configs(pca_components: Sequence[int] = (64, 128, 256)) -> List[Tuple[str, str, Dict]]:
+    """(label, backend, options) for the current path and each reduced variant"""
+    configs = [("exact", "numpy", {})]
+    configs += [(f"pca-{n}", "pca", {"components": n}) for n in pca_components]
+    configs.append(("binary", "binary", {}))
+    # Offline tool: train IVF-PQ indexes that were not built at indexing time
+    configs.append(("ivfpq", "ivfpq", {"build_if_missing": True}))
+    configs += [(f"ivfpq+pca-{n}", "ivfpq", {"pca_components": n, "build_if_missing": True})
+                for n in pca_components]
+    return configs
+
+
+def hot_index_bytes(backend) -> int:
+    """RAM a backend needs for its first-pass scan"""
+    index = getattr(backend, 'index', None)
+    if index is not None and hasattr(index, 'nbytes'):
+        return index.nbytes
+    compact = getattr(backend, 'compact', None)
+    if compact is not None:
+        return compact.nbytes
+    return backend.embeddings.nbytes
+
+
+def run_benchmark(embeddings_dir: str,
+                  configs: Optional[List[Tuple[str, str, Dict]]] = None,
+                  k: int = 10,
+                  num_queries: int = 200,
+                  seed: int = 42) -> Dict:
+    """
+    Benchmark backend configurations against exact search
+
+    Queries are sampled from the corpus; ground truth is the exact top-k, so
+    recall reflects only the approximation error of each configuration.
+
+    Args:
+        embeddings_dir: Directory with the embedding matrix, texts.json and metadata.json
+        configs: (label, backend name, backend options) triples (default: default_configs())
+        k: Number of results per query
+        num_queries: Number of sampled queries
+        seed: Random seed for query sampling
+
+    Returns:
+        Dictionary with the benchmark configuration and one result row per setting
+    """
+    configs = configs or default_configs()
+    exact = SEARCH_BACKENDS["numpy"](embeddings_dir)
+    k = min(k, exact.count())
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(exact.count(), size=min(num_queries, exact.count()), replace=False))
+    queries = np.asarray(exact.embeddings[sample], dtype=np.float32)
+
+    logger.info(f"Computing exact top-{k} ground truth for {len(queries)} queries...")
+    truth = exact.query(queries, n_results=k, include_documents=False)['ids']
+
+    recall_key = f'recall@{k}'
+    rows = []
+    for label, backend_name, options in configs:
+        logger.info(f"\n🔧 Loading {label} ({backend_name}, {options})")
+        t0 = time.perf_counter()
+        backend = exact if label == "exact" else SEARCH_BACKENDS[backend_name](embeddings_dir, **options)
+        load_seconds = time.perf_counter() - t0
+
+        latencies = []
+        found = []
+        for query in queries:
+            t0 = time.perf_counter()
+            result = backend.query(query[None, :], n_results=k, include_documents=False)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(result['ids'][0])
+
+        rows.append({
+            'label': label,
+            'backend': backend_name,
+            'options': options,
+            'load_seconds': load_seconds,
+            'hot_bytes': hot_index_bytes(backend),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            recall_key: float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+        })
+
+    baseline = rows[0]
+    for row in rows:
+        row['speedup'] = baseline['p50_ms'] / max(row['p50_ms'], 1e-9)
+        row['memory_ratio'] = baseline['hot_bytes'] / max(row['hot_bytes'], 1)
+
+    return {
+        'embeddings_dir': str(embeddings_dir),
+        'num_vectors': exact.count(),
+        'dim': exact.embeddings.shape[1],
+        'num_queries': len(queries),
+        'k': k,
+        'results': rows
+    }
+
+
+def print_benchmark_table(report: Dict):
+    """Print benchmark results as a table"""
+    recall_key = f"recall@{report['k']}"
+    print("\n" + "=" * 92)
+    print(f" SEARCH BENCHMARK: {report['num_vectors']} x {report['dim']}d vectors, "
+          f"{report['num_queries']} queries, k={report['k']}")
+    print("=" * 92)
+    print(f"  {'config':<16} {'hot (MB)':>9} {'vs exact':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'speedup':>8} {recall_key:>10}")
+    for row in report['results']:
+        print(
+            f"  {row['label']:<16} {row['hot_bytes'] / 1024 / 1024:>9.2f} {row['memory_ratio']:>8.1f}x "
+            f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['speedup']:>7.1f}x {row[recall_key]:>10.3f}"
+        )
+    print("=" * 92)
+
+
+def save_benchmark(report: Dict, output_path: str = "experiments/search_benchmark.json"):
+    """Save benchmark results to JSON"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Benchmark results saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-process search backends for recall vs latency")
+    parser.add_argument("--embeddings-dir", default="models/embeddings")
+    parser.add_argument("--pca-components", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--output", default="experiments/search_benchmark.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.embeddings_dir,
+        configs=default_configs(args.pca_components),
+        k=args.k,
+        num_queries=args.num_queries
+    )
+    print_benchmark_table(report)
+    save_benchmark(report, args.output)
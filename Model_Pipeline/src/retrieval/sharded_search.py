@@ -0,0 +1,227 @@
+import atexit
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from ..embeddings.quantization import QuantizedMatrix
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from embeddings.quantization import QuantizedMatrix
+
+try:
+    from .numpy_backend import NumpyBackend, top_k_rows
+except ImportError:
+    from numpy_backend import NumpyBackend, top_k_rows
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Each worker is one core; stop BLAS from oversubscribing it with threads
+_SINGLE_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def shard_of(doc_id: str, num_shards: int) -> int:
+    """Stable shard assignment from a document id"""
+    return int(hashlib.md5(doc_id.encode('utf-8')).hexdigest()[:8], 16) % num_shards
+
+
+def _shard_worker(conn, embeddings_dir: str, rows: np.ndarray, fmt: Optional[str], block_size: int):
+    """
+    Worker process: hold one shard's normalized vectors in RAM and answer
+    top-k requests from the coordinator until it sends None
+
+    Requests are answered in arrival order; each reply carries the id of
+    its request so the coordinator can have several queries in flight.
+    """
+    try:
+        matrix = QuantizedMatrix.load(embeddings_dir, fmt)
+        dtype = np.float16 if matrix.format == "float16" else np.float32
+        vectors = np.empty((len(rows), matrix.shape[1]), dtype=dtype)
+        for start in range(0, len(rows), block_size):
+            block = matrix[rows[start:start + block_size]]
+            block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+            vectors[start:start + len(block)] = block
+        conn.send(('ready', len(rows)))
+    except Exception as e:
+        conn.send(('error', repr(e)))
+        return
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        request_id, queries, k, mask = message
+        try:
+            best_idx, best_scores = None, None
+            for start in range(0, len(rows), block_size):
+                scores = queries @ vectors[start:start + block_size].T.astype(np.float32, copy=False)
+                if mask is not None:
+                    scores[:, ~mask[start:start + block_size]] = -np.inf
+                idx, block_scores = top_k_rows(scores, k)
+                idx = idx + start
+                if best_idx is not None:
+                    idx = np.concatenate([best_idx, idx], axis=1)
+                    block_scores = np.concatenate([best_scores, block_scores], axis=1)
+                    keep, block_scores = top_k_rows(block_scores, k)
+                    idx = np.take_along_axis(idx, keep, axis=1)
+                best_idx, best_scores = idx, block_scores
+            conn.send((request_id, 'ok', (rows[best_idx], best_scores)))
+        except Exception as e:
+            conn.send((request_id, 'error', repr(e)))
+
+
+class ShardedSearchBackend(NumpyBackend):
+    """
+    Scatter-gather exact search across worker processes.
+
+    Rows are assigned to num_shards shards by a hash of their document id.
+    Each worker process loads its shard once (in parallel with the others)
+    and keeps it in its own memory; a query is fanned out to every shard,
+    each returns its local top-k, and the coordinator merges them into the
+    global top-k. Metadata filters are evaluated in the coordinator and sent
+    to each shard as a row mask.
+
+    Requests are tagged with ids and one reader thread per shard routes
+    replies back to the waiting caller, so concurrent queries queue up at
+    the workers instead of waiting for each other's full round-trip.
+    """
+
+    def __init__(self,
+                 embeddings_dir: str,
+                 num_shards: Optional[int] = None,
+                 quantization: Optional[str] = None,
+                 **kwargs):
+        """
+        Args:
+            embeddings_dir: Directory with the embedding artifacts
+            num_shards: Worker processes (defaults to the number of CPUs)
+            quantization: Artifact format workers load ("float16" halves shard RAM);
+                defaults to the most precise format available
+        """
+        super().__init__(embeddings_dir, **kwargs)
+        self.num_shards = max(1, min(num_shards or os.cpu_count() or 1, self.count()))
+
+        assignment = np.fromiter((shard_of(doc_id, self.num_shards) for doc_id in self.ids),
+                                 dtype=np.int64, count=self.count())
+        self.shard_rows: List[np.ndarray] = [np.flatnonzero(assignment == s) for s in range(self.num_shards)]
+
+        t0 = time.perf_counter()
+        ctx = mp.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        saved_env = {name: os.environ.get(name) for name in _SINGLE_THREAD_ENV}
+        os.environ.update({name: "1" for name in _SINGLE_THREAD_ENV})
+        try:
+            for rows in self.shard_rows:
+                parent_conn, child_conn = ctx.Pipe()
+                process = ctx.Process(
+                    target=_shard_worker,
+                    args=(child_conn, str(embeddings_dir), rows, quantization, self.block_size),
+                    daemon=True
+                )
+                process.start()
+                self._connections.append(parent_conn)
+                self._processes.append(process)
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+        # Connection.send is not thread-safe; replies are read by one reader thread per shard
+        self._send_locks = [threading.Lock() for _ in self._connections]
+        atexit.register(self.close)
+        for shard, conn in enumerate(self._connections):
+            status, payload = conn.recv()
+            if status != 'ready':
+                self.close()
+                raise RuntimeError(f"Shard {shard} failed to load: {payload}")
+
+        # In-flight requests per shard (request id -> Future); a shard whose
+        # reader has stopped accepts no new requests
+        self._request_ids = itertools.count()
+        self._pending: List[Dict[int, Future]] = [{} for _ in self._connections]
+        self._shard_down = [False] * len(self._connections)
+        self._pending_lock = threading.Lock()
+        for shard, conn in enumerate(self._connections):
+            threading.Thread(target=self._read_replies, args=(shard, conn), daemon=True).start()
+
+        logger.info(
+            f"✓ Sharded search backend ready: {self.count()} vectors in {self.num_shards} shards "
+            f"({time.perf_counter() - t0:.1f}s to load)"
+        )
+
+    def _read_replies(self, shard: int, conn):
+        """Reader thread: resolve each reply's Future until the worker's pipe closes"""
+        while True:
+            try:
+                request_id, status, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending[shard].pop(request_id, None)
+            if future is None:
+                continue
+            if status == 'ok':
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"Shard search failed: {payload}"))
+
+        with self._pending_lock:
+            self._shard_down[shard] = True
+            orphaned, self._pending[shard] = self._pending[shard], {}
+        for future in orphaned.values():
+            future.set_exception(RuntimeError(f"Shard {shard} worker stopped"))
+
+    def _send(self, shard: int, queries, k: int, mask) -> Future:
+        """Queue one request on a shard's worker"""
+        future = Future()
+        request_id = next(self._request_ids)
+        with self._pending_lock:
+            if self._shard_down[shard]:
+                raise RuntimeError(f"Shard {shard} worker stopped")
+            self._pending[shard][request_id] = future
+        with self._send_locks[shard]:
+            self._connections[shard].send((request_id, queries, k, mask))
+        return future
+
+    def _search(self, queries, n_results, mask):
+        futures = []
+        for shard, rows in enumerate(self.shard_rows):
+            shard_mask = mask[rows] if mask is not None else None
+            if len(rows) == 0 or (shard_mask is not None and not shard_mask.any()):
+                continue
+            futures.append(self._send(shard, queries, min(n_results, len(rows)), shard_mask))
+
+        replies = [future.result() for future in futures]
+
+        indices = np.concatenate([payload[0] for payload in replies], axis=1)
+        scores = np.concatenate([payload[1] for payload in replies], axis=1)
+        keep, scores = top_k_rows(scores, n_results)
+        return np.take_along_axis(indices, keep, axis=1), scores
+
+    def close(self):
+        """Stop the worker processes"""
+        for conn, send_lock in zip(getattr(self, '_connections', []), getattr(self, '_send_locks', [])):
+            try:
+                with send_lock:
+                    conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in getattr(self, '_processes', []):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._connections, self._processes, self._send_locks = [], [], []
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = "onboarding_ai/vector_store_snapshots/"
+LATEST_POINTER = "LATEST.json"
+
+# Written into a restored persist directory to record which snapshot it holds
+SNAPSHOT_MARKER = "snapshot.json"
+
+# Never packed: transient indexing state and the marker itself
+_EXCLUDED = {SNAPSHOT_MARKER, "index_checkpoint.json", "index_checkpoint.json.tmp"}
+
+
+def _sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Streaming sha256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def create_snapshot_archive(persist_directory: str, output_dir: str) -> Tuple[Path, str]:
+    """
+    Pack a persist directory into a reproducible tar.gz named by its sha256
+
+    Members are added in sorted order with zeroed mtimes and owners, so an
+    unchanged index always produces the same archive and hash.
+
+    Returns:
+        Tuple of (archive path, sha256 hex digest)
+    """
+    persist_directory = Path(persist_directory)
+    tmp_path = Path(output_dir) / "vector_store_snapshot.tar.gz.tmp"
+
+    def normalize(info: tarfile.TarInfo) -> tarfile.TarInfo:
+        info.mtime = 0
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        return info
+
+    with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz, \
+            tarfile.open(fileobj=gz, mode='w') as tar:
+        for path in sorted(persist_directory.rglob('*')):
+            if path.name in _EXCLUDED or not path.is_file():
+                continue
+            tar.add(path, arcname=str(path.relative_to(persist_directory)), filter=normalize)
+
+    sha256 = _sha256(tmp_path)
+    archive_path = Path(output_dir) / f"vector_store_{sha256[:16]}.tar.gz"
+    os.replace(tmp_path, archive_path)
+    return archive_path, sha256
+
+
+def upload_snapshot(bucket, persist_directory: str, prefix: str = SNAPSHOT_PREFIX,
+                    extra_info: Optional[Dict] = None) -> Dict:
+    """
+    Archive a persist directory, upload it and point LATEST.json at it
+
+    The archive blob is content-addressed, so re-publishing an unchanged
+    index only rewrites the pointer.
+
+    Args:
+        bucket: GCS bucket
+        persist_directory: Fully built Chroma persist directory
+        prefix: GCS prefix for archives and the pointer
+        extra_info: Extra fields recorded in the pointer (e.g. document count)
+
+    Returns:
+        The pointer written to LATEST.json
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        t0 = time.perf_counter()
+        archive_path, sha256 = create_snapshot_archive(persist_directory, work_dir)
+        size = archive_path.stat().st_size
+        logger.info(f"✓ Packed {persist_directory} into {archive_path.name} "
+                    f"({size / 1024 / 1024:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+
+        blob = bucket.blob(f"{prefix}{archive_path.name}")
+        if blob.exists():
+            logger.info(f"  ✓ Snapshot already in bucket: {blob.name}")
+        else:
+            blob.upload_from_filename(str(archive_path))
+            logger.info(f"  ✓ Uploaded snapshot: gs://{bucket.name}/{blob.name}")
+
+    pointer = {
+        'archive': archive_path.name,
+        'sha256': sha256,
+        'bytes': size,
+        'created_at': datetime.now().isoformat(),
+        **(extra_info or {})
+    }
+    bucket.blob(f"{prefix}{LATEST_POINTER}").upload_from_string(
+        json.dumps(pointer, indent=2), content_type="application/json"
+    )
+    logger.info(f"  ✓ Updated {prefix}{LATEST_POINTER}")
+    return pointer
+
+
+def _safe_extract(tar: tarfile.TarFile, target_dir: Path):
+    """Extract regular files only, refusing paths that escape target_dir"""
+    target_dir = target_dir.resolve()
+    for member in tar.getmembers():
+        if not (member.isfile() or member.isdir()):
+            raise ValueError(f"Refusing to extract non-regular member: {member.name}")
+        if not (target_dir / member.name).resolve().is_relative_to(target_dir):
+            raise ValueError(f"Refusing to extract path outside target: {member.name}")
+    if hasattr(tarfile, 'data_filter'):
+        tar.extractall(target_dir, filter='data')
+    else:
+        tar.extractall(target_dir)
+
+
+def read_snapshot_marker(persist_directory: str) -> Optional[Dict]:
+    """Pointer of the snapshot a persist directory was restored from, if any"""
+    marker = Path(persist_directory) / SNAPSHOT_MARKER
+    if not marker.exists():
+        return None
+    with open(marker, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def restore_snapshot(bucket, persist_directory: str, prefix: str = SNAPSHOT_PREFIX) -> Optional[Dict]:
+    """
+    Replace a persist directory with the latest snapshot from GCS
+
+    The archive is downloaded next to the persist directory, checked against
+    the sha256 in LATEST.json, unpacked into a staging directory and swapped
+    in with renames, so a failed restore never leaves a half-written index.
+    Nothing is downloaded if the directory already holds that snapshot.
+
+    Args:
+        bucket: GCS bucket
+        persist_directory: Chroma persist directory to populate
+        prefix: GCS prefix for archives and the pointer
+
+    Returns:
+        The restored pointer, or None if no snapshot is published
+    """
+    pointer_blob = bucket.blob(f"{prefix}{LATEST_POINTER}")
+    if not pointer_blob.exists():
+        logger.info(f"No vector store snapshot at gs://{bucket.name}/{prefix}{LATEST_POINTER}")
+        return None
+    pointer = json.loads(pointer_blob.download_as_text())
+
+    persist_directory = Path(persist_directory)
+    current = read_snapshot_marker(persist_directory)
+    if current and current.get('sha256') == pointer['sha256']:
+        logger.info(f"✓ Vector store already at snapshot {pointer['archive']}")
+        return pointer
+
+    t0 = time.perf_counter()
+    persist_directory.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".restore_", dir=persist_directory.parent))
+    try:
+        archive_path = staging / pointer['archive']
+        bucket.blob(f"{prefix}{pointer['archive']}").download_to_filename(str(archive_path))
+
+        sha256 = _sha256(archive_path)
+        if sha256 != pointer['sha256']:
+            raise ValueError(f"Snapshot checksum mismatch for {pointer['archive']}: "
+                             f"expected {pointer['sha256']}, got {sha256}")
+
+        unpacked = staging / "vector_store"
+        unpacked.mkdir()
+        with tarfile.open(archive_path, 'r:gz') as tar:
+            _safe_extract(tar, unpacked)
+        with open(unpacked / SNAPSHOT_MARKER, 'w', encoding='utf-8') as f:
+            json.dump(pointer, f, indent=2)
+
+        # Swap directories: old index is only removed once the new one is in place
+        previous = staging / "previous"
+        if persist_directory.exists():
+            os.replace(persist_directory, previous)
+        os.replace(unpacked, persist_directory)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    logger.info(f"✓ Restored vector store snapshot {pointer['archive']} "
+                f"({pointer['bytes'] / 1024 / 1024:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+    return pointer
@@ -0,0 +1,186 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .indexing import content_hash_ids
+except ImportError:
+    from indexing import content_hash_ids
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEXT_STORE_BLOB = "text_store.bin"
+TEXT_STORE_OFFSETS = "text_store_offsets.npy"
+TEXT_STORE_IDS = "text_store_ids.npy"
+TEXT_STORE_SORTED_IDS = "text_store_sorted_ids.npy"
+TEXT_STORE_SORTED_ROWS = "text_store_sorted_rows.npy"
+TEXT_STORE_INFO = "text_store_info.json"
+
+
+def source_fingerprint(input_dir: Path) -> Optional[Dict]:
+    """Size and mtime of texts.json/metadata.json, used to detect a stale store"""
+    fingerprint = {}
+    for name in ("texts.json", "metadata.json"):
+        path = input_dir / name
+        if not path.exists():
+            return None
+        stat = path.stat()
+        fingerprint[name] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+class _IdView(Sequence):
+    """Read-only sequence of document ids backed by a memory-mapped array"""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [value.decode('utf-8') for value in self._ids[index]]
+        return self._ids[index].decode('utf-8')
+
+
+class TextStore:
+    """
+    Document texts and metadata kept out of RAM.
+
+    Each row's {"text", "metadata"} record is stored as UTF-8 JSON in one
+    blob file, with an int64 offsets array marking where each row starts.
+    Both are memory-mapped, so only the rows actually returned to the
+    caller are read and parsed. Ids are stored in row order and as a sorted
+    copy for O(log n) id -> row lookups.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = Path(store_dir)
+        self.offsets = np.load(self.store_dir / TEXT_STORE_OFFSETS, mmap_mode='r')
+        self._ids = np.load(self.store_dir / TEXT_STORE_IDS, mmap_mode='r')
+        self._sorted_ids = np.load(self.store_dir / TEXT_STORE_SORTED_IDS, mmap_mode='r')
+        self._sorted_rows = np.load(self.store_dir / TEXT_STORE_SORTED_ROWS, mmap_mode='r')
+        blob_path = self.store_dir / TEXT_STORE_BLOB
+        if blob_path.stat().st_size:
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def ids(self) -> Sequence[str]:
+        """Document ids in row order"""
+        return _IdView(self._ids)
+
+    @classmethod
+    def build(cls,
+              texts: List[str],
+              metadatas: List[Dict],
+              output_dir: str,
+              ids: Optional[List[str]] = None,
+              source_fingerprint: Optional[Dict] = None) -> "TextStore":
+        """
+        Write a text store for a corpus
+
+        Args:
+            texts: Document texts
+            metadatas: Metadata dicts aligned with texts
+            output_dir: Directory to write the store files into
+            ids: Document ids (defaults to content hashes, matching the vector store)
+            source_fingerprint: Recorded so open_or_build can detect a stale store
+
+        Returns:
+            The opened store
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        ids = ids if ids is not None else content_hash_ids(texts, metadatas)
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        with open(output_dir / TEXT_STORE_BLOB, 'wb') as f:
+            for row, (text, meta) in enumerate(zip(texts, metadatas)):
+                record = json.dumps({'text': text, 'metadata': meta}, ensure_ascii=False).encode('utf-8')
+                f.write(record)
+                offsets[row + 1] = offsets[row] + len(record)
+        np.save(output_dir / TEXT_STORE_OFFSETS, offsets)
+
+        encoded_ids = np.array([doc_id.encode('utf-8') for doc_id in ids], dtype=bytes)
+        order = np.argsort(encoded_ids, kind='stable')
+        np.save(output_dir / TEXT_STORE_IDS, encoded_ids)
+        np.save(output_dir / TEXT_STORE_SORTED_IDS, encoded_ids[order])
+        np.save(output_dir / TEXT_STORE_SORTED_ROWS, order.astype(np.int64))
+
+        with open(output_dir / TEXT_STORE_INFO, 'w', encoding='utf-8') as f:
+            json.dump({'num_rows': len(texts), 'source': source_fingerprint}, f, indent=2)
+
+        logger.info(f"✓ Built text store: {len(texts)} documents, "
+                    f"{offsets[-1] / 1024 / 1024:.1f} MB in {output_dir}")
+        return cls(output_dir)
+
+    @classmethod
+    def open_or_build(cls, input_dir: str) -> "TextStore":
+        """
+        Open the text store in input_dir, (re)building it from texts.json and
+        metadata.json if it is missing or older than those files
+        """
+        input_dir = Path(input_dir)
+        fingerprint = source_fingerprint(input_dir)
+        info_path = input_dir / TEXT_STORE_INFO
+
+        if info_path.exists():
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            # A shipped store without its JSON sources is used as-is
+            if fingerprint is None or info.get('source') == fingerprint:
+                return cls(input_dir)
+            logger.info("Text store is stale; rebuilding from texts.json/metadata.json")
+        elif fingerprint is None:
+            raise FileNotFoundError(f"No text store or texts.json/metadata.json in {input_dir}")
+
+        with open(input_dir / "texts.json", 'r', encoding='utf-8') as f:
+            texts = json.load(f)
+        with open(input_dir / "metadata.json", 'r', encoding='utf-8') as f:
+            metadatas = json.load(f)
+        return cls.build(texts, metadatas, str(input_dir), source_fingerprint=fingerprint)
+
+    def _record(self, row: int) -> Dict:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.blob[start:end].tobytes().decode('utf-8'))
+
+    def get_rows(self, rows: Sequence[int]) -> Tuple[List[str], List[Dict]]:
+        """Texts and metadata for the given rows"""
+        records = [self._record(int(row)) for row in rows]
+        return [r['text'] for r in records], [r['metadata'] for r in records]
+
+    def iter_metadatas(self) -> Iterator[Dict]:
+        """Stream every row's metadata without materialising the corpus"""
+        for row in range(len(self)):
+            yield self._record(row)['metadata']
+
+    def rows_for_ids(self, ids: Sequence[str]) -> np.ndarray:
+        """Row of each id, or -1 where the id is unknown"""
+        if not len(ids) or not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        targets = np.array([doc_id.encode('utf-8') for doc_id in ids], dtype=bytes)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, targets), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == targets
+        return np.where(found, self._sorted_rows[pos], -1)
+
+    def get(self, ids: Sequence[str]) -> Dict:
+        """
+        collection.get()-style lookup by id
+
+        Returns:
+            Dict with ids, documents and metadatas for the ids that exist, in request order
+        """
+        rows = self.rows_for_ids(ids)
+        known = [(doc_id, row) for doc_id, row in zip(ids, rows) if row >= 0]
+        texts, metadatas = self.get_rows([row for _, row in known])
+        return {'ids': [doc_id for doc_id, _ in known], 'documents': texts, 'metadatas': metadatas}
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    Wall-clock time per named stage of one request, in milliseconds.
+
+    Each stage costs two perf_counter() calls and a dict update, so timing
+    can stay on for every request. Repeated stages accumulate.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block under name"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def add(self, timings: Optional[Dict[str, float]], exclude: Iterable[str] = ('total',)):
+        """Merge stage timings measured elsewhere (e.g. a nested component's result)"""
+        for name, ms in (timings or {}).items():
+            if name not in exclude:
+                self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage timings plus 'total' since the timer was created"""
+        result = {name: round(ms, 3) for name, ms in self.timings.items()}
+        result['total'] = round((time.perf_counter() - self._started) * 1000, 3)
+        return result
+
+
+class LatencyStats:
+    """
+    Rolling window of per-stage timings for percentile summaries.
+
+    Keeps the last max_samples values per stage; stages missing from a
+    request (e.g. reranking skipped) simply contribute no sample.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        """
+        Args:
+            max_samples: Samples kept per stage
+        """
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Optional[Dict[str, float]]):
+        """Add one request's timings"""
+        with self._lock:
+            for name, ms in (timings or {}).items():
+                self._samples.setdefault(name, deque(maxlen=self.max_samples)).append(ms)
+
+    def percentiles(self, q: Iterable[float] = (50, 95, 99)) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            {stage: {'count': n, 'mean': ..., 'p50': ..., 'p95': ..., ...}} in ms
+        """
+        q = list(q)
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=np.float64) for name, values in self._samples.items()}
+        summary = {}
+        for name, values in samples.items():
+            if not len(values):
+                continue
+            stats = {'count': int(len(values)), 'mean': float(values.mean())}
+            stats.update({f"p{p:g}": float(v) for p, v in zip(q, np.percentile(values, q))})
+            summary[name] = stats
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
@@ -5,13 +5,81 @@ import json
 from typing import List, Dict, Optional
 import logging
 from pathlib import Path
+import sys
 from google.cloud import storage
 from google.oauth2 import service_account
 import os
 
+try:
+    from .indexing import (checkpoint_matches, content_hash_ids, first_occurrence_rows, ids_digest,
+                           stream_index_embeddings, sync_collection)
+    from .numpy_backend import ExactSearchBackend
+    from .ivfpq_index import IVFPQBackend, IVFPQIndex, ivfpq_index_path
+    from .pca_index import PCABackend, PCAIndex, pca_index_path
+    from .binary_index import BINARY_INDEX_FILE, BinaryBackend, BinaryIndex
+    from .sharded_search import ShardedSearchBackend
+    from .partitions import PartitionedCollection
+    from .snapshot import SNAPSHOT_PREFIX, restore_snapshot, upload_snapshot
+    from .text_store import TextStore
+except ImportError:
+    from indexing import (checkpoint_matches, content_hash_ids, first_occurrence_rows, ids_digest,
+                          stream_index_embeddings, sync_collection)
+    from numpy_backend import ExactSearchBackend
+    from ivfpq_index import IVFPQBackend, IVFPQIndex, ivfpq_index_path
+    from pca_index import PCABackend, PCAIndex, pca_index_path
+    from binary_index import BINARY_INDEX_FILE, BinaryBackend, BinaryIndex
+    from sharded_search import ShardedSearchBackend
+    from partitions import PartitionedCollection
+    from snapshot import SNAPSHOT_PREFIX, restore_snapshot, upload_snapshot
+    from text_store import TextStore
+
+try:
+    from ..data.artifact_fetcher import GCSArtifactFetcher
+    from ..embeddings.quantization import EMBEDDING_ARTIFACTS, QuantizedMatrix, available_format
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from data.artifact_fetcher import GCSArtifactFetcher
+    from embeddings.quantization import EMBEDDING_ARTIFACTS, QuantizedMatrix, available_format
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tunable Chroma HNSW parameters, as accepted in VectorStore(hnsw_params=...)
+HNSW_PARAMS = ("M", "construction_ef", "search_ef")
+
+
+def hnsw_metadata(hnsw_params: Optional[Dict] = None, space: str = "cosine") -> Dict:
+    """
+    Build Chroma collection metadata from HNSW parameters
+
+    Args:
+        hnsw_params: Any of {"M": 16, "construction_ef": 100, "search_ef": 10};
+            omitted keys keep Chroma's defaults
+        space: Distance function
+
+    Returns:
+        Metadata dict such as {"hnsw:space": "cosine", "hnsw:M": 32}
+    """
+    hnsw_params = hnsw_params or {}
+    unknown = set(hnsw_params) - set(HNSW_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameters: {sorted(unknown)}. Use any of {list(HNSW_PARAMS)}")
+    metadata = {"hnsw:space": space}
+    for name in HNSW_PARAMS:
+        if hnsw_params.get(name) is not None:
+            metadata[f"hnsw:{name}"] = int(hnsw_params[name])
+    return metadata
+
+
+# In-process search backends selectable via VectorStore(backend=...)
+SEARCH_BACKENDS = {
+    "numpy": ExactSearchBackend,
+    "ivfpq": IVFPQBackend,
+    "pca": PCABackend,
+    "binary": BinaryBackend,
+    "sharded": ShardedSearchBackend,
+}
+
 class VectorStore:
     def __init__(self, 
                  collection_name: str = "gitlab_onboarding",
@@ -19,7 +87,14 @@ class VectorStore:
                  use_gcs: bool = False,
                  bucket_name: str = "mlops-data-oa",
                  project_id: str = "mlops-476419",
-                 credentials_path: str = None):
+                 credentials_path: str = None,
+                 backend: str = "auto",
+                 embeddings_dir: Optional[str] = None,
+                 exact_search_threshold: int = 50000,
+                 backend_options: Optional[Dict] = None,
+                 partition_by: Optional[str] = None,
+                 hnsw_params: Optional[Dict] = None,
+                 snapshot_prefix: Optional[str] = None):
         """
         Initialize VectorStore with optional GCS support
         
@@ -30,6 +105,26 @@ class VectorStore:
             bucket_name: GCS bucket name
             project_id: GCP project ID
             credentials_path: Path to service account credentials
+            backend: Search backend - "chroma", one of SEARCH_BACKENDS, or "auto"
+            embeddings_dir: Directory with embeddings.npy/texts.json/metadata.json
+                used by in-process backends
+            exact_search_threshold: In "auto" mode, use exact NumPy search when
+                the corpus has at most this many vectors
+            backend_options: Extra keyword arguments for the in-process backend
+                (e.g. {"quantization": "int8", "rescore_factor": 4})
+            partition_by: Metadata field to keep per-value sub-collections for
+                (e.g. "source_type"); filtered queries on it search only the
+                matching partition(s). Opt-in: every document is stored twice
+                (global collection plus its partition), roughly doubling disk
+                use and write time, and the first open of an existing store
+                copies it whole into the partitions. Index and query with the
+                same value. None keeps a single global collection
+            hnsw_params: HNSW index parameters for this collection and its
+                partitions, e.g. {"M": 32, "construction_ef": 200, "search_ef": 100}.
+                Chroma fixes these when the collection is created
+            snapshot_prefix: GCS prefix of published index snapshots; with use_gcs,
+                the latest snapshot is restored into persist_directory before
+                opening it, so no re-indexing is needed
         """
         self.collection_name = collection_name
         self.persist_directory = persist_directory
@@ -58,66 +153,304 @@ class VectorStore:
             self.bucket = self.gcs_client.bucket(bucket_name)
             logger.info(f"✓ GCS client initialized for bucket: {bucket_name}")
         
+        # Restore a prebuilt index before Chroma opens the directory
+        self.snapshot = None
+        if self.use_gcs and snapshot_prefix:
+            try:
+                self.snapshot = restore_snapshot(self.bucket, persist_directory, snapshot_prefix)
+            except Exception as e:
+                logger.warning(f"⚠ Could not restore vector store snapshot, using local index: {e}")
+        
         # Initialize ChromaDB
         self.client = chromadb.PersistentClient(path=persist_directory)
         
+        collection_metadata = hnsw_metadata(hnsw_params)
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
-            metadata={"hnsw:space": "cosine"}  
+            metadata=collection_metadata
         )
+        self._check_hnsw_params(collection_metadata)
+        
+        # Per-value sub-collections; the global collection stays the merged index
+        self.partition_by = partition_by
+        if partition_by:
+            self.collection = PartitionedCollection(
+                self.client,
+                self.collection,
+                partition_by=partition_by,
+                persist_directory=persist_directory,
+                collection_metadata=collection_metadata
+            )
+        
+        self.embeddings_dir = embeddings_dir
+        self.last_sync_summary = None
+        self.search_backend = self._select_backend(backend, embeddings_dir, exact_search_threshold,
+                                                   backend_options or {})
+        self.text_store = self._open_text_store(embeddings_dir)
         
         logger.info(f"✓ Initialized VectorStore: {collection_name}")
         logger.info(f"✓ Persist directory: {persist_directory}")
         logger.info(f"✓ Current documents in collection: {self.collection.count()}")
+        logger.info(f"✓ Search backend: {self.backend_name}")
+    
+    def _check_hnsw_params(self, requested: Dict):
+        """Warn when an existing collection was built with different HNSW parameters"""
+        current = self.collection.metadata or {}
+        for key, value in requested.items():
+            if key != "hnsw:space" and current.get(key) != value:
+                logger.warning(
+                    f"⚠ Collection '{self.collection_name}' was built with {key}={current.get(key)}; "
+                    f"requested {value} only applies after a full rebuild"
+                )
+    
+    def _open_text_store(self, embeddings_dir: Optional[str]) -> Optional[TextStore]:
+        """Text store used to hydrate id-only results; None falls back to collection.get"""
+        if self.search_backend is not None:
+            return self.search_backend.text_store
+        if not embeddings_dir:
+            return None
+        try:
+            return TextStore.open_or_build(embeddings_dir)
+        except FileNotFoundError:
+            return None
+    
+    def _select_backend(self,
+                        backend: str,
+                        embeddings_dir: Optional[str],
+                        exact_search_threshold: int,
+                        backend_options: Dict):
+        """Pick the search backend; returns None when queries go to Chroma"""
+        self.backend_name = "chroma"
+        
+        if backend == "chroma":
+            return None
+        
+        has_embeddings = bool(embeddings_dir) and available_format(embeddings_dir) is not None
+        
+        if backend == "auto":
+            if not has_embeddings:
+                return None
+            num_vectors = len(QuantizedMatrix.load(embeddings_dir))
+            if num_vectors > exact_search_threshold:
+                return None
+            backend = "numpy"
+        
+        if backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Use 'auto', 'chroma' or one of {list(SEARCH_BACKENDS)}")
+        if not has_embeddings:
+            raise ValueError(f"Backend '{backend}' requires embeddings_dir with embedding artifacts")
+        
+        search_backend = SEARCH_BACKENDS[backend](embeddings_dir, **backend_options)
+        self.backend_name = backend
+        
+        collection_count = self.collection.count()
+        if collection_count and collection_count != search_backend.count():
+            logger.warning(
+                f"⚠ {backend} backend has {search_backend.count()} vectors but collection has "
+                f"{collection_count}; queries are served from {embeddings_dir}"
+            )
+        
+        return search_backend
     
     def add_documents(self, 
                      texts: List[str],
                      embeddings: np.ndarray,
                      metadatas: List[Dict],
-                     ids: Optional[List[str]] = None):
-        """Add documents to the vector store"""
+                     ids: Optional[List[str]] = None,
+                     batch_size: int = 1000):
+        """Add documents to the vector store in batches (ids default to content hashes)"""
         if ids is None:
-            ids = [f"doc_{i}" for i in range(len(texts))]
+            ids = content_hash_ids(texts, metadatas)
+            rows = first_occurrence_rows(ids)
+            if len(rows) < len(ids):
+                logger.warning(f"⚠ Skipping {len(ids) - len(rows)} duplicate chunks")
+                texts = [texts[r] for r in rows]
+                embeddings = np.asarray(embeddings)[rows]
+                metadatas = [metadatas[r] for r in rows]
+                ids = [ids[r] for r in rows]
         
-        embeddings_list = embeddings.tolist()
+        batch_size = min(batch_size, self.max_batch_size)
         
         logger.info(f"Adding {len(texts)} documents to collection...")
         
-        self.collection.add(
-            documents=texts,
-            embeddings=embeddings_list,
-            metadatas=metadatas,
-            ids=ids
-        )
+        for start in range(0, len(texts), batch_size):
+            end = start + batch_size
+            self.collection.add(
+                documents=texts[start:end],
+                embeddings=np.asarray(embeddings[start:end], dtype=np.float32).tolist(),
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
         
         logger.info(f"✓ Successfully added {len(texts)} documents")
         logger.info(f"✓ Total documents in collection: {self.collection.count()}")
     
+    @property
+    def max_batch_size(self) -> int:
+        """Largest number of rows the Chroma backend accepts per write"""
+        get_max_batch_size = getattr(self.client, "get_max_batch_size", None)
+        if get_max_batch_size is not None:
+            try:
+                return int(get_max_batch_size())
+            except Exception:
+                pass
+        return 5000
+    
     def query(self, 
              query_embedding: np.ndarray,
              n_results: int = 5,
-             where: Optional[Dict] = None) -> Dict:
+             where: Optional[Dict] = None,
+             include_documents: bool = True,
+             include_embeddings: bool = False) -> Dict:
         """Query the vector store"""
-        if isinstance(query_embedding, np.ndarray):
-            query_embedding = query_embedding.tolist()
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=where
-        )
+        return self.query_batch(query_embedding, n_results=n_results, where=where,
+                                include_documents=include_documents,
+                                include_embeddings=include_embeddings)
+    
+    def query_batch(self,
+                    embeddings: np.ndarray,
+                    n_results: int = 5,
+                    where: Optional[Dict] = None,
+                    batch_size: int = 256,
+                    include_documents: bool = True,
+                    include_embeddings: bool = False) -> Dict:
+        """
+        Query the vector store with many embeddings in as few round-trips as possible
+        
+        Args:
+            embeddings: 2-D array of shape (num_queries, embedding_dim)
+            n_results: Number of results to return per query
+            where: Optional metadata filter applied to every query
+            batch_size: Maximum number of queries sent per collection.query call
+            include_documents: Return texts and metadata with the results. With
+                False only ids and distances come back (documents/metadatas are
+                None); use fetch_documents() for the rows that are kept
+            include_embeddings: Also return the stored embedding of every result
+            
+        Returns:
+            Chroma-style result dict with one inner list per query, in input order
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        
+        if self.search_backend is not None:
+            return self.search_backend.query(embeddings, n_results=n_results, where=where,
+                                             include_documents=include_documents,
+                                             include_embeddings=include_embeddings)
+        
+        merged = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        include = ['documents', 'metadatas', 'distances'] if include_documents else ['distances']
+        if include_embeddings:
+            merged['embeddings'] = []
+            include.append('embeddings')
         
-        return results
+        for start in range(0, len(embeddings), batch_size):
+            results = self.collection.query(
+                query_embeddings=embeddings[start:start + batch_size].tolist(),
+                n_results=n_results,
+                where=where,
+                include=include
+            )
+            for key in merged:
+                # Newer Chroma versions return embeddings as arrays, so no truthiness test
+                value = results.get(key)
+                if value is not None:
+                    merged[key].extend(value)
+        
+        if not include_documents:
+            merged['documents'] = merged['metadatas'] = None
+        
+        return merged
+    
+    def fetch_documents(self, ids: List[str]) -> Dict:
+        """
+        Look up texts and metadata for result ids
+        
+        Reads from the memory-mapped text store when available; ids it does
+        not know (or all ids, without a text store) are fetched from Chroma.
+        
+        Returns:
+            Dict with documents and metadatas aligned with ids (None where unknown)
+        """
+        found = {}
+        if self.text_store is not None:
+            hits = self.text_store.get(ids)
+            found.update(zip(hits['ids'], zip(hits['documents'], hits['metadatas'])))
+        
+        missing = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in found]
+        if missing:
+            hits = self.collection.get(ids=missing, include=['documents', 'metadatas'])
+            found.update(zip(hits['ids'], zip(hits['documents'], hits['metadatas'])))
+        
+        return {
+            'ids': list(ids),
+            'documents': [found.get(doc_id, (None, None))[0] for doc_id in ids],
+            'metadatas': [found.get(doc_id, (None, None))[1] for doc_id in ids]
+        }
+    
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored embeddings by id (ids not in the collection are left out)"""
+        if not ids:
+            return {}
+        hits = self.collection.get(ids=list(ids), include=['embeddings'])
+        return {doc_id: np.asarray(embedding, dtype=np.float32)
+                for doc_id, embedding in zip(hits['ids'], hits['embeddings'])}
+    
+    def index_version(self) -> str:
+        """
+        Cheap token that changes whenever the indexed documents may have changed
+        
+        Combines the restored snapshot's checksum, the document count and the
+        modification time of Chroma's database file, so it moves on snapshot
+        restores as well as on in-place syncs.
+        """
+        parts = [
+            (self.snapshot or {}).get('sha256', 'local'),
+            str(self.collection.count())
+        ]
+        db_path = Path(self.persist_directory) / "chroma.sqlite3"
+        if db_path.exists():
+            stat = db_path.stat()
+            parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+        return ":".join(parts)
     
     def get_all_documents(self) -> Dict:
         """Get all documents from collection"""
         return self.collection.get()
     
     def delete_collection(self):
-        """Delete the collection"""
+        """Delete the collection (and its partitions)"""
+        if isinstance(self.collection, PartitionedCollection):
+            self.collection.drop_partitions()
         self.client.delete_collection(name=self.collection_name)
         logger.info(f"✓ Deleted collection: {self.collection_name}")
     
+    def create_snapshot(self, prefix: str = SNAPSHOT_PREFIX) -> Dict:
+        """
+        Publish the persist directory as a content-addressed archive in GCS
+        
+        Args:
+            prefix: GCS prefix for the archive and its LATEST.json pointer
+            
+        Returns:
+            The pointer written to LATEST.json
+        """
+        if not self.use_gcs:
+            raise ValueError("create_snapshot requires use_gcs=True")
+        
+        return upload_snapshot(
+            self.bucket,
+            self.persist_directory,
+            prefix=prefix,
+            extra_info={
+                'collection_name': self.collection_name,
+                'num_documents': self.collection.count()
+            }
+        )
+    
     def persist(self):
         """Persist the vector store"""
         logger.info(f"✓ Vector store persisted to: {self.persist_directory}")
@@ -139,9 +472,23 @@ def load_and_index_embeddings(embeddings_dir: str = "models/embeddings",
                               gcs_embeddings_prefix: str = "onboarding_ai/embeddings/",
                               bucket_name: str = "mlops-data-oa",
                               project_id: str = "mlops-476419",
-                              credentials_path: str = None):
+                              credentials_path: str = None,
+                              batch_size: int = 1000,
+                              full_rebuild: bool = False,
+                              hnsw_params: Optional[Dict] = None,
+                              publish_snapshot: bool = False,
+                              snapshot_prefix: str = SNAPSHOT_PREFIX,
+                              pca_components: Optional[int] = None,
+                              build_binary_index: bool = True,
+                              ivfpq_options: Optional[Dict] = None,
+                              partition_by: Optional[str] = None):
     """
-    Load embeddings from GCS (if enabled) and index into ChromaDB
+    Load embeddings from GCS (if enabled) and sync them into ChromaDB
+    
+    By default the collection is synced incrementally: chunk ids are content
+    hashes and only added, deleted or re-labelled chunks are written. With
+    full_rebuild=True the collection is dropped and re-indexed from scratch;
+    an interrupted rebuild resumes from its checkpoint on the next run.
     
     Args:
         embeddings_dir: Local directory for embeddings
@@ -151,6 +498,20 @@ def load_and_index_embeddings(embeddings_dir: str = "models/embeddings",
         bucket_name: GCS bucket name
         project_id: GCP project ID
         credentials_path: Path to service account credentials
+        batch_size: Number of documents written per batch
+        full_rebuild: Drop the collection and re-index everything
+        hnsw_params: HNSW parameters for newly created collections (see VectorStore)
+        publish_snapshot: Upload the built index as a snapshot for serving instances
+        snapshot_prefix: GCS prefix for published snapshots
+        pca_components: Also fit the PCA projection used by the "pca" backend
+            (and IVF-PQ with pca_components) with this many dimensions
+        build_binary_index: Also (re)build the sign-bit codes used by the
+            "binary" backend's Hamming prefilter
+        ivfpq_options: Also (re)train the index used by the "ivfpq" backend,
+            with these IVFPQIndex.open_or_build options ({} for defaults,
+            e.g. {"pca_components": 128, "nlist": 1024})
+        partition_by: Keep per-value sub-collections in step with the index
+            (see VectorStore; readers must open the store with the same value)
     """
     logger.info("=" * 60)
     logger.info("LOADING AND INDEXING EMBEDDINGS")
@@ -176,37 +537,24 @@ def load_and_index_embeddings(embeddings_dir: str = "models/embeddings",
         
         bucket = gcs_client.bucket(bucket_name)
         
-        # Create local directory
-        Path(embeddings_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Download files
-        files_to_download = [
-            ("embeddings.npy", "embeddings.npy"),
-            ("texts.json", "texts.json"),
-            ("metadata.json", "metadata.json"),
-            ("model_info.json", "model_info.json")
-        ]
-        
-        for gcs_filename, local_filename in files_to_download:
-            gcs_path = f"{gcs_embeddings_prefix}{gcs_filename}"
-            local_path = Path(embeddings_dir) / local_filename
-            
-            try:
-                blob = bucket.blob(gcs_path)
-                blob.download_to_filename(str(local_path))
-                logger.info(f"  ✓ Downloaded: {gcs_filename}")
-            except Exception as e:
-                logger.warning(f"  ✗ Failed to download {gcs_filename}: {e}")
+        # Parallel download of changed files only (quantized artifacts are optional)
+        GCSArtifactFetcher(bucket).fetch(
+            gcs_embeddings_prefix,
+            embeddings_dir,
+            EMBEDDING_ARTIFACTS + ["texts.json", "metadata.json", "model_info.json"],
+            required=["texts.json", "metadata.json"]
+        )
     
     # Load embeddings from local directory
     logger.info(f"\n📂 Loading from: {embeddings_dir}")
     
-    embeddings_path = Path(embeddings_dir) / "embeddings.npy"
     texts_path = Path(embeddings_dir) / "texts.json"
     metadata_path = Path(embeddings_dir) / "metadata.json"
     
-    embeddings = np.load(embeddings_path)
-    logger.info(f"✓ Loaded embeddings: {embeddings.shape}")
+    # Memory-map so only one batch of rows is materialised at a time;
+    # float16/int8 artifacts are dequantized batch by batch
+    embeddings = QuantizedMatrix.load(embeddings_dir)
+    logger.info(f"✓ Mapped {embeddings.format} embeddings: {embeddings.shape}")
     
     with open(texts_path, 'r', encoding='utf-8') as f:
         texts = json.load(f)
@@ -224,14 +572,28 @@ def load_and_index_embeddings(embeddings_dir: str = "models/embeddings",
         use_gcs=use_gcs,
         bucket_name=bucket_name,
         project_id=project_id,
-        credentials_path=credentials_path
+        credentials_path=credentials_path,
+        hnsw_params=hnsw_params,
+        partition_by=partition_by
     )
     
-    # Check if collection already has documents
-    if vector_store.collection.count() > 0:
-        logger.warning(f"⚠ Collection already has {vector_store.collection.count()} documents")
-        response = input("Do you want to delete and re-index? (yes/no): ")
-        if response.lower() == 'yes':
+    checkpoint_path = Path(vector_store_dir) / "index_checkpoint.json"
+    
+    if full_rebuild:
+        ids = content_hash_ids(texts, metadatas)
+        rows = first_occurrence_rows(ids)
+        # Ties the checkpoint to these exact artifacts, not just their path and row count
+        source = {'embeddings_dir': str(embeddings_dir), **embeddings.fingerprint(), 'ids_sha1': ids_digest(ids)}
+        
+        # An unfinished rebuild of the same data resumes from its checkpoint;
+        # anything else starts over from an empty collection
+        if checkpoint_matches(checkpoint_path, source, len(rows)):
+            logger.info(f"↻ Found indexing checkpoint: {checkpoint_path}")
+        else:
+            if checkpoint_path.exists():
+                logger.warning("⚠ Indexing checkpoint does not match current embeddings; discarding it")
+                checkpoint_path.unlink()
+            logger.info("♻ Full rebuild requested: dropping existing collection")
             vector_store.delete_collection()
             vector_store = VectorStore(
                 collection_name="gitlab_onboarding",
@@ -239,19 +601,58 @@ def load_and_index_embeddings(embeddings_dir: str = "models/embeddings",
                 use_gcs=use_gcs,
                 bucket_name=bucket_name,
                 project_id=project_id,
-                credentials_path=credentials_path
+                credentials_path=credentials_path,
+                hnsw_params=hnsw_params,
+                partition_by=partition_by
             )
+        
+        logger.info("\n📊 Indexing documents...")
+        stream_index_embeddings(
+            vector_store.collection,
+            embeddings=embeddings,
+            source=source,
+            texts=texts,
+            metadatas=metadatas,
+            ids=ids,
+            rows=rows,
+            batch_size=batch_size,
+            checkpoint_path=str(checkpoint_path),
+            max_batch_size=vector_store.max_batch_size
+        )
+    else:
+        logger.info("\n📊 Syncing documents...")
+        vector_store.last_sync_summary = sync_collection(
+            vector_store.collection,
+            embeddings=embeddings,
+            texts=texts,
+            metadatas=metadatas,
+            batch_size=batch_size,
+            max_batch_size=vector_store.max_batch_size
+        )
+        # A sync supersedes any half-finished rebuild
+        if checkpoint_path.exists():
+            checkpoint_path.unlink()
     
-    # Index documents
-    logger.info("\n📊 Indexing documents...")
-    vector_store.add_documents(
-        texts=texts,
-        embeddings=embeddings,
-        metadatas=metadatas
-    )
+    if pca_components:
+        logger.info(f"\n📉 Fitting PCA projection ({embeddings.shape[1]} -> {pca_components})...")
+        PCAIndex.open_or_build(embeddings, pca_index_path(embeddings_dir, pca_components),
+                               num_components=pca_components)
+    
+    if build_binary_index:
+        logger.info("\n🔢 Building binary prefilter index...")
+        BinaryIndex.open_or_build(embeddings, Path(embeddings_dir) / BINARY_INDEX_FILE)
+    
+    if ivfpq_options is not None:
+        logger.info("\n🧮 Training IVF-PQ index...")
+        IVFPQIndex.open_or_build(embeddings, ivfpq_index_path(embeddings_dir, ivfpq_options.get('pca_components')),
+                                 **ivfpq_options)
     
     vector_store.persist()
     
+    if publish_snapshot and use_gcs:
+        logger.info("\n📦 Publishing vector store snapshot...")
+        vector_store.create_snapshot(snapshot_prefix)
+    
     logger.info("\n" + "=" * 60)
     logger.info("✅ INDEXING COMPLETE!")
     logger.info("=" * 60)
@@ -280,15 +681,16 @@ if __name__ == "__main__":
         gcs_embeddings_prefix="onboarding_ai/embeddings/",
         bucket_name="mlops-data-oa",
         project_id="mlops-476419",
-        credentials_path=creds_path
+        credentials_path=creds_path,
+        publish_snapshot=True
     )
     
     print("\n" + "=" * 60)
     print("🧪 TESTING VECTOR STORE")
     print("=" * 60)
     
-    # Load embeddings for testing
-    embeddings = np.load("models/embeddings/embeddings.npy")
+    # Load embeddings for testing (whichever format was shipped)
+    embeddings = QuantizedMatrix.load("models/embeddings")
     test_embedding = embeddings[0]  
     
     print(f"\n🔍 Running test query...")
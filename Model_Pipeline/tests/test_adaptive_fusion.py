@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+try:
+    from src.retrieval.advanced_retriever import AdvancedRetriever
+except ImportError:  # chromadb / sentence-transformers not installed
+    AdvancedRetriever = None
+
+
+class FakeBM25:
+    def __init__(self, hits):
+        self.hits = hits
+
+    def search(self, query, k=10):
+        return [(doc_id, 10.0 - rank) for rank, doc_id in enumerate(self.hits)][:k]
+
+
+class FakeVectorStore:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def get_embeddings(self, ids):
+        return {doc_id: self.embeddings[doc_id] for doc_id in ids if doc_id in self.embeddings}
+
+
+@unittest.skipIf(AdvancedRetriever is None, "retrieval dependencies not installed")
+class TestAdaptiveDepthWithKeywordFusion(unittest.TestCase):
+    def _retriever(self, keyword_hits):
+        retriever = AdvancedRetriever.__new__(AdvancedRetriever)
+        retriever.bm25 = FakeBM25(keyword_hits)
+        retriever.rrf_k = 60
+        retriever.reranker = None
+        retriever.mmr_lambda = None
+        retriever.mmr_pool = 20
+        retriever.vector_store = FakeVectorStore({doc_id: np.ones(4, dtype=np.float32) for doc_id in keyword_hits})
+        return retriever
+
+    def _candidates(self, scores):
+        return [{'id': f"W{i + 1}", 'document': "", 'metadata': {}, 'dense_score': score}
+                for i, score in enumerate(scores)]
+
+    def test_clearly_separated_top_k_survives_fusion(self):
+        retriever = self._retriever(["K1", "K2", "K3"])
+        candidates = self._candidates([0.9, 0.88, 0.86, 0.5, 0.45, 0.4])
+
+        results = retriever._select_results("q", np.ones(4), candidates, 3, 20, None, adaptive=True)
+
+        self.assertFalse(results[0]['retrieval_plan']['rerank'])
+        self.assertEqual([doc['id'] for doc in results], ["W1", "W2", "W3"])
+
+    def test_fused_pool_never_exceeds_planned_depth(self):
+        retriever = self._retriever(["K1", "K2", "K3", "K4"])
+        candidates = self._candidates([0.9, 0.89, 0.88, 0.87, 0.86, 0.5])
+        pools = []
+        rank = retriever._rerank_candidates
+        retriever._rerank_candidates = lambda query, pool, k: pools.append(list(pool)) or rank(query, pool, k)
+
+        results = retriever._select_results("q", np.ones(4), candidates, 3, 20, None, adaptive=True)
+
+        plan = results[0]['retrieval_plan']
+        self.assertTrue(plan['rerank'])
+        self.assertLessEqual(len(pools[0]), plan['depth'])
+        self.assertEqual(len(results), plan['final_k'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from src.retrieval.bm25_index import BM25Index, matches_where, reciprocal_rank_fusion, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        texts = [
+            "expense report policy for travel",
+            "travel travel travel booking",
+            "the engineering handbook",
+            "expense approval workflow",
+        ]
+        self.index = BM25Index.build(texts, ["d0", "d1", "d2", "d3"])
+
+    def test_tokenize_drops_stopwords_and_single_characters(self):
+        self.assertEqual(tokenize("How do I file a Travel-Expense?"), ["file", "travel", "expense"])
+
+    def test_documents_matching_more_query_terms_rank_first(self):
+        ids = [doc_id for doc_id, _ in self.index.search("travel expense report")]
+        self.assertEqual(ids[0], "d0")
+        self.assertEqual(set(ids), {"d0", "d1", "d3"})
+
+    def test_scores_are_descending_and_nonmatching_documents_are_excluded(self):
+        hits = self.index.search("travel", k=10)
+        self.assertEqual([doc_id for doc_id, _ in hits], ["d1", "d0"])
+        self.assertGreater(hits[0][1], hits[1][1])
+        self.assertEqual(self.index.search("kubernetes"), [])
+
+    def test_k_limits_results(self):
+        self.assertEqual(len(self.index.search("travel expense", k=1)), 1)
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_agreement_outweighs_a_single_top_rank(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+        self.assertEqual([doc_id for doc_id, _ in fused], ["b", "a", "d", "c"])
+        self.assertAlmostEqual(fused[0][1], 1 / 61 + 1 / 62)
+
+
+class TestMatchesWhere(unittest.TestCase):
+    def test_operators(self):
+        meta = {'source_type': 'handbook', 'source': 'gitlab'}
+        self.assertTrue(matches_where(meta, {'source_type': 'handbook'}))
+        self.assertTrue(matches_where(meta, {'source_type': {'$in': ['handbook', 'blog']}}))
+        self.assertFalse(matches_where(meta, {'$and': [{'source': 'gitlab'}, {'source_type': {'$ne': 'handbook'}}]}))
+        self.assertTrue(matches_where(meta, {'$or': [{'source': 'other'}, {'source_type': 'handbook'}]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from src.retrieval.chunk_adjacency import ChunkAdjacency, stitch_chunks
+
+
+def _chunks(parent_id, ids):
+    return [{'parent_id': parent_id, 'chunk_index': i, 'total_chunks': len(ids)} for i in range(len(ids))]
+
+
+class TestChunkAdjacency(unittest.TestCase):
+    def setUp(self):
+        # X is the same chunk (same content-hash id) in both documents
+        ids = ["A0", "X", "A2", "B0", "X", "B2"]
+        metadatas = _chunks("a", ["A0", "X", "A2"]) + _chunks("b", ["B0", "X", "B2"])
+        self.adjacency = ChunkAdjacency.build(ids, metadatas)
+
+    def test_window_within_document(self):
+        self.assertEqual(self.adjacency.window("X", 1, 1), ["A0", "X", "A2"])
+        self.assertEqual(self.adjacency.window("A2", 2, 0), ["A0", "X", "A2"])
+
+    def test_window_stops_at_duplicated_chunk(self):
+        self.assertEqual(self.adjacency.window("B2", 2, 0), ["X", "B2"])
+        self.assertEqual(self.adjacency.window("B0", 0, 2), ["B0", "X"])
+
+    def test_expand_keeps_every_hit_with_duplicated_chunks(self):
+        self.assertEqual(self.adjacency.expand(["B2"], 1), [["X", "B2"]])
+
+        spans = self.adjacency.expand(["B2", "A0", "X"], 1)
+        hits_in_spans = [doc_id for span in spans for doc_id in span]
+        for hit in ["B2", "A0", "X"]:
+            self.assertIn(hit, hits_in_spans)
+        self.assertEqual(len(hits_in_spans), len(set(hits_in_spans)))
+
+    def test_expand_merges_touching_windows(self):
+        self.assertEqual(self.adjacency.expand(["A0", "A2"], 1), [["A0", "X", "A2"]])
+
+    def test_stitch_chunks_removes_overlap(self):
+        first = "Our values guide how we work. Results matter, and so does iteration."
+        second = "and so does iteration. Transparency comes next."
+        self.assertEqual(stitch_chunks([first, second]),
+                         "Our values guide how we work. Results matter, and so does iteration. Transparency comes next.")
+
+    def test_stitch_chunks_ignores_short_coincidental_overlap(self):
+        self.assertEqual(stitch_chunks(["we value the", "elephant in the room"]),
+                         "we value the\n\nelephant in the room")
+
+
+if __name__ == "__main__":
+    unittest.main()
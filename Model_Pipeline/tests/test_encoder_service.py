@@ -0,0 +1,70 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.embeddings.encoder_service import BatchingEncoder
+
+
+class FakeModel:
+    """Encodes each text as [len(text), 1, ...], counting forward passes"""
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def encode(self, texts, normalize_embeddings=False, convert_to_numpy=True, **kwargs):
+        with self.lock:
+            self.calls += 1
+        single = isinstance(texts, str)
+        rows = np.array([[len(text)] + [1.0] * (self.dim - 1) for text in ([texts] if single else texts)],
+                        dtype=np.float32).reshape(-1, self.dim)
+        if normalize_embeddings and len(rows):
+            rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+        return rows[0] if single else rows
+
+
+class TestBatchingEncoder(unittest.TestCase):
+    def test_concurrent_calls_get_their_own_rows(self):
+        model = FakeModel()
+        encoder = BatchingEncoder(model, max_batch_size=64, max_wait_ms=20)
+        texts = ["x" * (i + 1) for i in range(32)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(encoder.encode, texts))
+        encoder.close()
+
+        for text, embedding in zip(texts, results):
+            self.assertEqual(embedding[0], len(text))
+        self.assertLess(model.calls, len(texts))
+
+    def test_encode_after_close_runs_directly(self):
+        encoder = BatchingEncoder(FakeModel())
+        encoder.close()
+        self.assertEqual(encoder.encode(["abc"]).shape, (1, 4))
+
+    def test_close_racing_encode_never_hangs(self):
+        for _ in range(50):
+            encoder = BatchingEncoder(FakeModel(), max_wait_ms=0.1)
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(encoder.encode, "text") for _ in range(20)]
+                encoder.close()
+                for future in futures:
+                    self.assertEqual(future.result(timeout=5)[0], 4)
+
+    def test_requests_left_by_a_dead_worker_fail(self):
+        class DyingEncoder(BatchingEncoder):
+            def _serve(self):
+                while self._queue.empty():
+                    pass
+                return
+
+        encoder = DyingEncoder(FakeModel())
+        with self.assertRaises(RuntimeError):
+            encoder.encode("abc")
+        # Later calls bypass the dead worker
+        self.assertEqual(encoder.encode("abc")[0], 3)
+
+if __name__ == "__main__":
+    unittest.main()
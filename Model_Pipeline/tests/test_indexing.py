@@ -0,0 +1,121 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.retrieval.indexing import (
+    _write_checkpoint, content_hash_id, content_hash_ids, stream_index_embeddings, sync_collection
+)
+
+
+class FakeCollection:
+    """In-memory stand-in for the collection calls made while indexing"""
+
+    def __init__(self):
+        self.rows = {}
+        self.upserted = []
+
+    def count(self):
+        return len(self.rows)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self.upserted.extend(ids)
+        for i, doc_id in enumerate(ids):
+            self.rows[doc_id] = {'document': documents[i], 'metadata': metadatas[i]}
+
+    def update(self, ids, metadatas=None):
+        for doc_id, meta in zip(ids, metadatas):
+            self.rows[doc_id]['metadata'] = meta
+
+    def delete(self, ids=None, **kwargs):
+        for doc_id in ids or []:
+            self.rows.pop(doc_id, None)
+
+    def get(self, include=None, limit=None, offset=0):
+        ids = list(self.rows)[offset:offset + limit]
+        return {'ids': ids, 'metadatas': [self.rows[doc_id]['metadata'] for doc_id in ids]}
+
+
+def _corpus(texts, **extra):
+    metadatas = [{'source_type': 'handbook', 'title': 'Values', **extra} for _ in texts]
+    embeddings = np.random.default_rng(0).normal(size=(len(texts), 4)).astype(np.float32)
+    return embeddings, list(texts), metadatas
+
+
+class TestContentHashId(unittest.TestCase):
+    def test_id_depends_on_source_type_title_and_text_only(self):
+        meta = {'source_type': 'handbook', 'title': 'Values', 'url': 'a'}
+        self.assertEqual(content_hash_id("text", meta), content_hash_id("text", {**meta, 'url': 'b'}))
+        self.assertNotEqual(content_hash_id("text", meta), content_hash_id("other", meta))
+        self.assertNotEqual(content_hash_id("text", meta), content_hash_id("text", {**meta, 'title': 'Other'}))
+        self.assertTrue(content_hash_id("text", meta).startswith("chunk_"))
+
+
+class TestSyncCollection(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeCollection()
+
+    def test_first_sync_adds_each_chunk_once(self):
+        embeddings, texts, metadatas = _corpus(["a", "b", "a", "c"])
+        summary = sync_collection(self.collection, embeddings, texts, metadatas, batch_size=2)
+
+        self.assertEqual(summary['added'], 3)
+        self.assertEqual(summary['duplicates_skipped'], 1)
+        self.assertEqual(summary['total_documents'], 3)
+        self.assertEqual(self.collection.count(), 3)
+        self.assertEqual(sorted(self.collection.upserted), sorted(set(content_hash_ids(texts, metadatas))))
+
+    def test_resync_applies_only_the_diff(self):
+        embeddings, texts, metadatas = _corpus(["a", "b", "c"], url="old")
+        sync_collection(self.collection, embeddings, texts, metadatas)
+        self.collection.upserted.clear()
+
+        embeddings, texts, metadatas = _corpus(["a", "b", "d"], url="old")
+        metadatas[1] = {**metadatas[1], 'url': 'new'}
+        summary = sync_collection(self.collection, embeddings, texts, metadatas)
+
+        self.assertEqual((summary['added'], summary['updated'], summary['deleted'], summary['unchanged']),
+                         (1, 1, 1, 1))
+        ids = content_hash_ids(texts, metadatas)
+        self.assertEqual(self.collection.upserted, [ids[2]])
+        self.assertEqual(sorted(self.collection.rows), sorted(ids))
+        self.assertEqual(self.collection.rows[ids[1]]['metadata']['url'], 'new')
+
+    def test_unchanged_corpus_writes_nothing(self):
+        embeddings, texts, metadatas = _corpus(["a", "b"])
+        sync_collection(self.collection, embeddings, texts, metadatas)
+        self.collection.upserted.clear()
+
+        summary = sync_collection(self.collection, embeddings, texts, metadatas)
+        self.assertEqual((summary['added'], summary['updated'], summary['deleted'], summary['unchanged']),
+                         (0, 0, 0, 2))
+        self.assertEqual(self.collection.upserted, [])
+
+
+class TestStreamIndexEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeCollection()
+        self.embeddings, self.texts, self.metadatas = _corpus([f"text {i}" for i in range(10)])
+        self.checkpoint = Path(tempfile.mkdtemp()) / "checkpoint.json"
+
+    def test_resumes_from_a_matching_checkpoint(self):
+        _write_checkpoint(self.checkpoint, {'source': {'id': 1}, 'num_rows': 10, 'next_row': 6})
+        stats = stream_index_embeddings(self.collection, self.embeddings, self.texts, self.metadatas,
+                                        batch_size=4, checkpoint_path=str(self.checkpoint), source={'id': 1})
+
+        self.assertEqual(stats['resumed_from_row'], 6)
+        self.assertEqual(self.collection.count(), 4)
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_ignores_a_checkpoint_for_other_data(self):
+        _write_checkpoint(self.checkpoint, {'source': {'id': 1}, 'num_rows': 10, 'next_row': 6})
+        stats = stream_index_embeddings(self.collection, self.embeddings, self.texts, self.metadatas,
+                                        batch_size=4, checkpoint_path=str(self.checkpoint), source={'id': 2})
+
+        self.assertEqual(stats['resumed_from_row'], 0)
+        self.assertEqual(self.collection.count(), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
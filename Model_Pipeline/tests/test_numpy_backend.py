@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.embeddings.quantization import FLOAT32_FILE, save_quantized_embeddings
+from src.retrieval.indexing import content_hash_ids
+from src.retrieval.numpy_backend import ExactSearchBackend
+
+
+class TestExactSearchBackend(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(200, 16)).astype(np.float32)
+        self.embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        texts = [f"text {i}" for i in range(200)]
+        self.metadatas = [{'source_type': ['handbook', 'blog', 'transcript'][i % 3], 'title': str(i)}
+                          for i in range(200)]
+        # Row 199 repeats row 0's content, so it shares row 0's id
+        texts[199], self.metadatas[199] = texts[0], self.metadatas[0]
+        self.embeddings[199] = self.embeddings[0]
+
+        np.save(self.dir / FLOAT32_FILE, self.embeddings)
+        with open(self.dir / "texts.json", 'w', encoding='utf-8') as f:
+            json.dump(texts, f)
+        with open(self.dir / "metadata.json", 'w', encoding='utf-8') as f:
+            json.dump(self.metadatas, f)
+        self.ids = content_hash_ids(texts, self.metadatas)
+        self.queries = self.embeddings[:5] + 0.1 * rng.normal(size=(5, 16)).astype(np.float32)
+
+    def _expected(self, k, rows):
+        rows = np.asarray(rows)
+        queries = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        order = np.argsort(-(queries @ self.embeddings[rows].T), axis=1)[:, :k]
+        return [[self.ids[r] for r in rows[row]] for row in order]
+
+    def test_matches_brute_force_and_skips_duplicate_rows(self):
+        backend = ExactSearchBackend(str(self.dir))
+        result = backend.query(self.queries, n_results=10)
+
+        self.assertEqual(result['ids'], self._expected(10, range(199)))
+        for distances in result['distances']:
+            self.assertEqual(distances, sorted(distances))
+
+    def test_where_masks(self):
+        backend = ExactSearchBackend(str(self.dir))
+        cases = [
+            ({'source_type': 'blog'}, lambda m: m['source_type'] == 'blog'),
+            ({'source_type': {'$ne': 'blog'}}, lambda m: m['source_type'] != 'blog'),
+            ({'source_type': {'$in': ['blog', 'transcript']}}, lambda m: m['source_type'] in ('blog', 'transcript')),
+            ({'$and': [{'source_type': {'$nin': ['blog']}}, {'title': {'$in': ['1', '2', '3', '4']}}]},
+             lambda m: m['source_type'] != 'blog' and m['title'] in ('1', '2', '3', '4')),
+        ]
+        for where, keep in cases:
+            with self.subTest(where=where):
+                rows = [r for r in range(199) if keep(self.metadatas[r])]
+                result = backend.query(self.queries, n_results=5, where=where, include_documents=False)
+                self.assertEqual(result['ids'], self._expected(5, rows))
+                self.assertIsNone(result['documents'])
+
+    def test_unknown_value_matches_nothing(self):
+        backend = ExactSearchBackend(str(self.dir))
+        result = backend.query(self.queries[:1], n_results=5, where={'source_type': 'wiki'})
+        self.assertEqual(result['ids'], [[]])
+
+    def test_int8_scan_is_rescored_in_float32(self):
+        save_quantized_embeddings(self.embeddings, str(self.dir), "int8")
+        backend = ExactSearchBackend(str(self.dir), quantization="int8", rescore_factor=8)
+        result = backend.query(self.queries, n_results=10, include_embeddings=True)
+
+        self.assertEqual(result['ids'], self._expected(10, range(199)))
+        # Rescored distances come from the float32 rows, not the int8 codes
+        queries = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        for query, ids, distances in zip(queries, result['ids'], result['distances']):
+            exact = [1 - float(self.embeddings[self.ids.index(doc_id)] @ query) for doc_id in ids]
+            np.testing.assert_allclose(distances, exact, rtol=1e-5, atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
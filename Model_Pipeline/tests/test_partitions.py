@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.retrieval.partitions import PartitionedCollection
+
+
+class FakeCollection:
+    """In-memory stand-in returning Chroma-shaped query results"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}
+
+    def count(self):
+        return len(self.rows)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        for i, doc_id in enumerate(ids):
+            self.rows[doc_id] = (np.asarray(embeddings[i], dtype=np.float32),
+                                 documents[i] if documents is not None else None,
+                                 metadatas[i] if metadatas is not None else None)
+
+    def delete(self, ids=None, **kwargs):
+        for doc_id in ids or []:
+            self.rows.pop(doc_id, None)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        include = include or ['documents', 'metadatas', 'distances']
+        ids = list(self.rows)
+        matrix = np.stack([self.rows[doc_id][0] for doc_id in ids])
+        result = {'ids': [], 'documents': [], 'metadatas': [], 'distances': [],
+                  'embeddings': [], 'included': include}
+        for query in np.asarray(query_embeddings, dtype=np.float32):
+            order = np.argsort(-(matrix @ query))[:n_results]
+            result['ids'].append([ids[j] for j in order])
+            result['documents'].append([self.rows[ids[j]][1] for j in order])
+            result['metadatas'].append([self.rows[ids[j]][2] for j in order])
+            result['distances'].append([float(1 - matrix[j] @ query) for j in order])
+            result['embeddings'].append(matrix[order])
+        result['embeddings'] = np.stack(result['embeddings'])
+        for key in ('documents', 'metadatas', 'distances', 'embeddings'):
+            if key not in include:
+                result[key] = None
+        return result
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, FakeCollection(name))
+
+    def delete_collection(self, name):
+        self.collections.pop(name, None)
+
+
+class TestPartitionedCollection(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(60, 8)).astype(np.float32)
+        self.embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.ids = [f"chunk_{i}" for i in range(60)]
+        self.metadatas = [{'source_type': 'handbook' if i % 2 else 'transcript'} for i in range(60)]
+
+        client = FakeClient()
+        self.collection = PartitionedCollection(
+            client, client.get_or_create_collection("docs"), "source_type", tempfile.mkdtemp()
+        )
+        self.collection.add(ids=self.ids, embeddings=self.embeddings,
+                            documents=[f"text {i}" for i in range(60)], metadatas=self.metadatas)
+
+    def test_routed_query_returns_more_than_ten_results(self):
+        result = self.collection.query(self.embeddings[:2], n_results=20,
+                                       where={"source_type": "handbook"},
+                                       include=['documents', 'metadatas', 'distances'])
+
+        self.assertNotIn('included', result)
+        for row in range(2):
+            self.assertEqual(len(result['ids'][row]), 20)
+            self.assertEqual(result['distances'][row], sorted(result['distances'][row]))
+            self.assertTrue(all(meta['source_type'] == 'handbook' for meta in result['metadatas'][row]))
+
+    def test_routed_query_merges_embedding_arrays(self):
+        result = self.collection.query(self.embeddings[:1], n_results=15,
+                                       where={"source_type": {"$in": ["handbook", "transcript"]}},
+                                       include=['distances', 'embeddings'])
+
+        self.assertEqual(len(result['embeddings'][0]), 15)
+        for doc_id, embedding in zip(result['ids'][0], result['embeddings'][0]):
+            np.testing.assert_allclose(embedding, self.embeddings[self.ids.index(doc_id)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from src.generation.semantic_cache import SemanticCache
+
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache(similarity_threshold=0.9)
+        self.query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+    def test_paraphrase_hits_and_other_k_misses(self):
+        self.assertIsNone(self.cache.lookup(self.query, "v1", k=5))
+        self.cache.store(self.query, "v1", 5, {'query': "q", 'answer': "a"})
+
+        hit = self.cache.lookup(np.array([1.0, 0.1, 0.0]), "v1", k=5)
+        self.assertEqual(hit['answer'], "a")
+        self.assertTrue(hit['cached'])
+        self.assertIsNone(self.cache.lookup(self.query, "v1", k=3))
+
+    def test_new_index_version_drops_entries(self):
+        self.cache.lookup(self.query, "v1", k=5)
+        self.cache.store(self.query, "v1", 5, {'answer': "old"})
+        self.assertIsNone(self.cache.lookup(self.query, "v2", k=5))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_store_for_an_older_version_does_not_roll_back(self):
+        # Request A retrieves against v1; request B sees v2 and caches its answer first
+        self.cache.lookup(self.query, "v1", k=5)
+        other = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+        self.cache.lookup(other, "v2", k=5)
+        self.cache.store(other, "v2", 5, {'answer': "fresh"})
+
+        self.cache.store(self.query, "v1", 5, {'answer': "stale"})
+
+        self.assertEqual(self.cache.stats()['index_version'], "v2")
+        self.assertEqual(self.cache.lookup(other, "v2", k=5)['answer'], "fresh")
+        self.assertIsNone(self.cache.lookup(self.query, "v2", k=5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.retrieval.indexing import content_hash_ids
+from src.retrieval.text_store import TextStore
+
+
+def _write_corpus(directory: Path, texts, metadatas):
+    with open(directory / "texts.json", 'w', encoding='utf-8') as f:
+        json.dump(texts, f)
+    with open(directory / "metadata.json", 'w', encoding='utf-8') as f:
+        json.dump(metadatas, f)
+
+
+class TestTextStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.texts = ["first chunk", "second chunk — ünïcode", "third chunk"]
+        self.metadatas = [{'source_type': 'handbook', 'title': str(i)} for i in range(3)]
+        _write_corpus(self.dir, self.texts, self.metadatas)
+        self.ids = content_hash_ids(self.texts, self.metadatas)
+
+    def test_ids_and_rows_match_the_corpus(self):
+        store = TextStore.open_or_build(str(self.dir))
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store.ids), self.ids)
+        self.assertEqual(store.get_rows([2, 1]), ([self.texts[2], self.texts[1]],
+                                                  [self.metadatas[2], self.metadatas[1]]))
+
+    def test_get_returns_known_ids_in_request_order(self):
+        store = TextStore.open_or_build(str(self.dir))
+        result = store.get([self.ids[2], "chunk_missing", self.ids[0]])
+
+        self.assertEqual(result['ids'], [self.ids[2], self.ids[0]])
+        self.assertEqual(result['documents'], [self.texts[2], self.texts[0]])
+        self.assertEqual(list(store.rows_for_ids(["chunk_missing", self.ids[1]])), [-1, 1])
+
+    def test_stale_store_is_rebuilt(self):
+        TextStore.open_or_build(str(self.dir))
+        texts = self.texts + ["a fourth, newly added chunk"]
+        metadatas = self.metadatas + [{'source_type': 'handbook', 'title': '3'}]
+        _write_corpus(self.dir, texts, metadatas)
+
+        store = TextStore.open_or_build(str(self.dir))
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.get(content_hash_ids(texts, metadatas)[3:])['documents'], [texts[3]])
+
+
+if __name__ == "__main__":
+    unittest.main()